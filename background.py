@@ -0,0 +1,120 @@
+"""
+Выполнение долгих операций (загрузка, формирование, экспорт) в рабочем
+потоке без блокировки окна
+"""
+import threading
+
+
+class TaskCancelled(Exception):
+    """Операция отменена пользователем"""
+
+
+class BackgroundTask:
+    """
+    Операция в рабочем потоке с опросом состояния из цикла Tk
+
+    Функция work(task) выполняется в отдельном потоке и не обращается к
+    виджетам. Ход выполнения она сообщает вызовом task.progress, который
+    также проверяет запрос отмены: отмена кооперативная и срабатывает
+    при следующем сообщении о ходе (например, между листами карты).
+    Окно опрашивает задачу через root.after, все обработчики (on_progress,
+    on_finish, затем on_done, on_error или on_cancel) вызываются в потоке Tk.
+    """
+    POLL_MS = 100
+
+    def __init__(self, root, work, on_done=None, on_error=None, on_cancel=None,
+                 on_progress=None, on_finish=None):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        # Последнее сообщение о ходе; присваивание атомарно, очередь не нужна -
+        # окну важно только текущее состояние
+        self._progress = None
+        self._shown_progress = None
+        self._result = None
+        self._error = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='background-task', daemon=True)
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        """Запрос отмены; операция прервется при следующем task.progress"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def progress(self, done, total, text=''):
+        """
+        Сообщение о ходе выполнения (вызывается из рабочего потока)
+
+        Raises:
+            TaskCancelled: если запрошена отмена
+        """
+        self._progress = (done, total, text)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def _run(self):
+        try:
+            self._result = self.work(self)
+            self.check_cancelled()
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            self._error = e
+        finally:
+            self._finished.set()
+
+    def _poll(self):
+        progress = self._progress
+        if progress is not None and progress != self._shown_progress:
+            self._shown_progress = progress
+            if self.on_progress is not None:
+                self.on_progress(*progress)
+
+        if not self._finished.is_set():
+            self.root.after(self.POLL_MS, self._poll)
+            return
+
+        # on_finish - до обработчиков результата: они могут показывать
+        # модальные сообщения или запускать следующую операцию
+        if self.on_finish is not None:
+            self.on_finish()
+        if self._error is not None:
+            if self.on_error is not None:
+                self.on_error(self._error)
+        elif self._cancel.is_set():
+            if self.on_cancel is not None:
+                self.on_cancel()
+        elif self.on_done is not None:
+            self.on_done(self._result)
+
+
+def page_progress(task, message):
+    """
+    Функция хода формирования карты для create_route_card по задаче task
+    (None - без сообщений о ходе)
+    """
+    if task is None:
+        return None
+
+    def progress(page_num, done, total):
+        text = f"{message}: лист {page_num}" if page_num else message
+        task.progress(done, total, text)
+    return progress
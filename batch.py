@@ -0,0 +1,293 @@
+"""
+Пакетное формирование маршрутных карт без графического интерфейса
+
+Задания (Elements.xlsx, Proc.txt и информация о документе) берутся из
+манифеста JSON или из каталога и выполняются в пуле процессов. Модуль
+не импортирует tkinter и может запускаться на сервере без дисплея.
+
+Манифест - список заданий (или объект с ключом "jobs"):
+
+    [
+        {"name": "PU-001", "elements": "pu001/Elements.xlsx",
+         "proc": "pu001/Proc.txt",
+         "doc_info": {"product_name": "Печатный узел", "designation": "ПУ-001"}}
+    ]
+
+Относительные пути задаются от каталога манифеста. Каталог вместо
+манифеста: каждый подкаталог (или сам каталог) с файлами Elements.xlsx
+и Proc.txt - одно задание, информация о документе берется из файла
+doc_info.json рядом с ними (необязательно).
+
+Запуск:
+    python batch.py jobs.json --out results --format docx pdf --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+ELEMENTS_NAME = 'elements.xlsx'
+PROC_NAME = 'proc.txt'
+DOC_INFO_NAME = 'doc_info.json'
+FORMATS = ('docx', 'pdf')
+# Этапы задания в порядке выполнения (колонки сводки)
+STAGES = ('load', 'merge', 'docx', 'pdf')
+
+
+class BatchError(Exception):
+    """Ошибка в описании пакета заданий"""
+
+
+def load_jobs(source):
+    """
+    Список заданий из манифеста JSON или каталога
+
+    Returns:
+        Словари с ключами name, elements, proc, doc_info
+    """
+    source = Path(source)
+    if source.is_dir():
+        jobs = _jobs_from_dir(source)
+    elif source.is_file():
+        jobs = _jobs_from_manifest(source)
+    else:
+        raise BatchError(f"Не найден манифест или каталог: {source}")
+
+    if not jobs:
+        raise BatchError(f"Задания не найдены: {source}")
+
+    names = set()
+    for job in jobs:
+        if job['name'] in names:
+            raise BatchError(f"Повторяющееся имя задания: {job['name']}")
+        names.add(job['name'])
+    return jobs
+
+
+def _jobs_from_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('jobs', [])
+    if not isinstance(manifest, list):
+        raise BatchError(f"Манифест должен быть списком заданий "
+                         f"или объектом с ключом jobs: {path}")
+
+    base = path.parent
+    jobs = []
+    for index, entry in enumerate(manifest, start=1):
+        try:
+            elements = base / entry['elements']
+            proc = base / entry['proc']
+        except (KeyError, TypeError):
+            raise BatchError(f"Задание {index}: нужны поля elements и proc")
+        jobs.append({
+            'name': str(entry.get('name') or elements.parent.name or f'job{index}'),
+            'elements': str(elements),
+            'proc': str(proc),
+            'doc_info': entry.get('doc_info') or {},
+        })
+    return jobs
+
+
+def _jobs_from_dir(root):
+    jobs = []
+    for directory in [root, *sorted(p for p in root.iterdir() if p.is_dir())]:
+        # Имена файлов сравниваются без учета регистра
+        files = {p.name.lower(): p for p in directory.iterdir() if p.is_file()}
+        if ELEMENTS_NAME not in files or PROC_NAME not in files:
+            continue
+
+        doc_info = {}
+        if DOC_INFO_NAME in files:
+            with open(files[DOC_INFO_NAME], 'r', encoding='utf-8') as f:
+                doc_info = json.load(f)
+        jobs.append({
+            'name': directory.name,
+            'elements': str(files[ELEMENTS_NAME]),
+            'proc': str(files[PROC_NAME]),
+            'doc_info': doc_info,
+        })
+    return jobs
+
+
+# Обработчики процесса-исполнителя (создаются один раз на процесс)
+_worker = None
+
+
+def _init_worker(use_cache):
+    """Инициализация процесса-исполнителя: импорт модулей и создание обработчиков"""
+    global _worker
+    from data_processor import DataProcessor
+    from document_generator import DocumentGenerator
+    from parse_cache import ParseCache
+
+    cache = ParseCache() if use_cache else None
+    _worker = (DataProcessor(cache=cache), DocumentGenerator())
+
+
+def run_job(job, out_dir, formats):
+    """
+    Выполнение одного задания в текущем процессе
+
+    Returns:
+        Словарь с результатом: name, ok, error, rows, outputs и время
+        этапов в секундах (timings)
+    """
+    processor, generator = _worker
+    result = {'name': job['name'], 'ok': False, 'error': None, 'rows': 0,
+              'outputs': [], 'timings': {}}
+    timings = result['timings']
+    started = time.perf_counter()
+
+    def stage(name, action):
+        begin = time.perf_counter()
+        value = action()
+        timings[name] = time.perf_counter() - begin
+        return value
+
+    try:
+        # Для карты нужны только колонки PROJECTED_COLUMNS - остальные не читаются
+        elements, proc = stage('load', lambda: (
+            processor.load_excel(job['elements'], projected=True),
+            processor.load_proc_txt(job['proc'])
+        ))
+        merged = stage('merge', lambda: processor.merge_data(elements, proc))
+        result['rows'] = len(merged)
+
+        doc_info = dict(generator._default_doc_info(), **job['doc_info'])
+
+        for fmt in formats:
+            output = str(Path(out_dir) / f"{job['name']}.{fmt}")
+            if fmt == 'docx':
+                stage('docx', lambda: generator.create_route_card(merged, output, doc_info))
+            else:
+                stage('pdf', lambda: generator.create_route_card_pdf(merged, output, doc_info))
+            result['outputs'].append(output)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = f'{e}'
+        result['traceback'] = traceback.format_exc()
+
+    timings['total'] = time.perf_counter() - started
+    return result
+
+
+def run_batch(jobs, out_dir, formats=FORMATS, workers=None, use_cache=True,
+              on_result=None):
+    """
+    Выполнение пакета заданий
+
+    Args:
+        jobs: задания (см. load_jobs)
+        out_dir: каталог результатов
+        formats: форматы результата ('docx', 'pdf')
+        workers: число процессов; 1 - выполнение в текущем процессе
+        use_cache: использовать дисковый кэш разобранных файлов
+        on_result: функция, вызываемая по завершении каждого задания
+
+    Returns:
+        Результаты в порядке заданий (см. run_job)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers == 1:
+        _init_worker(use_cache)
+        results = []
+        for job in jobs:
+            results.append(run_job(job, out_dir, formats))
+            if on_result is not None:
+                on_result(results[-1])
+        return results
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(use_cache,)) as executor:
+        futures = {executor.submit(run_job, job, out_dir, formats): index
+                   for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Процесс-исполнитель завершился аварийно
+                result = {'name': jobs[index]['name'], 'ok': False,
+                          'error': f'{e}', 'rows': 0, 'outputs': [], 'timings': {}}
+            results[index] = result
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def format_summary(results, wall_time):
+    """Сводка по заданиям: время этапов и ошибки"""
+    columns = [*STAGES, 'total']
+    width = max([len('Задание')] + [len(r['name']) for r in results])
+    lines = [f"{'Задание':<{width}}  {'Статус':<6}  {'Строк':>7}  " +
+             '  '.join(f'{c:>7}' for c in columns)]
+
+    for r in results:
+        times = '  '.join(
+            f"{r['timings'][c]:7.2f}" if c in r['timings'] else f"{'-':>7}"
+            for c in columns
+        )
+        status = 'OK' if r['ok'] else 'ОШИБКА'
+        lines.append(f"{r['name']:<{width}}  {status:<6}  {r['rows']:>7}  {times}")
+
+    failed = [r for r in results if not r['ok']]
+    lines.append('')
+    lines.append(f"Заданий: {len(results)}, успешно: {len(results) - len(failed)}, "
+                 f"с ошибками: {len(failed)}, общее время: {wall_time:.2f} с")
+    for r in failed:
+        lines.append(f"  {r['name']}: {r['error']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Пакетное формирование маршрутных карт без графического интерфейса")
+    parser.add_argument('source', help="манифест JSON или каталог с заданиями")
+    parser.add_argument('-o', '--out', default='route_cards',
+                        help="каталог результатов (по умолчанию route_cards)")
+    parser.add_argument('-f', '--format', nargs='+', choices=FORMATS,
+                        default=list(FORMATS), help="форматы результата")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="не использовать кэш разобранных файлов")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="выводить трассировку ошибок")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.source)
+    except (BatchError, OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+
+    formats = [fmt for fmt in FORMATS if fmt in args.format]
+
+    def report(result):
+        status = 'OK' if result['ok'] else f"ОШИБКА: {result['error']}"
+        print(f"[{result['name']}] {result['timings'].get('total', 0):.2f} с - {status}",
+              flush=True)
+        if args.verbose and result.get('traceback'):
+            print(result['traceback'], file=sys.stderr)
+
+    started = time.perf_counter()
+    results = run_batch(jobs, args.out, formats, args.workers,
+                        use_cache=not args.no_cache, on_result=report)
+    print()
+    print(format_summary(results, time.perf_counter() - started))
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
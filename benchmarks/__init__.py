@@ -0,0 +1,6 @@
+"""
+Замеры производительности генератора маршрутных карт
+
+Модули пакета запускаются из корня проекта:
+    python -m benchmarks.startup
+"""
@@ -0,0 +1,294 @@
+"""
+Время и пиковая память этапов обработки на синтетических данных
+
+Для каждого размера перечня (см. synthetic.SIZES) отдельно замеряются
+этапы: load_excel (полный и с проекцией колонок), load_proc_txt,
+merge_data, _prepare_route_data, create_route_card,
+create_route_card_pdf, convert_to_pdf и pdf_fonts (PDF со встроенным
+подмножеством глифов и со всеми глифами шрифтов - время и размер
+файла). Вход каждого этапа готовится заранее, замеряется только сам этап. Время - по нескольким повторам
+(минимум и медиана), пиковая память - по отдельному запуску под
+tracemalloc (выделения Python, numpy и pandas), так как tracemalloc
+замедляет выполнение.
+
+Результат сохраняется в JSON и может сравниваться с предыдущим:
+    python -m benchmarks.pipeline --sizes 500 5000 --json after.json
+    python -m benchmarks.pipeline --sizes 500 5000 --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.synthetic import SIZES, generate
+
+ROOT = Path(__file__).resolve().parent.parent
+STAGES = ('load_excel', 'load_excel_projected', 'load_proc_txt', 'merge_data',
+          'prepare_route_data', 'create_route_card', 'create_route_card_pdf',
+          'convert_to_pdf', 'pdf_fonts')
+RESULT_VERSION = 2
+
+
+def _render_pdf_full_fonts(generator, data, output_path):
+    """
+    create_route_card_pdf со встраиванием всех глифов шрифтов
+
+    reportlab всегда встраивает подмножество использованных глифов,
+    поэтому на первом листе невидимым текстом выводятся все символы
+    шрифтов - в файл попадают все глифы, как при полном встраивании
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from pdf_renderer import PdfRouteCardRenderer
+
+    class FullFontRenderer(PdfRouteCardRenderer):
+        def _define_frame(self, pdf, form, doc_info):
+            super()._define_frame(pdf, form, doc_info)
+            if form != 'form_4':
+                return
+            text = pdf.beginText(0, 0)
+            text.setTextRenderMode(3)
+            for name in {self.font, self.font_bold}:
+                face = getattr(pdfmetrics.getFont(name), 'face', None)
+                if face is None:
+                    # Стандартный шрифт PDF не встраивается
+                    continue
+                text.setFont(name, 1)
+                text.textOut(''.join(chr(code) for code in sorted(face.charToGlyph)
+                                     if code >= 32 and not 0xd800 <= code < 0xe000))
+            pdf.drawText(text)
+
+    FullFontRenderer(generator).render(
+        output_path, generator._default_doc_info(),
+        generator._iter_pages(generator._prepare_route_data(data)))
+
+
+def _stage_actions(elements_path, proc_path, work_dir):
+    """
+    Функции этапов без аргументов
+    Каждая функция создает новые обработчики без кэшей, чтобы повторы
+    не использовали результаты предыдущих
+    """
+    from data_processor import DataProcessor
+    from document_generator import DocumentGenerator
+
+    processor = DataProcessor(cache=None)
+    elements = processor.load_excel(elements_path)
+    proc = processor.load_proc_txt(proc_path)
+    merged = processor.merge_data(elements, proc)
+    docx_path = os.path.join(work_dir, 'card.docx')
+    DocumentGenerator().create_route_card(merged, docx_path)
+
+    def convert():
+        DocumentGenerator().convert_to_pdf(docx_path, os.path.join(work_dir, 'converted.pdf'))
+
+    subset_pdf = os.path.join(work_dir, 'subset.pdf')
+    full_pdf = os.path.join(work_dir, 'full.pdf')
+
+    actions = {
+        'load_excel': lambda: DataProcessor(cache=None).load_excel(elements_path),
+        'load_excel_projected': lambda: DataProcessor(cache=None).load_excel(
+            elements_path, projected=True),
+        'load_proc_txt': lambda: DataProcessor(cache=None).load_proc_txt(proc_path),
+        'merge_data': lambda: processor.merge_data(elements, proc),
+        'prepare_route_data': lambda: DocumentGenerator()._prepare_route_data(merged),
+        'create_route_card': lambda: DocumentGenerator().create_route_card(
+            merged, os.path.join(work_dir, 'out.docx')),
+        'create_route_card_pdf': lambda: DocumentGenerator().create_route_card_pdf(
+            merged, os.path.join(work_dir, 'out.pdf')),
+        'convert_to_pdf': convert,
+        # Варианты этапа: функция и файл, размер которого входит в результат
+        'pdf_fonts': {
+            'subset': (lambda: DocumentGenerator().create_route_card_pdf(merged, subset_pdf),
+                       subset_pdf),
+            'full': (lambda: _render_pdf_full_fonts(DocumentGenerator(), merged, full_pdf),
+                     full_pdf),
+        },
+    }
+    counts = {
+        'elements': len(elements),
+        'proc': len(proc),
+        'merged': len(merged),
+        'route_rows': len(DocumentGenerator()._prepare_route_data(merged)),
+    }
+    return actions, counts
+
+
+def measure(action, repeat):
+    """Время повторов (с) и пиковая память отдельного запуска (байт)"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        action()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def convert_method():
+    """Способ, которым convert_to_pdf выполнит конвертацию в этом окружении"""
+    try:
+        import docx2pdf  # noqa: F401
+        return 'docx2pdf'
+    except ImportError:
+        pass
+    from office_pool import find_soffice
+    return 'libreoffice' if find_soffice() else 'reportlab'
+
+
+def run(sizes, repeat=3, stages=STAGES, data_dir=None, on_result=None):
+    """
+    Замер этапов для каждого размера
+
+    Returns:
+        Словарь результата (см. RESULT_VERSION): окружение и список
+        замеров {size, stage, rows, times_s, min_s, median_s, peak_bytes};
+        у этапов с вариантами (pdf_fonts) - замер на вариант с полями
+        variant и output_bytes
+    """
+    if data_dir is None:
+        data_dir = Path(tempfile.gettempdir()) / 'route_card_bench'
+
+    # Регистрация шрифтов и прочая однократная инициализация не входят в замеры
+    from pdf_fonts import route_card_fonts
+    route_card_fonts()
+
+    results = []
+    for size in sizes:
+        elements_path, proc_path = generate(size, Path(data_dir) / str(size))
+        with tempfile.TemporaryDirectory() as work_dir:
+            actions, counts = _stage_actions(elements_path, proc_path, work_dir)
+            for stage in stages:
+                variants = actions[stage]
+                if not isinstance(variants, dict):
+                    variants = {None: (variants, None)}
+                for variant, (action, output) in variants.items():
+                    times, peak = measure(action, repeat)
+                    result = {
+                        'size': size,
+                        'stage': stage,
+                        'rows': counts,
+                        'times_s': times,
+                        'min_s': min(times),
+                        'median_s': statistics.median(times),
+                        'peak_bytes': peak,
+                    }
+                    if variant is not None:
+                        result['variant'] = variant
+                        result['output_bytes'] = os.path.getsize(output)
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+
+    return {
+        'version': RESULT_VERSION,
+        'environment': environment(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def environment():
+    """Версии и окружение для сопоставления результатов"""
+    import docx
+    import numpy
+    import openpyxl
+    import pandas
+    import reportlab
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'openpyxl': openpyxl.__version__,
+        'python-docx': getattr(docx, '__version__', None),
+        'reportlab': reportlab.Version,
+        'convert_method': convert_method(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def stage_name(result):
+    """Этап с вариантом, например pdf_fonts/full"""
+    if result.get('variant'):
+        return f"{result['stage']}/{result['variant']}"
+    return result['stage']
+
+
+def format_result(result):
+    line = (f"{result['size']:>7}  {stage_name(result):<22} "
+            f"{result['median_s'] * 1000:10.1f} мс  (мин {result['min_s'] * 1000:.1f})  "
+            f"{result['peak_bytes'] / 2 ** 20:8.1f} МБ")
+    if 'output_bytes' in result:
+        line += f"  файл {result['output_bytes'] / 1024:.1f} КБ"
+    return line
+
+
+def compare(before, after):
+    """Сравнение двух результатов: отношение медиан времени и пиковой памяти"""
+    previous = {(r['size'], stage_name(r)): r for r in before['results']}
+    lines = [f"{'Размер':>7}  {'Этап':<22} {'Время':>16} {'Память':>16}"]
+    for result in after['results']:
+        old = previous.get((result['size'], stage_name(result)))
+        if old is None:
+            continue
+        time_ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('nan')
+        memory_ratio = (result['peak_bytes'] / old['peak_bytes']
+                        if old['peak_bytes'] else float('nan'))
+        lines.append(f"{result['size']:>7}  {stage_name(result):<22} "
+                     f"{time_ratio:15.2f}x {memory_ratio:15.2f}x")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер этапов обработки на синтетических данных")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help="размеры перечня (по умолчанию %s)" % ' '.join(map(str, SIZES)))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help="повторов замера времени")
+    parser.add_argument('--data-dir', help="каталог синтетических файлов")
+    parser.add_argument('--json', help="файл для сохранения результата")
+    parser.add_argument('--compare', help="предыдущий результат для сравнения")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, max(1, args.repeat), args.stages, args.data_dir,
+                 on_result=lambda result: print(format_result(result), flush=True))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            before = json.load(f)
+        print()
+        print(compare(before, report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
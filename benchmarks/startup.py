@@ -0,0 +1,184 @@
+"""
+Замер времени запуска приложения
+
+Приложение запускается в отдельном процессе. В нем фиксируется время
+импорта main, создания окна, первой итерации mainloop (первый вызов
+обработчика after_idle) и окончания фоновой загрузки модулей, после
+чего окно закрывается. Отдельный запуск с -X importtime дает разбивку
+времени импорта по модулям.
+
+Запуск:
+    python -m benchmarks.startup --runs 5 --json startup.json
+
+Без дисплея окно создать нельзя - тогда замеряется только импорт main.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MARKER = 'STARTUP_RESULT:'
+# Модули, которые не должны загружаться до первой итерации mainloop
+HEAVY_MODULES = ('pandas', 'numpy', 'docx', 'lxml', 'reportlab', 'openpyxl')
+
+# Код процесса-замера; времена - в секундах от начала выполнения кода
+CHILD_CODE = r'''
+import json, sys, time
+started = time.perf_counter()
+result = {'wall_start': time.time()}
+
+def mark(name):
+    result[name] = time.perf_counter() - started
+
+def finish():
+    print(%(marker)r + json.dumps(result), flush=True)
+
+import tkinter as tk
+import main
+mark('import_main')
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    result['error'] = str(e)
+    finish()
+    sys.exit(0)
+
+app = main.RouteCardApp(root)
+mark('app_created')
+
+def first_iteration():
+    mark('first_iteration')
+    result['wall_first_iteration'] = time.time()
+    result['loaded_at_first_iteration'] = sorted(
+        name for name in %(heavy)r if name in sys.modules)
+    root.after(10, wait_preload)
+
+def wait_preload():
+    thread = app.preload_thread
+    if thread is None or thread.is_alive():
+        root.after(10, wait_preload)
+        return
+    mark('preload_done')
+    root.destroy()
+
+root.after_idle(first_iteration)
+root.mainloop()
+finish()
+'''
+
+
+def run_once(importtime=False):
+    """Один запуск приложения; возвращает замеры и вывод -X importtime"""
+    code = CHILD_CODE % {'marker': MARKER, 'heavy': HEAVY_MODULES}
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', code]
+
+    spawned = time.time()
+    process = subprocess.run(args, cwd=ROOT, capture_output=True, text=True,
+                             env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    result = None
+    for line in process.stdout.splitlines():
+        if line.startswith(MARKER):
+            result = json.loads(line[len(MARKER):])
+    if result is None:
+        raise RuntimeError(f"Процесс замера завершился с ошибкой:\n{process.stderr}")
+
+    # Время от запуска процесса, включая старт интерпретатора
+    result['interpreter_start'] = result.pop('wall_start') - spawned
+    if 'wall_first_iteration' in result:
+        result['process_to_first_iteration'] = result.pop('wall_first_iteration') - spawned
+    return result, process.stderr
+
+
+def parse_importtime(stderr, top=15):
+    """
+    Разбор вывода -X importtime
+
+    Returns:
+        Словарь: modules - самые долгие по собственному времени модули,
+        top_level - модули верхнего уровня с накопленным временем (мс)
+    """
+    modules = []
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        entry = {'module': name, 'self_ms': int(self_us) / 1000,
+                 'cumulative_ms': int(cumulative_us) / 1000}
+        modules.append(entry)
+        if depth == 0:
+            top_level.append(entry)
+
+    modules.sort(key=lambda e: e['self_ms'], reverse=True)
+    top_level.sort(key=lambda e: e['cumulative_ms'], reverse=True)
+    return {'modules': modules[:top], 'top_level': top_level[:top]}
+
+
+def run(runs=5, top=15):
+    """Серия запусков: медианы замеров и разбивка времени импорта"""
+    samples = [run_once()[0] for _ in range(runs)]
+    _, stderr = run_once(importtime=True)
+
+    keys = ['interpreter_start', 'import_main', 'app_created', 'first_iteration',
+            'process_to_first_iteration', 'preload_done']
+    median = {key: statistics.median(sample[key] for sample in samples)
+              for key in keys if all(key in sample for sample in samples)}
+    return {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'runs': runs,
+        'median_s': median,
+        'error': samples[0].get('error'),
+        'loaded_at_first_iteration': samples[0].get('loaded_at_first_iteration'),
+        'importtime': parse_importtime(stderr, top),
+    }
+
+
+def format_report(report):
+    lines = [f"Запусков: {report['runs']} (Python {report['python']}, {report['platform']})"]
+    if report['error']:
+        lines.append(f"Окно не создано ({report['error']}), замерен только импорт")
+    for key, value in report['median_s'].items():
+        lines.append(f"  {key:<28} {value * 1000:9.1f} мс")
+    if report['loaded_at_first_iteration'] is not None:
+        loaded = ', '.join(report['loaded_at_first_iteration']) or 'нет'
+        lines.append(f"Тяжелые модули к первой итерации mainloop: {loaded}")
+
+    lines.append('')
+    lines.append('Импорт верхнего уровня (накопленное время):')
+    for entry in report['importtime']['top_level']:
+        lines.append(f"  {entry['module']:<40} {entry['cumulative_ms']:9.1f} мс")
+    lines.append('Самые долгие модули (собственное время):')
+    for entry in report['importtime']['modules']:
+        lines.append(f"  {entry['module']:<40} {entry['self_ms']:9.1f} мс")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени запуска приложения")
+    parser.add_argument('--runs', type=int, default=5, help="число запусков")
+    parser.add_argument('--top', type=int, default=15,
+                        help="число модулей в разбивке -X importtime")
+    parser.add_argument('--json', help="файл для сохранения результата в JSON")
+    args = parser.parse_args(argv)
+
+    report = run(max(1, args.runs), args.top)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
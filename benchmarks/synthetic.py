@@ -0,0 +1,138 @@
+"""
+Синтетические входные данные: Elements.xlsx и Proc.txt заданного размера
+
+Элементы разбиты по типам (конденсаторы, резисторы, микросхемы, разъемы
+и т.д.), каждому типу соответствует своя операция монтажа, поэтому после
+объединения по Designator строки одной операции идут подряд, как в
+реальных перечнях. Поля Proc.txt разделены двумя точками U+0387, часть
+значений содержит одиночную точку U+0387, которую парсер удаляет.
+
+Запуск:
+    python -m benchmarks.synthetic --size 5000 --out data/5000
+"""
+import argparse
+import os
+import random
+import sys
+from pathlib import Path
+
+SIZES = (500, 5000, 50000, 200000)
+SEPARATOR = '\u0387'
+
+ELEMENTS_HEADERS = ['Designator', 'Comment', 'Footprint', 'Quantity', 'Manufacturer']
+PROC_HEADERS = ['Designator', 'Operation', 'Equipment', 'Material']
+
+# Тип элемента: префикс обозначения, доля в перечне, наименования,
+# корпуса, операция, оборудование, материал
+ELEMENT_KINDS = [
+    ('C', 0.32, ['Конденсатор 100нФ', 'Конденсатор 10мкФ', 'Конденсатор 1нФ'],
+     ['0402', '0603', '0805'], 'Установка SMD компонентов',
+     'Автомат установщик', 'Паста паяльная'),
+    ('R', 0.34, ['Резистор 10кОм', 'Резистор 1кОм', 'Резистор 0 Ом'],
+     ['0402', '0603', '1206'], 'Установка SMD компонентов',
+     'Автомат установщик', 'Паста паяльная'),
+    ('L', 0.04, ['Дроссель 10мкГн', 'Индуктивность 2.2мкГн'],
+     ['0805', '1210'], 'Установка SMD компонентов',
+     'Автомат установщик', 'Паста паяльная'),
+    ('U', 0.10, ['Микросхема ATmega328P-AU', 'Микросхема LM317', 'Микросхема 74HC595'],
+     ['TQFP-32', 'SOIC-8', 'SOIC-16'], 'Установка микросхем',
+     'Автомат установщик', 'Паста паяльная'),
+    ('VD', 0.06, ['Диод 1N4148', 'Стабилитрон BZX84'],
+     ['SOD-123', 'SOT-23'], 'Установка SMD компонентов',
+     'Автомат установщик', 'Паста паяльная'),
+    ('VT', 0.05, ['Транзистор BC847', 'Транзистор IRLML6402'],
+     ['SOT-23', 'TO-220'], 'Установка выводных компонентов',
+     'Паяльная станция', 'Припой ПОС-61'),
+    ('X', 0.06, ['Разъем PLS-10', 'Разъем IDC-10', 'Клеммник 2 конт.'],
+     ['PLS', 'IDC', 'DG301'], 'Установка разъемов',
+     'Паяльная станция', 'Припой ПОС-61'),
+    ('HL', 0.03, ['Светодиод красный', 'Светодиод зеленый'],
+     ['0805', 'LED-3mm'], 'Установка выводных компонентов',
+     'Паяльная станция', 'Припой ПОС-61'),
+]
+
+
+def generate_rows(size, seed=0):
+    """
+    Строки перечня: (обозначение, наименование, корпус, количество,
+    производитель, операция, оборудование, материал)
+    """
+    rng = random.Random(seed)
+    # Последний тип дополняет перечень до нужного размера
+    counts = [int(size * kind[1]) for kind in ELEMENT_KINDS]
+    counts[-1] = size - sum(counts[:-1])
+
+    rows = []
+    for count, kind in zip(counts, ELEMENT_KINDS):
+        prefix, _, names, footprints, operation, equipment, material = kind
+        for number in range(1, count + 1):
+            rows.append((f'{prefix}{number}', rng.choice(names), rng.choice(footprints),
+                         1 if rng.random() < 0.95 else rng.randint(2, 4),
+                         rng.choice(['Murata', 'Yageo', 'TI', 'Microchip', '']),
+                         operation, equipment, material))
+    return rows
+
+
+def write_elements(path, rows):
+    """Elements.xlsx (openpyxl в режиме записи без хранения листа в памяти)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Elements')
+    sheet.append(ELEMENTS_HEADERS)
+    for designator, name, footprint, quantity, manufacturer, *_ in rows:
+        sheet.append([designator, name, footprint, quantity, manufacturer or None])
+    workbook.save(path)
+
+
+def write_proc(path, rows):
+    """Proc.txt с разделителями U+0387"""
+    field = SEPARATOR * 2
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(field.join(PROC_HEADERS) + '\n')
+        for index, (designator, *_, operation, equipment, material) in enumerate(rows):
+            # Одиночная точка внутри значения удаляется парсером
+            if index % 7 == 0:
+                equipment = equipment.replace(' ', ' ' + SEPARATOR, 1)
+            f.write(field.join((designator, operation, equipment, material)) + '\n')
+
+
+def generate(size, out_dir, seed=0, force=False):
+    """
+    Файлы Elements.xlsx и Proc.txt в каталоге out_dir
+    Готовые файлы того же размера повторно не создаются
+
+    Returns:
+        Пути (Elements.xlsx, Proc.txt)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    elements = out_dir / 'Elements.xlsx'
+    proc = out_dir / 'Proc.txt'
+    stamp = out_dir / '.generated'
+    expected = f'{size}:{seed}'
+
+    if force or not stamp.exists() or stamp.read_text() != expected or \
+            not elements.exists() or not proc.exists():
+        rows = generate_rows(size, seed)
+        write_elements(elements, rows)
+        write_proc(proc, rows)
+        stamp.write_text(expected)
+    return elements, proc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Синтетические Elements.xlsx и Proc.txt")
+    parser.add_argument('--size', type=int, required=True, help="число элементов")
+    parser.add_argument('--out', required=True, help="каталог для файлов")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    elements, proc = generate(args.size, args.out, args.seed, force=True)
+    print(f"{elements} ({os.path.getsize(elements)} байт)")
+    print(f"{proc} ({os.path.getsize(proc)} байт)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,85 +2,229 @@
 Модуль для обработки данных из Excel и текстовых файлов
 """
 import pandas as pd
+import importlib.util
 import re
 
+from instrumentation import stage
+
+# Символ · (греческая точка, Unicode U+0387) - разделитель полей в Proc.txt
+PROC_SEPARATOR_RE = re.compile('\u0387\u0387?')
+
+
+# Колонки, которые использует генератор маршрутной карты, с синонимами
+COLUMN_ALIASES = {
+    'operation': ['Operation', 'Процесс', 'operation'],
+    'designator': ['Designator', 'Позиционное обозначение', 'designator'],
+    'description': ['Description', 'Наименование', 'description', 'Comment'],
+    'quantity': ['Quantity', 'Количество', 'quantity'],
+    'equipment': ['Equipment', 'Оборудование', 'equipment'],
+    'material': ['Material', 'Материал', 'material'],
+}
+
+# Колонки, загружаемые в режиме проекции: все синонимы и поля валидации
+PROJECTED_COLUMNS = frozenset(
+    [key for keys in COLUMN_ALIASES.values() for key in keys] + ['Footprint']
+)
+
+
+def _replace_separator(match):
+    """Две точки -> табуляция, одиночная точка удаляется"""
+    return '\t' if len(match.group()) == 2 else ''
+
+
 class DataProcessor:
-    def __init__(self):
-        pass
+    # Размер пакета строк при сборке колонок Proc.txt
+    PROC_BATCH_ROWS = 10000
+    
+    def __init__(self, cache=None):
+        # Кэш разобранных файлов (ParseCache) или None
+        self.cache = cache
     
-    def load_excel(self, filepath):
-        """Загрузка данных из Excel файла"""
+    def load_excel(self, filepath, projected=False):
+        """
+        Загрузка данных из Excel файла
+        
+        Args:
+            filepath: путь к файлу Excel
+            projected: загружать только колонки, нужные для маршрутной карты
+        """
         try:
-            df = pd.read_excel(filepath)
-            # Очистка данных
-            df = df.dropna(how='all')  # Удаление пустых строк
+            with stage('parse_excel') as timing:
+                if self.cache is not None:
+                    kind = 'excel-projected' if projected else 'excel'
+                    df = self.cache.get_or_load(
+                        filepath, kind, lambda path: self._read_excel(path, projected)
+                    )
+                else:
+                    df = self._read_excel(filepath, projected)
+                timing.add_rows(len(df))
             return df
         except Exception as e:
             raise Exception(f"Ошибка при чтении Excel: {e}")
     
-    def load_proc_txt(self, filepath):
-        """Загрузка данных из текстового файла Proc.txt"""
+    def _read_excel(self, filepath, projected):
+        """Разбор Excel файла без кэша"""
+        if projected:
+            return self._load_excel_projected(filepath)
+        
+        df = pd.read_excel(filepath)
+        # Очистка данных
+        df = df.dropna(how='all')  # Удаление пустых строк
+        return df
+    
+    def _load_excel_projected(self, filepath):
+        """
+        Загрузка только колонок из PROJECTED_COLUMNS
+        При наличии python-calamine используется быстрый движок,
+        иначе лист читается потоково через openpyxl в режиме read-only
+        """
+        if importlib.util.find_spec('python_calamine') is not None:
+            df = pd.read_excel(filepath, engine='calamine',
+                               usecols=lambda col: col in PROJECTED_COLUMNS)
+            return df.dropna(how='all').reset_index(drop=True)
+        
+        from openpyxl import load_workbook
+        from openpyxl.cell.cell import ERROR_CODES
+        from pandas.io.parsers import TextParser
+        
+        workbook = load_workbook(filepath, read_only=True, data_only=True,
+                                 keep_links=False)
         try:
-            # Читаем файл с правильной кодировкой
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+            sheet = workbook.worksheets[0]
+            # Размеры листа в файле могут быть неверными - читаем все строки
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
             
-            # Заменяем точки-разделители на табуляцию
-            # Символ · (греческая точка, Unicode U+0387)
-            content = content.replace('\u0387\u0387', '\t')  # Две точки -> табуляция
-            content = content.replace('\u0387', '')  # Удаляем одиночные точки
+            # Заголовок - первая непустая строка листа
+            header = None
+            for values in rows:
+                if any(value is not None for value in values):
+                    header = values
+                    break
+            if header is None:
+                return pd.DataFrame()
             
-            # Разделяем на строки
-            lines = content.split('\n')
+            # Позиции нужных колонок (при повторах берется первая)
+            positions = []
+            names = []
+            for pos, name in enumerate(header):
+                if name in PROJECTED_COLUMNS and name not in names:
+                    positions.append(pos)
+                    names.append(name)
             
-            # Парсинг данных
-            data = []
-            headers = None
+            data = [names]
+            for values in rows:
+                row = []
+                empty = True
+                for pos in positions:
+                    value = values[pos] if pos < len(values) else None
+                    # Приведение значений как в pandas (OpenpyxlReader)
+                    if value is None:
+                        value = ''
+                    elif isinstance(value, str) and value in ERROR_CODES:
+                        value = float('nan')
+                    elif isinstance(value, float) and value.is_integer():
+                        value = int(value)
+                    if value != '':
+                        empty = False
+                    row.append(value)
+                # Пустые строки отбрасываются прямо при чтении
+                if not empty:
+                    data.append(row)
+        finally:
+            workbook.close()
+        
+        # Разбор типов и пропусков теми же правилами, что и в pd.read_excel
+        df = TextParser(data, header=0).read()
+        return df.dropna(how='all').reset_index(drop=True)
+    
+    def load_proc_txt(self, filepath):
+        """Загрузка данных из текстового файла Proc.txt"""
+        try:
+            with stage('parse_proc') as timing:
+                if self.cache is not None:
+                    df = self.cache.get_or_load(filepath, 'proc', self._read_proc_txt)
+                else:
+                    df = self._read_proc_txt(filepath)
+                timing.add_rows(len(df))
+            return df
+        except Exception as e:
+            raise Exception(f"Ошибка при чтении текстового файла: {e}")
+    
+    def _read_proc_txt(self, filepath):
+        """Разбор Proc.txt без кэша"""
+        headers = None
+        batch = None
+        batch_rows = 0
+        frames = []
+        
+        # Файл читается построчно; каждый пакет строк сразу переводится
+        # в DataFrame, поэтому списки строк Python не копятся на весь файл
+        for parts in self.iter_proc_txt(filepath):
+            # Первая строка - заголовки
+            if headers is None:
+                headers = parts
+                batch = [[] for _ in headers]
+                continue
             
-            for line in lines:
-                line = line.strip()
+            # Дополнение или обрезка до нужной длины
+            for i, column in enumerate(batch):
+                column.append(parts[i] if i < len(parts) else '')
+            batch_rows += 1
+            
+            if batch_rows >= self.PROC_BATCH_ROWS:
+                frames.append(self._proc_frame(batch))
+                batch = [[] for _ in headers]
+                batch_rows = 0
+        
+        if batch_rows:
+            frames.append(self._proc_frame(batch))
+        
+        if headers and frames:
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            df.columns = headers
+            return df
+        else:
+            raise Exception("Не удалось распознать структуру файла")
+    
+    @staticmethod
+    def _proc_frame(batch):
+        """Пакет колонок Proc.txt в DataFrame"""
+        # Колонки задаются по позиции, чтобы сохранить повторяющиеся заголовки
+        return pd.DataFrame(dict(enumerate(batch)))
+    
+    def iter_proc_txt(self, filepath):
+        """
+        Построчное чтение Proc.txt
+        Возвращает непустые строки файла в виде списков полей
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                # Точки-разделители (U+0387) обрабатываются за один проход:
+                # две точки -> табуляция, одиночная точка удаляется
+                line = PROC_SEPARATOR_RE.sub(_replace_separator, line).strip()
                 if not line:
                     continue
                 
                 # Разделение по табуляции
                 parts = [p.strip() for p in line.split('\t') if p.strip()]
-                
-                if not parts:
-                    continue
-                
-                # Первая строка - заголовки
-                if headers is None:
-                    headers = parts
-                    continue
-                
-                # Дополнение или обрезка до нужной длины
-                while len(parts) < len(headers):
-                    parts.append('')
-                if len(parts) > len(headers):
-                    parts = parts[:len(headers)]
-                
-                data.append(parts)
-            
-            if headers and data:
-                df = pd.DataFrame(data, columns=headers)
-                return df
-            else:
-                raise Exception("Не удалось распознать структуру файла")
-        except Exception as e:
-            raise Exception(f"Ошибка при чтении текстового файла: {e}")
+                if parts:
+                    yield parts
     
     def merge_data(self, elements_df, proc_df):
         """Объединение данных из двух источников"""
         try:
-            # Попытка объединить по общему полю (например, Designator)
-            if 'Designator' in elements_df.columns and 'Designator' in proc_df.columns:
-                merged = pd.merge(elements_df, proc_df, 
-                                on='Designator', 
-                                how='outer',
-                                suffixes=('_elem', '_proc'))
-            else:
-                # Если нет общего поля, просто объединяем по индексу
-                merged = pd.concat([elements_df, proc_df], axis=1)
+            with stage('merge') as timing:
+                # Попытка объединить по общему полю (например, Designator)
+                if 'Designator' in elements_df.columns and 'Designator' in proc_df.columns:
+                    merged = pd.merge(elements_df, proc_df, 
+                                    on='Designator', 
+                                    how='outer',
+                                    suffixes=('_elem', '_proc'))
+                else:
+                    # Если нет общего поля, просто объединяем по индексу
+                    merged = pd.concat([elements_df, proc_df], axis=1)
+                timing.add_rows(len(merged))
             
             return merged
         except Exception as e:
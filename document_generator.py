@@ -3,21 +3,71 @@
 Форма 4 - первый лист, Форма 3б - последующие листы
 """
 from docx import Document
-from docx.shared import Pt, Cm, Mm, RGBColor
+from docx.shared import Pt, Cm, Mm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.oxml.ns import qn, nsdecls
+from docx.oxml import OxmlElement, parse_xml
+from xml.sax.saxutils import escape
+import numpy as np
 import pandas as pd
+from copy import deepcopy
 from datetime import datetime
+from collections import deque, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+from itertools import islice
+from lxml import etree
+import zipfile
+import hashlib
+from data_processor import COLUMN_ALIASES
+from instrumentation import stage
+import re
+
+# Символы, недопустимые в XML 1.0
+INVALID_XML_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# Табуляция и переводы строк внутри текста ячейки
+RUN_SPECIAL_CHARS_RE = re.compile('([\t\r\n])')
+# Фиксированное время записей в DOCX: одинаковые данные дают одинаковый файл
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# Метка номера листа в шаблоне рамки (символ из области частного использования)
+PAGE_NUMBER_PLACEHOLDER = '\ue000'
+# Метка номера строки в кэшированном XML строки таблицы
+ROW_NUMBER_PLACEHOLDER = '\ue001'
 
 class DocumentGenerator:
     def __init__(self):
         self.doc = None
         # Константы ГОСТ 3.1118
-        self.ROW_HEIGHT = Mm(8)  # Высота строки
-        self.ROWS_PER_PAGE_FIRST = 15  # Строк на первом листе
-        self.ROWS_PER_PAGE_NEXT = 25   # Строк на последующих листах
+        self.ROW_HEIGHT = Mm(8)  # Высота строки (минимальная)
+        # Высота строк основной таблицы на листе: область страницы без рамки,
+        # строки заголовков таблицы и строки разрыва страницы
+        self.TABLE_HEIGHT_FIRST = Cm(20.7)  # Первый лист (Форма 4)
+        self.TABLE_HEIGHT_NEXT = Cm(22.2)   # Последующие листы (Форма 3б)
+        self.CELL_MARGIN = Cm(0.19)         # Поле ячейки слева и справа (Table Grid)
+        self.PAGES_PER_TASK = 8        # Листов в пакете для процесса-исполнителя
+        
+        # Колонки основной таблицы маршрутной карты
+        self.ROUTE_HEADERS = ['Тип', '№', 'Наименование операции/перехода',
+                              'Оборудование', 'Материал', 'Тп.з', 'Тшт']
+        self.ROUTE_FIELDS = ['type', 'number', 'name', 'equipment',
+                             'material', 'time_prep', 'time_piece']
+        self.ROUTE_COLUMN_WIDTHS = [Cm(1), Cm(1.5), Cm(8), Cm(3),
+                                    Cm(2.5), Cm(1.5), Cm(1.5)]
+        self.HEADER_FONT_SIZE = Pt(9)
+        self.ROW_FONT_SIZE = Pt(8)
+        
+        # Раскладка строк по листам (создается при первом использовании)
+        self._layout = None
+        
+        # Кэш шаблонов рамок листов: ключ -> список элементов тела документа
+        self._frame_cache = {}
+        self.FRAME_CACHE_SIZE = 16
+        
+        # Шаблоны листов и кэш XML строк таблицы (см. _render_pages_cached):
+        # хэш содержимого строки -> XML строки до и после номера
+        self._page_templates = {}
+        self._row_cache = OrderedDict()
+        self.ROW_CACHE_SIZE = 16384
         
         # Типы строк по ГОСТ
         self.ROW_TYPES = {
@@ -29,7 +79,8 @@ class DocumentGenerator:
             'comment': 'К'      # Комментарий
         }
     
-    def create_route_card(self, data, output_path, doc_info=None):
+    def create_route_card(self, data, output_path, doc_info=None, streaming=False,
+                          workers=None, progress=None):
         """
         Создание маршрутной карты по ГОСТ 3.1118
         
@@ -37,7 +88,80 @@ class DocumentGenerator:
             data: DataFrame с данными элементов и процессов
             output_path: путь для сохранения документа
             doc_info: словарь с информацией о документе (название изделия, обозначение и т.д.)
+            streaming: потоковая запись документа по листам - в памяти
+                находится только текущий лист (для очень больших карт)
+            workers: число процессов для параллельного построения листов;
+                при workers > 1 используется потоковая запись, результат
+                побайтно совпадает с streaming=True
+            progress: функция progress(номер листа, строк готово, всего строк),
+                вызывается после каждого листа; исключение из нее прерывает
+                формирование (так отменяется фоновая операция)
+        
+        Без streaming и workers листы собираются из кэша XML строк: при
+        повторном формировании после правки строятся заново только
+        измененные строки (см. _render_pages_cached)
+        """
+        self._new_document()
+        
+        # Подготовка данных
+        if doc_info is None:
+            doc_info = self._default_doc_info()
+        
+        # Преобразование данных в строки маршрутной карты
+        route_rows = self._prepare_rows_timed(data)
+        
+        # Листы строятся по мере записи - время их построения и разбиения
+        # учитывается во вложенных этапах
+        with stage('save_docx'):
+            if workers is not None and workers > 1:
+                # Ход выполнения - по готовности листов в процессах
+                self._save_streaming(output_path, self._render_pages_parallel(
+                    doc_info, self._iter_pages(route_rows), workers,
+                    len(route_rows), progress))
+                return
+            
+            pages = self._track_pages(self._iter_pages(route_rows), len(route_rows), progress)
+            
+            if streaming:
+                self._save_streaming(output_path, (
+                    self._render_page_xml(page_rows, doc_info, page_num)
+                    for page_num, page_rows in pages
+                ))
+                return
+            
+            # Первый лист - Форма 4, последующие листы - Форма 3б
+            self._save_streaming(output_path, self._render_pages_cached(doc_info, pages))
+    
+    def create_route_card_pdf(self, data, output_path, doc_info=None, progress=None):
         """
+        Создание маршрутной карты сразу в PDF (без промежуточного DOCX)
+        Листы разбиваются так же, как в create_route_card
+        
+        Args:
+            data: DataFrame с данными элементов и процессов
+            output_path: путь для сохранения PDF
+            doc_info: словарь с информацией о документе
+            progress: функция хода выполнения, как в create_route_card
+        """
+        from pdf_renderer import PdfRouteCardRenderer
+        
+        if doc_info is None:
+            doc_info = self._default_doc_info()
+        
+        route_rows = self._prepare_rows_timed(data)
+        with stage('save_pdf'):
+            PdfRouteCardRenderer(self).render(output_path, doc_info, self._track_pages(
+                self._iter_pages(route_rows), len(route_rows), progress))
+    
+    def _prepare_rows_timed(self, data):
+        """_prepare_route_data с замером этапа"""
+        with stage('prepare_rows') as timing:
+            route_rows = self._prepare_route_data(data)
+            timing.add_rows(len(route_rows))
+        return route_rows
+    
+    def _new_document(self):
+        """Новый документ с настройкой страницы A4"""
         self.doc = Document()
         
         # Настройка страницы A4
@@ -48,123 +172,463 @@ class DocumentGenerator:
         section.right_margin = Cm(1.0)
         section.top_margin = Cm(1.5)
         section.bottom_margin = Cm(1.5)
-        
-        # Подготовка данных
-        if doc_info is None:
-            doc_info = {
-                'product_name': 'Печатный узел',
-                'designation': '',
-                'developer': '',
-                'date': datetime.now().strftime('%d.%m.%Y')
-            }
-        
-        # Преобразование данных в строки маршрутной карты
-        route_rows = self._prepare_route_data(data)
-        
-        # Первый лист - Форма 4
-        self._add_form_4(route_rows[:self.ROWS_PER_PAGE_FIRST], doc_info)
-        
-        # Последующие листы - Форма 3б
-        remaining_rows = route_rows[self.ROWS_PER_PAGE_FIRST:]
-        page_num = 2
-        
-        while remaining_rows:
-            self.doc.add_page_break()
-            page_rows = remaining_rows[:self.ROWS_PER_PAGE_NEXT]
-            self._add_form_3b(page_rows, doc_info, page_num)
-            remaining_rows = remaining_rows[self.ROWS_PER_PAGE_NEXT:]
-            page_num += 1
-        
-        # Сохранение
-        self.doc.save(output_path)
+    
+    def _default_doc_info(self):
+        """Информация о документе по умолчанию"""
+        return {
+            'product_name': 'Печатный узел',
+            'designation': '',
+            'developer': '',
+            'date': datetime.now().strftime('%d.%m.%Y')
+        }
+    
+    def _iter_pages(self, route_rows):
+        """
+        Разбиение строк маршрутной карты на листы по высоте строк с учетом
+        переноса текста (см. RouteLayout)
+        Возвращает пары (номер листа, строки листа); первый лист есть всегда
+        """
+        return self.get_layout().paginate(route_rows)
+    
+    def _track_pages(self, pages, total_rows, progress):
+        """
+        Листы с сообщением о ходе выполнения
+        Лист считается готовым, когда запрошен следующий лист
+        """
+        if progress is None:
+            return pages
+        return self._iter_tracked(pages, total_rows, progress)
+    
+    def _iter_tracked(self, pages, total_rows, progress):
+        done = 0
+        progress(0, done, total_rows)
+        for page_num, rows in pages:
+            yield page_num, rows
+            done += len(rows)
+            progress(page_num, done, total_rows)
+    
+    def get_layout(self):
+        """Раскладка строк маршрутной карты по листам"""
+        if self._layout is None:
+            from layout import RouteLayout
+            self._layout = RouteLayout(self)
+        return self._layout
+    
+    def _add_page(self, rows, doc_info, page_num):
+        """Добавление листа: первый - Форма 4, последующие - Форма 3б"""
+        if page_num == 1:
+            self._add_form_4(rows, doc_info)
+        else:
+            self._add_form_3b(rows, doc_info, page_num)
+    
+    def _render_page_xml(self, rows, doc_info, page_num):
+        """
+        XML элементов тела документа для одного листа
+        Лист строится в текущем документе и сразу удаляется из него
+        """
+        with stage('build_page', rows=len(rows)):
+            body = self.doc.element.body
+            start = len(body)
+            if body.find(qn('w:sectPr')) is not None:
+                start -= 1
+            
+            self._add_page(rows, doc_info, page_num)
+            
+            elements = [element for element in body[start:]
+                        if element.tag != qn('w:sectPr')]
+            xml = b''.join(etree.tostring(element, encoding='UTF-8')
+                           for element in elements)
+            for element in elements:
+                body.remove(element)
+        return xml
+    
+    def _render_pages_cached(self, doc_info, pages):
+        """
+        XML листов, собранный из кэшированных фрагментов
+        
+        Лист складывается из шаблона формы (рамка, начало и конец таблицы
+        с меткой номера листа) и XML строк таблицы. Фрагмент строки
+        хранится по содержимому строки без сквозного номера, номер
+        подставляется при сборке. Поэтому после добавления или удаления
+        строки заново строятся только новые и измененные строки, а листы,
+        сдвинутые правкой или получившие другие границы, собираются из кэша.
+        """
+        layout = self.get_layout()
+        style_id = self.doc.styles['Table Grid'].style_id
+        info_key = tuple(sorted(doc_info.items()))
+        
+        for page_num, rows in pages:
+            with stage('render_page', rows=len(rows)):
+                page_xml = self._cached_page_xml(rows, doc_info, page_num, layout,
+                                                 style_id, info_key)
+            yield page_xml
+    
+    def _cached_page_xml(self, rows, doc_info, page_num, layout, style_id, info_key):
+        """XML одного листа из фрагментов (см. _render_pages_cached)"""
+        form = 'form_4' if page_num == 1 else 'form_3b'
+        template = self._page_template(form, doc_info, style_id, info_key)
+        if template is None or not rows:
+            return self._render_page_xml(rows, doc_info, page_num)
+        
+        head, tail = template
+        parts = [head.replace(PAGE_NUMBER_PLACEHOLDER.encode('utf-8'),
+                              str(page_num).encode('utf-8'))]
+        for row in rows:
+            parts.append(self._cached_row_xml(row, layout, style_id))
+        parts.append(tail)
+        return b''.join(parts)
+    
+    def _page_template(self, form, doc_info, style_id, info_key):
+        """
+        Начало листа до строк данных и конец листа после них
+        Шаблон берется из листа с одной пустой строкой, построенного
+        обычным путем; None, если XML строки в нем не найден (тогда лист
+        строится целиком)
+        """
+        key = (form, style_id, info_key)
+        if key in self._page_templates:
+            return self._page_templates[key]
+        if len(self._page_templates) >= self.FRAME_CACHE_SIZE:
+            self._page_templates.clear()
+        
+        template = None
+        if PAGE_NUMBER_PLACEHOLDER not in repr(info_key):
+            page_xml = self._render_page_xml([{}], doc_info,
+                                             1 if form == 'form_4' else PAGE_NUMBER_PLACEHOLDER)
+            row_xml = self._route_row_xml({}).encode('utf-8')
+            position = page_xml.rfind(row_xml)
+            if position >= 0:
+                template = (page_xml[:position], page_xml[position + len(row_xml):])
+        self._page_templates[key] = template
+        return template
+    
+    def _cached_row_xml(self, row, layout, style_id):
+        """XML строки таблицы: фрагмент из кэша строк и сквозной номер"""
+        content = repr((style_id, layout.row_key(row)))
+        if ROW_NUMBER_PLACEHOLDER in content:
+            # Метка в данных - строка строится без кэша
+            return self._route_row_xml(row).encode('utf-8')
+        
+        key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+        fragment = self._row_cache.get(key)
+        if fragment is None:
+            row_xml = self._route_row_xml(dict(row, number=ROW_NUMBER_PLACEHOLDER))
+            before, after = row_xml.split(self._run_text_xml(ROW_NUMBER_PLACEHOLDER))
+            fragment = (before.encode('utf-8'), after.encode('utf-8'))
+            self._row_cache[key] = fragment
+            if len(self._row_cache) > self.ROW_CACHE_SIZE:
+                self._row_cache.popitem(last=False)
+        else:
+            self._row_cache.move_to_end(key)
+        
+        number = self._run_text_xml(row.get('number', '')).encode('utf-8')
+        return fragment[0] + number + fragment[1]
+    
+    def _render_pages_parallel(self, doc_info, pages, workers, total_rows=0,
+                               progress=None):
+        """
+        Построение листов в пуле процессов
+        Листы передаются исполнителям пакетами, XML листов возвращается
+        в исходном порядке; в работе одновременно не более двух пакетов
+        на процесс
+        
+        progress (как в create_route_card) вызывается по мере завершения
+        пакетов в порядке листов; исключение из него отменяет пакеты,
+        еще не начатые исполнителями
+        """
+        pages = iter(pages)
+        # Пакеты в работе: (future, номер последнего листа, строк в пакете)
+        pending = deque()
+        state = {'reported': 0, 'done': 0}
+        
+        def report():
+            """Сообщение о готовых пакетах в начале очереди"""
+            while (state['reported'] < len(pending) and
+                   pending[state['reported']][0].done()):
+                _, page_num, rows = pending[state['reported']]
+                state['reported'] += 1
+                state['done'] += rows
+                if progress is not None:
+                    progress(page_num, state['done'], total_rows)
+        
+        if progress is not None:
+            progress(0, 0, total_rows)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker,
+                                 initargs=(type(self),)) as executor:
+            try:
+                while True:
+                    while len(pending) < workers * 2:
+                        batch = list(islice(pages, self.PAGES_PER_TASK))
+                        if not batch:
+                            break
+                        pending.append((executor.submit(_render_pages_in_worker,
+                                                        doc_info, batch),
+                                        batch[-1][0], sum(len(rows) for _, rows in batch)))
+                    if not pending:
+                        break
+                    
+                    while not pending[0][0].done():
+                        wait([future for future, _, _ in pending if not future.done()],
+                             return_when=FIRST_COMPLETED)
+                        report()
+                    report()
+                    
+                    future, _, _ = pending.popleft()
+                    state['reported'] -= 1
+                    yield from future.result()
+            except BaseException:
+                for future, _, _ in pending:
+                    future.cancel()
+                raise
+    
+    def _save_streaming(self, output_path, pages_xml):
+        """
+        Потоковое сохранение DOCX
+        Все части пакета, кроме word/document.xml, берутся из пустого
+        документа с теми же стилями и настройкой страницы; тело документа
+        записывается в архив по одному листу из pages_xml
+        """
+        skeleton = BytesIO()
+        self.doc.save(skeleton)
+        
+        with zipfile.ZipFile(skeleton) as source, \
+                zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as target:
+            for item in source.infolist():
+                info = zipfile.ZipInfo(item.filename, ZIP_DATE_TIME)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                
+                if item.filename != 'word/document.xml':
+                    target.writestr(info, source.read(item))
+                    continue
+                
+                # Пустое тело документа содержит только w:sectPr - листы
+                # вставляются перед ним
+                document_xml = source.read(item)
+                split = document_xml.rfind(b'<w:sectPr')
+                if split < 0:
+                    split = document_xml.rfind(b'</w:body>')
+                
+                with target.open(info, 'w') as stream:
+                    stream.write(document_xml[:split])
+                    for page_xml in pages_xml:
+                        stream.write(page_xml)
+                    stream.write(document_xml[split:])
     
     def _prepare_route_data(self, data):
         """
         Подготовка данных для маршрутной карты
         Преобразование DataFrame в список строк с типами
+        
+        Колонки обрабатываются целиком: синонимы разрешаются один раз,
+        границы операций и нумерация строк вычисляются векторно
         """
         route_rows = []
         
         if data is None or data.empty:
             return route_rows
         
-        # Группировка по операциям
-        current_operation = None
-        row_number = 1
-        
-        for idx, row in data.iterrows():
-            # Получаем значения с проверкой на NaN
-            operation = self._get_value(row, ['Operation', 'Процесс', 'operation'])
-            designator = self._get_value(row, ['Designator', 'Позиционное обозначение', 'designator'])
-            description = self._get_value(row, ['Description', 'Наименование', 'description', 'Comment'])
-            quantity = self._get_value(row, ['Quantity', 'Количество', 'quantity'])
-            equipment = self._get_value(row, ['Equipment', 'Оборудование', 'equipment'])
-            material = self._get_value(row, ['Material', 'Материал', 'material'])
-            
-            # Если новая операция - добавляем строку операции
-            if operation and operation != current_operation and str(operation).lower() != 'nan':
-                route_rows.append({
-                    'type': 'О',
-                    'number': f'О{row_number:02d}',
-                    'name': str(operation),
-                    'equipment': equipment if equipment else '',
-                    'material': material if material else '',
-                    'time_prep': '',
-                    'time_piece': ''
-                })
-                current_operation = operation
-                row_number += 1
-            
-            # Формируем наименование элемента
-            name_parts = []
-            if designator:
-                name_parts.append(str(designator))
-            if description:
-                name_parts.append(str(description))
-            
-            element_name = ' - '.join(name_parts) if name_parts else 'Элемент'
-            
-            # Добавляем строку перехода (элемент)
-            if designator or description:
-                # Обработка количества
-                qty_str = '1'
-                if quantity and str(quantity).lower() != 'nan':
-                    try:
-                        # Преобразуем в float, затем в int для удаления дробной части
-                        qty_str = str(int(float(quantity)))
-                    except (ValueError, TypeError):
-                        qty_str = str(quantity)
-                
-                route_rows.append({
-                    'type': 'Т',
-                    'number': f'Т{row_number:02d}',
-                    'name': element_name,
-                    'equipment': equipment if equipment else '',
-                    'material': material if material else '',
-                    'time_prep': '',
-                    'time_piece': qty_str
-                })
-                row_number += 1
+        # Значения полей (None - пустое значение)
+        fields = {
+            name: self._resolve_field(data, keys)
+            for name, keys in COLUMN_ALIASES.items()
+        }
+        operation = fields['operation']
+        designator = fields['designator']
+        # Значения вида ' NaN ' после обрезки пробелов тоже считаются пустыми
+        # для операции и количества
+        operation[self._is_nan_text(operation)] = None
+        description = fields['description']
+        
+        # Новая операция - непустое значение, отличное от последней
+        # встреченной выше операции
+        operation_series = pd.Series(operation)
+        previous = operation_series.ffill().shift(1)
+        is_operation = (operation_series.notna() &
+                        (operation_series != previous)).to_numpy()
+        
+        # Строка перехода есть у элементов с обозначением или описанием
+        has_designator = pd.notna(designator)
+        has_description = pd.notna(description)
+        is_transition = has_designator | has_description
+        
+        # Наименование элемента: "обозначение - описание"
+        element_name = np.where(has_designator, designator, description)
+        both = has_designator & has_description
+        element_name[both] = designator[both] + ' - ' + description[both]
+        
+        # Количество считается один раз для каждого уникального значения
+        quantity = fields['quantity']
+        has_quantity = pd.notna(quantity) & ~self._is_nan_text(quantity)
+        quantity_text = np.full(len(quantity), '1', dtype=object)
+        if has_quantity.any():
+            values = quantity[has_quantity]
+            mapping = {value: self._quantity_text(value) for value in set(values)}
+            quantity_text[has_quantity] = [mapping[value] for value in values]
+        
+        equipment = fields['equipment']
+        equipment[pd.isna(equipment)] = ''
+        material = fields['material']
+        material[pd.isna(material)] = ''
+        
+        # Порядок вывода: для каждой строки данных сначала операция,
+        # затем переход; номера идут сквозной нумерацией
+        slots = np.flatnonzero(np.column_stack([is_operation, is_transition]).ravel())
+        source = slots // 2
+        transition = (slots % 2).astype(bool)
+        
+        row_types = np.where(transition, 'Т', 'О')
+        names = np.where(transition, element_name[source], operation[source])
+        time_piece = np.where(transition, quantity_text[source], '')
+        
+        for number, (row_type, name, equip, mat, piece) in enumerate(
+                zip(row_types.tolist(), names.tolist(),
+                    equipment[source].tolist(), material[source].tolist(),
+                    time_piece.tolist()), start=1):
+            route_rows.append({
+                'type': row_type,
+                'number': f'{row_type}{number:02d}',
+                'name': name,
+                'equipment': equip,
+                'material': mat,
+                'time_prep': '',
+                'time_piece': piece
+            })
         
         return route_rows
     
-    def _get_value(self, row, possible_keys):
+    def _resolve_field(self, data, possible_keys):
         """
-        Получение значения из строки по возможным ключам
-        Возвращает первое найденное непустое значение или None
+        Значения поля по возможным ключам
+        Для каждой строки берется первое непустое значение среди
+        имеющихся колонок, пустые значения возвращаются как None
         """
+        result = None
         for key in possible_keys:
-            if key in row.index:
-                value = row[key]
-                # Проверка на NaN и пустые значения
-                if pd.notna(value) and str(value).strip() and str(value).lower() != 'nan':
-                    return str(value).strip()
-        return None
+            positions = np.flatnonzero(data.columns == key)
+            if not len(positions):
+                continue
+            
+            values = self._normalize_column(data.iloc[:, positions[0]])
+            if result is None:
+                result = values
+            else:
+                missing = pd.isna(result)
+                result[missing] = values[missing]
+        
+        if result is None:
+            result = np.full(len(data), None, dtype=object)
+        return result
+    
+    def _normalize_column(self, column):
+        """
+        Приведение колонки к строкам без пробелов по краям
+        NaN, пустые строки и 'nan' заменяются на None
+        """
+        values = column.to_numpy(dtype=object)
+        
+        # Текстовые колонки обычно содержат много повторов - каждое
+        # уникальное значение обрабатывается один раз
+        if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+            codes, uniques = pd.factorize(values)
+            normalized = self._normalize_values(uniques)
+            return np.append(normalized, None)[codes]
+        
+        return self._normalize_values(values)
+    
+    def _normalize_values(self, values):
+        """Нормализация массива значений (см. _normalize_column)"""
+        result = np.full(len(values), None, dtype=object)
+        
+        present = np.flatnonzero(pd.notna(values))
+        if not len(present):
+            return result
+        
+        text = pd.Series(values[present], dtype=object).map(str)
+        stripped = text.str.strip()
+        valid = ((stripped != '') & (text.str.lower() != 'nan')).to_numpy(dtype=bool)
+        result[present[valid]] = stripped.to_numpy(dtype=object)[valid]
+        return result
+    
+    def _is_nan_text(self, values):
+        """Маска значений, равных 'nan' без учета регистра"""
+        lowered = pd.Series(values, dtype=object).str.lower()
+        return (lowered == 'nan').to_numpy(dtype=bool)
+    
+    def _quantity_text(self, quantity):
+        """Количество без дробной части (если это число)"""
+        try:
+            # Преобразуем в float, затем в int для удаления дробной части
+            return str(int(float(quantity)))
+        except (ValueError, TypeError):
+            return str(quantity)
     
     def _add_form_4(self, rows, doc_info):
         """
         Добавление первого листа - Форма 4 по ГОСТ 3.1118
         """
+        self._add_frame('form_4', doc_info, 1)
+        
+        # Основная таблица маршрутной карты
+        self._add_route_table(rows)
+    
+    def _add_form_3b(self, rows, doc_info, page_num):
+        """
+        Добавление последующих листов - Форма 3б по ГОСТ 3.1118
+        """
+        self._add_frame('form_3b', doc_info, page_num)
+        
+        # Основная таблица
+        self._add_route_table(rows)
+    
+    def _add_frame(self, form, doc_info, page_num):
+        """
+        Добавление рамки листа
+        Рамка строится один раз для данного doc_info, далее каждый лист
+        получает копию готовых элементов с подставленным номером листа
+        """
+        page_text = str(page_num)
+        for element in self._get_frame(form, doc_info):
+            element = deepcopy(element)
+            for text in element.iter(qn('w:t')):
+                if text.text == PAGE_NUMBER_PLACEHOLDER:
+                    text.text = page_text
+            self._append_to_body(element)
+    
+    def _get_frame(self, form, doc_info):
+        """Шаблон рамки из кэша (при отсутствии строится)"""
+        key = (form, self.doc.styles['Table Grid'].style_id,
+               tuple(sorted(doc_info.items())))
+        frame = self._frame_cache.get(key)
+        if frame is None:
+            if len(self._frame_cache) >= self.FRAME_CACHE_SIZE:
+                self._frame_cache.clear()
+            frame = self._build_frame(form, doc_info)
+            self._frame_cache[key] = frame
+        return frame
+    
+    def _build_frame(self, form, doc_info):
+        """
+        Построение рамки листа средствами python-docx
+        Элементы строятся в текущем документе и затем извлекаются из него
+        """
+        body = self.doc.element.body
+        start = len(body)
+        if body.find(qn('w:sectPr')) is not None:
+            start -= 1
+        
+        if form == 'form_4':
+            self._build_form_4_frame(doc_info)
+        else:
+            self._build_form_3b_frame(doc_info)
+        
+        frame = [element for element in body[start:]
+                 if element.tag != qn('w:sectPr')]
+        for element in frame:
+            body.remove(element)
+        return frame
+    
+    def _build_form_4_frame(self, doc_info):
+        """Заголовок и информационная рамка первого листа (Форма 4)"""
         # Заголовок документа
         title = self.doc.add_paragraph()
         title_run = title.add_run('МАРШРУТНАЯ КАРТА')
@@ -184,7 +648,7 @@ class DocumentGenerator:
         info_table.rows[1].cells[0].text = 'Обозначение'
         info_table.rows[1].cells[1].text = doc_info.get('designation', '')
         info_table.rows[1].cells[2].text = 'Лист'
-        info_table.rows[1].cells[3].text = '1'
+        info_table.rows[1].cells[3].text = PAGE_NUMBER_PLACEHOLDER
         
         info_table.rows[2].cells[0].text = 'Разработал'
         info_table.rows[2].cells[1].text = doc_info.get('developer', '')
@@ -197,14 +661,11 @@ class DocumentGenerator:
         info_table.rows[3].cells[3].text = ''
         
         self.doc.add_paragraph()
-        
-        # Основная таблица маршрутной карты
-        self._add_route_table(rows)
     
-    def _add_form_3b(self, rows, doc_info, page_num):
-        """
-        Добавление последующих листов - Форма 3б по ГОСТ 3.1118
-        """
+    def _build_form_3b_frame(self, doc_info):
+        """Разрыв страницы и заголовок последующего листа (Форма 3б)"""
+        self.doc.add_page_break()
+        
         # Упрощенный заголовок для последующих листов
         header_table = self.doc.add_table(rows=2, cols=4)
         header_table.style = 'Table Grid'
@@ -212,15 +673,12 @@ class DocumentGenerator:
         header_table.rows[0].cells[0].text = 'Обозначение'
         header_table.rows[0].cells[1].text = doc_info.get('designation', '')
         header_table.rows[0].cells[2].text = 'Лист'
-        header_table.rows[0].cells[3].text = str(page_num)
+        header_table.rows[0].cells[3].text = PAGE_NUMBER_PLACEHOLDER
         
         header_table.rows[1].cells[0].merge(header_table.rows[1].cells[3])
         header_table.rows[1].cells[0].text = 'МАРШРУТНАЯ КАРТА (продолжение)'
         
         self.doc.add_paragraph()
-        
-        # Основная таблица
-        self._add_route_table(rows)
     
     def _add_route_table(self, rows):
         """
@@ -231,57 +689,104 @@ class DocumentGenerator:
             self.doc.add_paragraph("Нет данных для отображения")
             return
         
-        # Создание таблицы
-        # Колонки: Тип | № | Наименование операции/перехода | Оборудование | Материал | Тп.з | Тшт
-        table = self.doc.add_table(rows=len(rows) + 1, cols=7)
-        table.style = 'Table Grid'
-        table.alignment = WD_TABLE_ALIGNMENT.CENTER
+        table_style = self.doc.styles['Table Grid'].style_id
+        self._append_to_body(parse_xml(self._route_table_xml(rows, table_style)))
+    
+    def _route_table_xml(self, rows, table_style):
+        """
+        XML таблицы маршрутной карты (w:tbl)
+        Таблица собирается одной строкой и разбирается lxml за один проход:
+        свойства шрифта общие для всех ячеек, ширины колонок задаются в
+        сетке таблицы (w:tblGrid) и у ячеек
+        
+        Строки не ниже ROW_HEIGHT и не разрываются между листами - так
+        листы в Word совпадают с разбиением RouteLayout
+        """
+        row_start, cell_props, header_run, _ = self._route_row_parts()
+        widths = [int(round(width / 635)) for width in self.ROUTE_COLUMN_WIDTHS]
+        
+        parts = [
+            f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{table_style}"/>'
+            '<w:tblW w:type="auto" w:w="0"/><w:jc w:val="center"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" '
+            'w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+            '<w:tblGrid>'
+        ]
+        parts.extend(f'<w:gridCol w:w="{width}"/>' for width in widths)
+        parts.append('</w:tblGrid>')
         
         # Заголовки
-        headers = ['Тип', '№', 'Наименование операции/перехода', 
-                  'Оборудование', 'Материал', 'Тп.з', 'Тшт']
-        header_row = table.rows[0]
-        
-        for i, header in enumerate(headers):
-            cell = header_row.cells[i]
-            cell.text = header
-            # Форматирование заголовка
-            for paragraph in cell.paragraphs:
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                for run in paragraph.runs:
-                    run.font.bold = True
-                    run.font.size = Pt(9)
-        
-        # Заполнение данных
-        for row_idx, row_data in enumerate(rows, start=1):
-            table_row = table.rows[row_idx]
-            
-            # Тип строки
-            table_row.cells[0].text = row_data.get('type', '')
-            # Номер
-            table_row.cells[1].text = row_data.get('number', '')
-            # Наименование
-            table_row.cells[2].text = row_data.get('name', '')
-            # Оборудование
-            table_row.cells[3].text = row_data.get('equipment', '')
-            # Материал
-            table_row.cells[4].text = row_data.get('material', '')
-            # Время подготовительно-заключительное
-            table_row.cells[5].text = row_data.get('time_prep', '')
-            # Время штучное
-            table_row.cells[6].text = row_data.get('time_piece', '')
-            
-            # Форматирование ячеек
-            for cell in table_row.cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.size = Pt(8)
-        
-        # Установка ширины колонок
-        widths = [Cm(1), Cm(1.5), Cm(8), Cm(3), Cm(2.5), Cm(1.5), Cm(1.5)]
-        for row in table.rows:
-            for idx, cell in enumerate(row.cells):
-                cell.width = widths[idx]
+        parts.append(row_start)
+        for props, header in zip(cell_props, self.ROUTE_HEADERS):
+            parts.append(f'<w:tc>{props}<w:p>{header_run}'
+                         f'{self._run_text_xml(header)}</w:r></w:p></w:tc>')
+        parts.append('</w:tr>')
+        
+        # Строки данных
+        for row_data in rows:
+            parts.append(self._route_row_xml(row_data))
+        
+        parts.append('</w:tbl>')
+        return ''.join(parts)
+    
+    def _route_row_parts(self):
+        """
+        Общие части строк таблицы: начало строки, свойства ячеек колонок,
+        начало w:r заголовка и строки данных
+        """
+        # Ширина в двадцатых долях пункта (1 twip = 635 EMU)
+        widths = [int(round(width / 635)) for width in self.ROUTE_COLUMN_WIDTHS]
+        row_start = (f'<w:tr><w:trPr><w:cantSplit/><w:trHeight w:val='
+                     f'"{int(round(self.ROW_HEIGHT / 635))}" w:hRule="atLeast"/></w:trPr>')
+        cell_props = [f'<w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+                      for width in widths]
+        
+        header_run = (f'<w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr><w:b/>'
+                      f'<w:sz w:val="{int(self.HEADER_FONT_SIZE.pt * 2)}"/></w:rPr>')
+        row_run = f'<w:r><w:rPr><w:sz w:val="{int(self.ROW_FONT_SIZE.pt * 2)}"/></w:rPr>'
+        return row_start, cell_props, header_run, row_run
+    
+    def _route_row_xml(self, row_data):
+        """XML строки данных таблицы (w:tr)"""
+        row_start, cell_props, _, row_run = self._route_row_parts()
+        parts = [row_start]
+        for props, field in zip(cell_props, self.ROUTE_FIELDS):
+            text = self._run_text_xml(row_data.get(field, ''))
+            parts.append(f'<w:tc>{props}<w:p>{row_run}{text}</w:r></w:p></w:tc>')
+        parts.append('</w:tr>')
+        return ''.join(parts)
+    
+    def _run_text_xml(self, text):
+        """
+        Содержимое w:r для текста (как при записи cell.text в python-docx):
+        табуляция -> w:tab, перевод строки -> w:br
+        """
+        if not text:
+            return ''
+        
+        text = INVALID_XML_CHARS_RE.sub('', str(text))
+        parts = []
+        for chunk in RUN_SPECIAL_CHARS_RE.split(text):
+            if not chunk:
+                continue
+            if chunk == '\t':
+                parts.append('<w:tab/>')
+            elif chunk in '\r\n':
+                parts.append('<w:br/>')
+            elif chunk != chunk.strip():
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+            else:
+                parts.append(f'<w:t>{escape(chunk)}</w:t>')
+        return ''.join(parts)
+    
+    def _append_to_body(self, element):
+        """Добавление элемента в конец тела документа (перед w:sectPr)"""
+        body = self.doc.element.body
+        sect_pr = body.find(qn('w:sectPr'))
+        if sect_pr is not None:
+            sect_pr.addprevious(element)
+        else:
+            body.append(element)
     
     def set_column_width(self, table):
         """Установка ширины колонок"""
@@ -331,6 +836,10 @@ class DocumentGenerator:
     
     def convert_to_pdf(self, docx_path, pdf_path):
         """Конвертация DOCX в PDF"""
+        with stage('convert'):
+            self._convert_to_pdf(docx_path, pdf_path)
+    
+    def _convert_to_pdf(self, docx_path, pdf_path):
         try:
             # Метод 1: Использование docx2pdf (Windows)
             try:
@@ -339,15 +848,25 @@ class DocumentGenerator:
                 return
             except ImportError:
                 pass
-            
-            # Метод 2: Использование reportlab для создания PDF напрямую
+
+            # Метод 2: LibreOffice (если установлен) - пул процессов,
+            # а без Python с uno - отдельный запуск soffice
+            from office_pool import convert_once, find_soffice, get_office_pool
+            pool = get_office_pool()
+            if pool is not None:
+                pool.convert(docx_path, pdf_path)
+                return
+            soffice = find_soffice()
+            if soffice:
+                convert_once(docx_path, pdf_path, soffice)
+                return
+
+            # Метод 3: Использование reportlab для создания PDF напрямую
             from reportlab.lib.pagesizes import A4
             from reportlab.lib import colors
             from reportlab.lib.units import cm
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
+            from pdf_fonts import route_card_fonts, paragraph_styles
             
             # Читаем данные из DOCX
             from docx import Document
@@ -356,16 +875,10 @@ class DocumentGenerator:
             # Создаем PDF
             pdf_doc = SimpleDocTemplate(pdf_path, pagesize=A4)
             elements = []
-            styles = getSampleStyleSheet()
+            font, font_bold = route_card_fonts()
             
             # Заголовок
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                alignment=1  # Центрирование
-            )
-            elements.append(Paragraph("МАРШРУТНАЯ КАРТА", title_style))
+            elements.append(Paragraph("МАРШРУТНАЯ КАРТА", paragraph_styles()['title']))
             elements.append(Spacer(1, 0.5*cm))
             
             # Извлекаем таблицы из DOCX
@@ -382,7 +895,8 @@ class DocumentGenerator:
                         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTNAME', (0, 0), (-1, -1), font),
+                        ('FONTNAME', (0, 0), (-1, 0), font_bold),
                         ('FONTSIZE', (0, 0), (-1, 0), 10),
                         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
                         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
@@ -397,3 +911,20 @@ class DocumentGenerator:
             
         except Exception as e:
             raise Exception(f"Ошибка конвертации в PDF: {e}")
+
+
+# Генератор процесса-исполнителя при параллельном построении листов
+_page_worker = None
+
+
+def _init_page_worker(generator_class):
+    """Инициализация процесса-исполнителя: пустой документ создается один раз"""
+    global _page_worker
+    _page_worker = generator_class()
+    _page_worker._new_document()
+
+
+def _render_pages_in_worker(doc_info, pages):
+    """Построение пакета листов в процессе-исполнителе"""
+    return [_page_worker._render_page_xml(page_rows, doc_info, page_num)
+            for page_num, page_rows in pages]
@@ -0,0 +1,110 @@
+"""
+Журнал правок данных для отмены и повтора (Ctrl+Z / Ctrl+Y)
+"""
+import time
+from collections import deque
+
+
+class Change:
+    """
+    Одно изменение таблицы
+
+    kind: 'update' - cells {колонка: (старое, новое значение)} только
+    измененных ячеек; 'add' и 'delete' - values, значения строки.
+    position - позиция строки в таблице side ('elements' или 'proc').
+    """
+    __slots__ = ('kind', 'side', 'position', 'cells', 'values', 'time')
+
+    def __init__(self, kind, side, position, cells=None, values=None, at=0.0):
+        self.kind = kind
+        self.side = side
+        self.position = position
+        self.cells = cells
+        self.values = values
+        self.time = at
+
+
+class EditJournal:
+    """
+    Журнал изменений с ограниченной глубиной
+
+    Хранятся только разности: измененные ячейки правки или значения
+    добавленной/удаленной строки, поэтому объем журнала зависит от
+    размера правок, а не таблицы. При переполнении отбрасываются самые
+    старые записи. Повторные правки той же строки в пределах
+    COALESCE_SECONDS объединяются в одну запись. Новая запись очищает
+    стек повтора.
+    """
+    DEPTH = 200
+    COALESCE_SECONDS = 2.0
+
+    def __init__(self, depth=None, coalesce_seconds=None, clock=time.monotonic):
+        self.depth = depth or self.DEPTH
+        self.coalesce_seconds = (self.COALESCE_SECONDS if coalesce_seconds is None
+                                 else coalesce_seconds)
+        self.clock = clock
+        self._undo = deque(maxlen=self.depth)
+        self._redo = []
+        # Запись, с которой может объединиться следующая правка
+        self._open = None
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def clear(self):
+        """Очистка (например, после загрузки файла - позиции строк устарели)"""
+        self._undo.clear()
+        self._redo.clear()
+        self._open = None
+
+    def record_update(self, side, position, cells):
+        """Правка ячеек строки: cells {колонка: (старое, новое значение)}"""
+        if not cells:
+            return
+        now = self.clock()
+        last = self._open
+        if (last is not None and last.kind == 'update' and last.side == side and
+                last.position == position and now - last.time <= self.coalesce_seconds):
+            # Серия правок одной строки - одна запись от первого значения до последнего
+            for column, (old, new) in cells.items():
+                if column in last.cells:
+                    old = last.cells[column][0]
+                last.cells[column] = (old, new)
+            last.time = now
+            self._redo.clear()
+            return
+        self._push(Change('update', side, position, cells=dict(cells), at=now))
+
+    def record_add(self, side, position, values):
+        self._push(Change('add', side, position, values=list(values), at=self.clock()))
+
+    def record_delete(self, side, position, values):
+        self._push(Change('delete', side, position, values=list(values), at=self.clock()))
+
+    def undo(self):
+        """Последнее изменение для отмены (переносится в стек повтора) или None"""
+        if not self._undo:
+            return None
+        change = self._undo.pop()
+        self._redo.append(change)
+        self._open = None
+        return change
+
+    def redo(self):
+        """Последнее отмененное изменение для повтора или None"""
+        if not self._redo:
+            return None
+        change = self._redo.pop()
+        self._undo.append(change)
+        self._open = None
+        return change
+
+    def _push(self, change):
+        self._undo.append(change)
+        self._redo.clear()
+        self._open = change
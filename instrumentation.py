@@ -0,0 +1,242 @@
+"""
+Замер этапов обработки: разбор, объединение, подготовка строк,
+построение листов, сохранение и конвертация
+
+Этапы отмечаются контекстным менеджером stage. Вложенные этапы
+учитываются в объемлющем: у каждого этапа считается собственное время
+(без вложенных этапов), поэтому сумма по этапам равна общему времени.
+При выходе из внешнего этапа формируется отчет: время, число строк и
+изменение памяти процесса (RSS, с учетом вложенных этапов) по этапам.
+Отчет доступен как атрибут report внешнего этапа и, при заданном файле
+журнала, дописывается в него строкой JSON.
+
+Выключенный замер (по умолчанию) не стоит ничего: stage возвращает
+общий пустой объект без обращения к часам и памяти.
+
+Включение: переменная окружения ROUTE_CARD_PROFILE=1, файл журнала -
+ROUTE_CARD_PROFILE_LOG (включает замер), либо instrumentation.configure.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV = 'ROUTE_CARD_PROFILE'
+PROFILE_LOG_ENV = 'ROUTE_CARD_PROFILE_LOG'
+
+# Названия этапов для строки состояния
+STAGE_LABELS = {
+    'parse_excel': 'разбор Excel',
+    'parse_proc': 'разбор Proc',
+    'merge': 'объединение',
+    'merge_index': 'индекс объединения',
+    'merge_incremental': 'обновление объединения',
+    'prepare_rows': 'строки карты',
+    'paginate': 'разбиение на листы',
+    'render_page': 'листы',
+    'build_page': 'построение листов',
+    'display_table': 'таблица',
+    'build_index': 'индекс поиска',
+    'save_docx': 'запись DOCX',
+    'save_pdf': 'запись PDF',
+    'convert': 'конвертация',
+    'preview_text': 'предпросмотр',
+}
+
+
+def rss_bytes():
+    """Текущий объем памяти процесса (RSS) в байтах; None, если недоступен"""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'rb') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        return _rss_windows()
+    return None
+
+
+def _rss_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters),
+                                                    counters.cb):
+            return counters.WorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class _NullStage:
+    """Этап при выключенном замере"""
+    report = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Замеряемый этап"""
+
+    def __init__(self, owner, name, rows):
+        self.owner = owner
+        self.name = name
+        self.rows = rows or 0
+        self.report = None
+        # Сводка вложенных этапов (только у внешнего этапа)
+        self.stages = None
+        self._child_time = 0.0
+
+    def add_rows(self, rows):
+        self.rows += rows
+
+    def __enter__(self):
+        stack = self.owner._stack()
+        if not stack:
+            self.stages = {}
+            self.started_at = time.time()
+        stack.append(self)
+        self.memory = rss_bytes()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        memory = rss_bytes()
+        delta = memory - self.memory if memory is not None and self.memory is not None else None
+
+        stack = self.owner._stack()
+        stack.pop()
+        root = stack[0] if stack else self
+        if stack:
+            stack[-1]._child_time += elapsed
+
+        entry = root.stages.setdefault(self.name, {'calls': 0, 'self_s': 0.0, 'total_s': 0.0,
+                                                   'rows': 0, 'memory_delta': 0})
+        entry['calls'] += 1
+        entry['self_s'] += elapsed - self._child_time
+        entry['total_s'] += elapsed
+        entry['rows'] += self.rows
+        if delta is not None:
+            entry['memory_delta'] += delta
+
+        if self is root:
+            self.report = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'name': self.name,
+                'wall_s': elapsed,
+                'rows': self.rows,
+                'memory_delta': delta,
+                'memory_rss': memory,
+                'error': exc_type.__name__ if exc_type is not None else None,
+                'stages': self.stages,
+            }
+            self.owner._finish(self.report)
+        return False
+
+
+class Instrumentation:
+    """Замер этапов (один объект на процесс - instrumentation)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.log_path = None
+        self.last_report = None
+        self._local = threading.local()
+        self._log_lock = threading.Lock()
+
+    def configure(self, enabled=None, log_path=None):
+        """
+        Настройка замера
+
+        Args:
+            enabled: включить или выключить замер (None - не менять)
+            log_path: файл журнала JSON lines (None - не менять, '' - без журнала)
+        """
+        if log_path is not None:
+            self.log_path = log_path or None
+            if self.log_path and enabled is None:
+                enabled = True
+        if enabled is not None:
+            self.enabled = enabled
+
+    def configure_from_env(self):
+        self.configure(enabled=os.environ.get(PROFILE_ENV, '0') not in ('', '0') or None,
+                       log_path=os.environ.get(PROFILE_LOG_ENV))
+
+    def stage(self, name, rows=None):
+        """Контекстный менеджер этапа; при выключенном замере - пустой объект"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, report):
+        self.last_report = report
+        if self.log_path:
+            try:
+                line = json.dumps(report, ensure_ascii=False)
+                with self._log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError:
+                pass
+
+
+def format_report(report, limit=6):
+    """Краткая сводка отчета для строки состояния"""
+    if not report:
+        return ''
+    stages = sorted(report['stages'].items(), key=lambda item: item[1]['self_s'],
+                    reverse=True)
+    parts = []
+    for name, entry in stages[:limit]:
+        if entry['self_s'] < 0.0005:
+            continue
+        text = f"{STAGE_LABELS.get(name, name)} {entry['self_s']:.2f} с"
+        if entry['calls'] > 1:
+            text += f" ({entry['calls']})"
+        parts.append(text)
+
+    summary = f"{report['wall_s']:.2f} с"
+    if parts:
+        summary += ': ' + ', '.join(parts)
+    if report['memory_delta'] is not None:
+        summary += f", память {report['memory_delta'] / 2 ** 20:+.1f} МБ"
+    return summary
+
+
+instrumentation = Instrumentation()
+instrumentation.configure_from_env()
+stage = instrumentation.stage
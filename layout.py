@@ -0,0 +1,181 @@
+"""
+Разбиение строк маршрутной карты на листы по высоте текста
+"""
+from functools import lru_cache
+from itertools import accumulate
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from instrumentation import stage
+from pdf_fonts import route_card_fonts
+
+
+class RouteLayout:
+    """
+    Раскладка строк основной таблицы маршрутной карты по листам
+
+    Высота строки таблицы определяется наибольшим числом строк текста
+    в ее ячейках после переноса по словам, но не меньше ROW_HEIGHT.
+    Ширина текста измеряется по метрикам шрифта из pdf_fonts, перенос
+    каждой уникальной строки текста вычисляется один раз. Лист заполняется
+    строками до высоты основной таблицы листа; строка операции не
+    остается последней на листе и переносится вместе со своим первым
+    переходом.
+
+    Раскладка зависит только от строк: одни и те же строки всегда дают
+    одни и те же листы. Повторное использование листов после правки
+    обеспечивает кэш листов DocumentGenerator (по содержимому листа).
+    """
+    # Одинарный интервал Word: высота строки текста относительно кегля
+    LINE_SPACING = 1.22
+    # Толщина горизонтальной границы строки (Table Grid, w:sz="4")
+    BORDER = 0.5
+
+    def __init__(self, generator):
+        self.font = route_card_fonts()[0]
+        self.font_size = generator.ROW_FONT_SIZE.pt
+        self.line_height = self.font_size * self.LINE_SPACING
+        self.min_height = generator.ROW_HEIGHT.pt
+        self.operation_type = generator.ROW_TYPES['operation']
+
+        # Ширина текста в ячейке: ширина колонки без полей ячейки
+        margin = generator.CELL_MARGIN.pt
+        self.text_widths = {
+            field: width.pt - 2 * margin
+            for field, width in zip(generator.ROUTE_FIELDS, generator.ROUTE_COLUMN_WIDTHS)
+        }
+        self.table_heights = (generator.TABLE_HEIGHT_FIRST.pt,
+                              generator.TABLE_HEIGHT_NEXT.pt)
+        # Поля, определяющие содержимое строки (номер строки - сквозной)
+        self.key_fields = [field for field in generator.ROUTE_FIELDS if field != 'number']
+
+    def wrap(self, text, field):
+        """Строки текста ячейки колонки field после переноса"""
+        if not text:
+            return ()
+        return wrap_text(str(text), self.font, self.font_size, self.text_widths[field])
+
+    def row_height(self, row):
+        """Высота строки таблицы в пунктах"""
+        lines = max(len(self.wrap(row.get(field, ''), field)) for field in self.text_widths)
+        return max(self.min_height, lines * self.line_height)
+
+    def row_key(self, row):
+        """Содержимое строки без сквозного номера"""
+        return tuple(row.get(field, '') for field in self.key_fields)
+
+    def paginate(self, route_rows):
+        """
+        Разбиение строк на листы
+        Возвращает пары (номер листа, строки листа); первый лист есть всегда
+        """
+        total = len(route_rows)
+        with stage('paginate', rows=total):
+            heights = [self.row_height(row) + self.BORDER for row in route_rows]
+
+        start = 0
+        page_num = 1
+        while True:
+            with stage('paginate'):
+                end = self._page_end(route_rows, heights, start, page_num)
+
+            yield page_num, route_rows[start:end]
+            start = end
+            page_num += 1
+            if start >= total:
+                break
+
+    def _page_end(self, route_rows, heights, start, page_num):
+        """Граница листа, начинающегося со строки start"""
+        total = len(route_rows)
+        capacity = self.table_heights[0 if page_num == 1 else 1]
+        end = start
+        used = 0.0
+        while end < total and used + heights[end] <= capacity:
+            used += heights[end]
+            end += 1
+
+        if end == start and end < total:
+            # Строка выше листа занимает отдельный лист
+            end += 1
+        elif (end < total and end - start > 1 and
+              route_rows[end - 1]['type'] == self.operation_type):
+            # Операция переходит на следующий лист вместе с первым переходом
+            end -= 1
+        return end
+
+
+class _CharWidths(dict):
+    """Ширины символов шрифта при кегле 1 (заполняются по мере обращения)"""
+
+    def __init__(self, font):
+        super().__init__()
+        self.font = font
+
+    def __missing__(self, char):
+        width = stringWidth(char, self.font, 1)
+        self[char] = width
+        return width
+
+
+_char_widths = {}
+
+
+def text_width(text, font, size):
+    """
+    Ширина текста в пунктах
+    Ширина каждого символа измеряется один раз, без учета кернинга
+    (reportlab при выводе текста кернинг также не применяет)
+    """
+    return sum(map(_font_widths(font).__getitem__, text)) * size
+
+
+def _font_widths(font):
+    widths = _char_widths.get(font)
+    if widths is None:
+        widths = _char_widths[font] = _CharWidths(font)
+    return widths
+
+
+@lru_cache(maxsize=131072)
+def wrap_text(text, font, size, width):
+    """
+    Перенос текста по словам в пределах ширины width (в пунктах)
+    Слово длиннее строки разбивается по символам, как в Word
+    """
+    if '\n' not in text and text_width(text, font, size) <= width:
+        return (text,)
+
+    space = text_width(' ', font, size)
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        line_width = 0.0
+        for word in paragraph.split():
+            word_width = text_width(word, font, size)
+            if line and line_width + space + word_width <= width:
+                line += ' ' + word
+                line_width += space + word_width
+                continue
+
+            if line:
+                lines.append(line)
+            while word_width > width and len(word) > 1:
+                cut = _fitting_chars(word, font, size, width)
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = text_width(word, font, size)
+            line = word
+            line_width = word_width
+        lines.append(line)
+    return tuple(lines)
+
+
+def _fitting_chars(word, font, size, width):
+    """Число первых символов слова, помещающихся в ширину (не меньше одного)"""
+    limit = width / size
+    widths = accumulate(map(_font_widths(font).__getitem__, word))
+    for count, used in enumerate(widths):
+        if used > limit:
+            return max(1, count)
+    return len(word)
@@ -3,13 +3,34 @@
 """
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import pandas as pd
+import importlib
+import threading
 from pathlib import Path
 from datetime import datetime
-from data_processor import DataProcessor
-from document_generator import DocumentGenerator
 from preview_window import PreviewWindow
 from edit_dialog import EditDialog
+from virtual_table import VirtualTable
+from search_panel import SearchPanel
+from background import BackgroundTask, page_progress
+from edit_journal import EditJournal
+from instrumentation import stage, format_report
+
+# Модули обработки данных (pandas, python-docx, reportlab) загружаются
+# в фоновом потоке после появления окна, а не при запуске приложения
+PRELOAD_MODULES = ('pandas', 'data_processor', 'parse_cache', 'merge_engine',
+                   'document_generator', 'layout', 'pdf_renderer')
+# Задержка фоновой загрузки после запуска mainloop, мс
+PRELOAD_DELAY_MS = 50
+
+
+def preload_modules(names=PRELOAD_MODULES):
+    """Импорт модулей заранее; ошибка импорта проявится при использовании модуля"""
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
 
 class RouteCardApp:
     def __init__(self, root):
@@ -17,14 +38,58 @@ class RouteCardApp:
         self.root.title("Генератор маршрутных карт v2.0")
         self.root.geometry("1400x900")
         
-        self.data_processor = DataProcessor()
-        self.doc_generator = DocumentGenerator()
+        # Обработчики создаются при первом обращении (см. свойства ниже)
+        self._data_processor = None
+        self._doc_generator = None
+        self._merge_engine = None
         
         self.elements_data = None
         self.proc_data = None
         self.merged_data = None
+        self.preload_thread = None
+        # Выполняемая фоновая операция (одновременно не более одной)
+        self.task = None
+        # Журнал правок для отмены и повтора
+        self.journal = EditJournal()
         
         self.setup_ui()
+        
+        # Отмена и повтор правок (также в русской раскладке)
+        for sequence in ('<Control-z>', '<Control-Z>', '<Control-Cyrillic_ya>'):
+            self.root.bind(sequence, self.undo)
+        for sequence in ('<Control-y>', '<Control-Y>', '<Control-Cyrillic_en>'):
+            self.root.bind(sequence, self.redo)
+        
+        # Тяжелые модули загружаются после первой отрисовки окна
+        self.root.after(PRELOAD_DELAY_MS, self.start_preload)
+    
+    def start_preload(self):
+        """Фоновая загрузка модулей обработки данных"""
+        self.preload_thread = threading.Thread(target=preload_modules, name='preload',
+                                               daemon=True)
+        self.preload_thread.start()
+    
+    @property
+    def data_processor(self):
+        if self._data_processor is None:
+            from data_processor import DataProcessor
+            from parse_cache import ParseCache
+            self._data_processor = DataProcessor(cache=ParseCache())
+        return self._data_processor
+    
+    @property
+    def doc_generator(self):
+        if self._doc_generator is None:
+            from document_generator import DocumentGenerator
+            self._doc_generator = DocumentGenerator()
+        return self._doc_generator
+    
+    @property
+    def merge_engine(self):
+        if self._merge_engine is None:
+            from merge_engine import MergeEngine
+            self._merge_engine = MergeEngine(self.data_processor)
+        return self._merge_engine
     
     def setup_ui(self):
         """Создание интерфейса"""
@@ -75,49 +140,44 @@ class RouteCardApp:
         self.setup_proc_table()
         
         # Статус бар
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        
         self.status_var = tk.StringVar(value="Готов к работе")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, 
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, 
                               relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        status_bar.pack(fill=tk.X, side=tk.LEFT, expand=True)
+        
+        # Ход фоновой операции (показывается только во время выполнения)
+        self.cancel_button = ttk.Button(status_frame, text="Отмена",
+                                        command=self.cancel_task)
+        self.progress_bar = ttk.Progressbar(status_frame, length=250, maximum=1.0)
     
     def setup_elements_table(self):
         """Создание таблицы для элементов"""
-        # Scrollbar
-        scroll_y = ttk.Scrollbar(self.elements_frame, orient=tk.VERTICAL)
-        scroll_x = ttk.Scrollbar(self.elements_frame, orient=tk.HORIZONTAL)
-        
-        self.elements_tree = ttk.Treeview(self.elements_frame,
-                                         yscrollcommand=scroll_y.set,
-                                         xscrollcommand=scroll_x.set)
+        self.elements_table = VirtualTable(self.elements_frame)
         
-        scroll_y.config(command=self.elements_tree.yview)
-        scroll_x.config(command=self.elements_tree.xview)
+        # Поиск и фильтр над таблицей
+        self.elements_search = SearchPanel(self.elements_frame, self.elements_table,
+                                           lambda text: self.status_var.set(text))
+        self.elements_search.pack(fill=tk.X)
         
         # Двойной клик для редактирования
-        self.elements_tree.bind('<Double-Button-1>', lambda e: self.edit_selected())
-        
-        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.elements_tree.pack(fill=tk.BOTH, expand=True)
+        self.elements_table.bind('<Double-Button-1>', lambda e: self.edit_selected())
+        self.elements_table.pack(fill=tk.BOTH, expand=True)
     
     def setup_proc_table(self):
         """Создание таблицы для процессов"""
-        scroll_y = ttk.Scrollbar(self.proc_frame, orient=tk.VERTICAL)
-        scroll_x = ttk.Scrollbar(self.proc_frame, orient=tk.HORIZONTAL)
-        
-        self.proc_tree = ttk.Treeview(self.proc_frame,
-                                     yscrollcommand=scroll_y.set,
-                                     xscrollcommand=scroll_x.set)
+        self.proc_table = VirtualTable(self.proc_frame)
         
-        scroll_y.config(command=self.proc_tree.yview)
-        scroll_x.config(command=self.proc_tree.xview)
+        # Поиск и фильтр над таблицей
+        self.proc_search = SearchPanel(self.proc_frame, self.proc_table,
+                                       lambda text: self.status_var.set(text))
+        self.proc_search.pack(fill=tk.X)
         
         # Двойной клик для редактирования
-        self.proc_tree.bind('<Double-Button-1>', lambda e: self.edit_selected())
-        
-        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.proc_tree.pack(fill=tk.BOTH, expand=True)
+        self.proc_table.bind('<Double-Button-1>', lambda e: self.edit_selected())
+        self.proc_table.pack(fill=tk.BOTH, expand=True)
     
     def load_elements(self):
         """Загрузка файла Elements.xlsx"""
@@ -127,12 +187,8 @@ class RouteCardApp:
         )
         
         if filename:
-            try:
-                self.elements_data = self.data_processor.load_excel(filename)
-                self.display_elements()
-                self.status_var.set(f"Загружено элементов: {len(self.elements_data)}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить файл:\n{e}")
+            self._load_file("elements", "Загрузка элементов...",
+                            lambda: self.data_processor.load_excel(filename))
     
     def load_proc(self):
         """Загрузка файла Proc.txt"""
@@ -142,76 +198,159 @@ class RouteCardApp:
         )
         
         if filename:
-            try:
-                self.proc_data = self.data_processor.load_proc_txt(filename)
+            self._load_file("proc", "Загрузка процессов...",
+                            lambda: self.data_processor.load_proc_txt(filename))
+    
+    def _load_file(self, data_name, message, load):
+        """Разбор файла в фоне, отображение данных после завершения"""
+        stage_name = 'load_elements' if data_name == "elements" else 'load_proc'
+        
+        def work(task):
+            from row_store import RowStore
+            from table_index import TableIndex
+            
+            with stage(stage_name) as timing:
+                data = RowStore(load())
+                # Индексы поиска строятся сразу, пока окно свободно
+                with stage('build_index', rows=len(data)):
+                    index = TableIndex(data)
+            return data, index, timing
+        
+        def done(result):
+            data, index, timing = result
+            self.merge_engine.reset()
+            self.merged_data = None
+            # Позиции строк в журнале относятся к прежним данным
+            self.journal.clear()
+            if data_name == "elements":
+                self.elements_data = data
+                self.display_elements()
+                self.elements_search.set_index(index)
+                self.set_status(f"Загружено элементов: {len(data)}", timing)
+            else:
+                self.proc_data = data
                 self.display_proc()
-                self.status_var.set(f"Загружено процессов: {len(self.proc_data)}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить файл:\n{e}")
+                self.proc_search.set_index(index)
+                self.set_status(f"Загружено процессов: {len(data)}", timing)
+        
+        self.run_task(message, work, done, "Не удалось загрузить файл")
+    
+    def run_task(self, message, work, on_done, error_message, on_cancel=None):
+        """
+        Запуск операции в рабочем потоке (см. BackgroundTask)
+        
+        Args:
+            message: сообщение в строке состояния на время выполнения
+            work: функция work(task), выполняется в рабочем потоке
+            on_done: обработчик результата work (в потоке Tk)
+            error_message: заголовок сообщения об ошибке
+            on_cancel: действие после отмены (например, удаление неполного файла)
+        
+        Returns:
+            True, если операция запущена
+        """
+        if self.task is not None:
+            messagebox.showinfo("Информация", "Дождитесь завершения текущей операции")
+            return False
+        
+        def error(e):
+            self.status_var.set("Ошибка")
+            messagebox.showerror("Ошибка", f"{error_message}:\n{e}")
+        
+        def cancelled():
+            if on_cancel is not None:
+                on_cancel()
+            self.status_var.set("Операция отменена")
+        
+        self.status_var.set(message)
+        self.progress_bar.config(mode='indeterminate')
+        self.progress_bar.start()
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        
+        self.task = BackgroundTask(self.root, work, on_done=on_done, on_error=error,
+                                   on_cancel=cancelled, on_progress=self._show_progress,
+                                   on_finish=self._task_finished)
+        self.task.start()
+        return True
+    
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status_var.set("Отмена...")
+    
+    def task_running(self):
+        """Проверка перед правкой данных: во время фоновой операции данные не меняются"""
+        if self.task is None:
+            return False
+        messagebox.showinfo("Информация", "Дождитесь завершения текущей операции")
+        return True
+    
+    def _show_progress(self, done, total, text):
+        if self.task is not None and self.task.cancelled:
+            return
+        if total:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', value=done / total)
+        if text:
+            self.status_var.set(text)
+    
+    def _task_finished(self):
+        self.task = None
+        self.progress_bar.stop()
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+    
+    def set_status(self, message, timing=None):
+        """Сообщение в строке состояния, с временем этапов при включенном замере"""
+        if timing is not None and timing.report:
+            message = f"{message} | {format_report(timing.report)}"
+        self.status_var.set(message)
     
     def display_elements(self):
-        """Отображение данных элементов"""
-        # Очистка
-        for item in self.elements_tree.get_children():
-            self.elements_tree.delete(item)
-        
-        if self.elements_data is not None and not self.elements_data.empty:
-            # Настройка колонок
-            columns = list(self.elements_data.columns)
-            self.elements_tree['columns'] = columns
-            self.elements_tree['show'] = 'headings'
-            
-            for col in columns:
-                self.elements_tree.heading(col, text=col)
-                self.elements_tree.column(col, width=100)
-            
-            # Добавление данных
-            for idx, row in self.elements_data.iterrows():
-                values = [str(row[col]) for col in columns]
-                self.elements_tree.insert('', tk.END, values=values)
+        """
+        Отображение данных элементов
+        Таблица виртуализирована: строятся только видимые строки
+        """
+        with stage('display_table', rows=self._row_count(self.elements_data)):
+            self.elements_table.set_data(self.elements_data)
     
     def display_proc(self):
         """Отображение данных процессов"""
-        for item in self.proc_tree.get_children():
-            self.proc_tree.delete(item)
-        
-        if self.proc_data is not None and not self.proc_data.empty:
-            columns = list(self.proc_data.columns)
-            self.proc_tree['columns'] = columns
-            self.proc_tree['show'] = 'headings'
-            
-            for col in columns:
-                self.proc_tree.heading(col, text=col)
-                self.proc_tree.column(col, width=100)
-            
-            for idx, row in self.proc_data.iterrows():
-                values = [str(row[col]) for col in columns]
-                self.proc_tree.insert('', tk.END, values=values)
+        with stage('display_table', rows=self._row_count(self.proc_data)):
+            self.proc_table.set_data(self.proc_data)
+    
+    @staticmethod
+    def _row_count(data):
+        return 0 if data is None else len(data)
     
     def get_merged_data(self):
         """Получение объединенных данных"""
-        if self.merged_data is not None:
-            return self.merged_data
-        
         if self.elements_data is None or self.proc_data is None:
             return None
         
-        self.merged_data = self.data_processor.merge_data(
-            self.elements_data, self.proc_data
-        )
+        # Полное объединение только при первом обращении,
+        # дальше правки применяются к результату построчно
+        if not self.merge_engine.is_built:
+            self.merge_engine.build(self.elements_data, self.proc_data)
+        
+        self.merged_data = self.merge_engine.merged
         return self.merged_data
     
     def edit_selected(self):
         """Редактирование выбранной строки"""
+        if self.task_running():
+            return
+        
         # Определяем активную вкладку
         current_tab_index = self.notebook.index(self.notebook.select())
         
         if current_tab_index == 0:  # Вкладка "Элементы"
-            tree = self.elements_tree
+            table = self.elements_table
             data = self.elements_data
             data_name = "elements"
         elif current_tab_index == 1:  # Вкладка "Процессы"
-            tree = self.proc_tree
+            table = self.proc_table
             data = self.proc_data
             data_name = "proc"
         else:
@@ -222,34 +361,32 @@ class RouteCardApp:
             messagebox.showinfo("Информация", "Нет данных для редактирования")
             return
         
-        selected = tree.selection()
-        if not selected:
+        # Позиция выбранной строки в данных
+        row_idx = table.selected_position()
+        if row_idx is None:
             messagebox.showinfo("Информация", "Выберите строку для редактирования")
             return
         
-        # Получаем индекс выбранной строки
-        item = selected[0]
-        values = tree.item(item)['values']
+        old_values = data.row(row_idx)
+        values = [str(value) for value in old_values]
         
         # Открываем диалог редактирования
         dialog = EditDialog(self.root, data.columns.tolist(), values)
         if dialog.result:
-            # Обновляем данные
-            row_idx = tree.index(item)
-            for i, col in enumerate(data.columns):
-                data.at[row_idx, col] = dialog.result[i]
-            
-            # Обновляем отображение
-            if data_name == "elements":
-                self.display_elements()
-            else:
-                self.display_proc()
-            
-            self.merged_data = None  # Сбрасываем кэш
+            # Записываются только измененные ячейки
+            cells = {column: (old, new) for column, (old, text, new)
+                     in enumerate(zip(old_values, values, dialog.result)) if text != new}
+            if cells:
+                self._update_cells(data_name, row_idx,
+                                   {column: new for column, (old, new) in cells.items()})
+                self.journal.record_update(data_name, row_idx, cells)
             self.status_var.set("Данные обновлены")
     
     def add_row(self):
         """Добавление новой строки"""
+        if self.task_running():
+            return
+        
         # Определяем активную вкладку
         current_tab_index = self.notebook.index(self.notebook.select())
         
@@ -273,29 +410,26 @@ class RouteCardApp:
         # Открываем диалог редактирования
         dialog = EditDialog(self.root, data.columns.tolist(), list(new_row.values()))
         if dialog.result:
-            # Добавляем новую строку
-            new_df = pd.DataFrame([dialog.result], columns=data.columns)
-            if data_name == "elements":
-                self.elements_data = pd.concat([self.elements_data, new_df], ignore_index=True)
-                self.display_elements()
-            else:
-                self.proc_data = pd.concat([self.proc_data, new_df], ignore_index=True)
-                self.display_proc()
-            
-            self.merged_data = None
+            # Добавляем новую строку (без копирования таблицы)
+            position = len(data)
+            self._insert_row(data_name, position, dialog.result)
+            self.journal.record_add(data_name, position, dialog.result)
             self.status_var.set("Строка добавлена")
     
     def delete_row(self):
         """Удаление выбранной строки"""
+        if self.task_running():
+            return
+        
         # Определяем активную вкладку
         current_tab_index = self.notebook.index(self.notebook.select())
         
         if current_tab_index == 0:  # Вкладка "Элементы"
-            tree = self.elements_tree
+            table = self.elements_table
             data_name = "elements"
             data = self.elements_data
         elif current_tab_index == 1:  # Вкладка "Процессы"
-            tree = self.proc_tree
+            table = self.proc_table
             data_name = "proc"
             data = self.proc_data
         else:
@@ -306,43 +440,118 @@ class RouteCardApp:
             messagebox.showinfo("Информация", "Нет данных для удаления")
             return
         
-        selected = tree.selection()
-        if not selected:
+        row_idx = table.selected_position()
+        if row_idx is None:
             messagebox.showinfo("Информация", "Выберите строку для удаления")
             return
         
         if messagebox.askyesno("Подтверждение", "Удалить выбранную строку?"):
-            item = selected[0]
-            row_idx = tree.index(item)
-            
-            if data_name == "elements":
-                self.elements_data = self.elements_data.drop(row_idx).reset_index(drop=True)
-                self.display_elements()
-            else:
-                self.proc_data = self.proc_data.drop(row_idx).reset_index(drop=True)
-                self.display_proc()
-            
-            self.merged_data = None
+            values = data.row(row_idx)
+            self._delete_row(data_name, row_idx)
+            self.journal.record_delete(data_name, row_idx, values)
             self.status_var.set("Строка удалена")
     
+    def undo(self, event=None):
+        """Отмена последней правки (Ctrl+Z)"""
+        self._replay(self.journal.undo, True, "Правка отменена", "Нечего отменять")
+        return 'break'
+    
+    def redo(self, event=None):
+        """Повтор отмененной правки (Ctrl+Y)"""
+        self._replay(self.journal.redo, False, "Правка повторена", "Нечего повторять")
+        return 'break'
+    
+    def _replay(self, take, undo, message, empty_message):
+        if self.task_running():
+            return
+        change = take()
+        if change is None:
+            self.status_var.set(empty_message)
+            return
+        
+        # Изменение показывается на своей вкладке
+        self.notebook.select(0 if change.side == "elements" else 1)
+        if change.kind == 'update':
+            state = 0 if undo else 1
+            self._update_cells(change.side, change.position,
+                               {column: values[state] for column, values in change.cells.items()})
+            self._side(change.side)[1].select_position(change.position)
+        elif (change.kind == 'add') == undo:
+            # Отмена добавления или повтор удаления
+            self._delete_row(change.side, change.position)
+        else:
+            self._insert_row(change.side, change.position, change.values)
+        self.status_var.set(message)
+    
+    def _side(self, data_name):
+        """Данные, таблица и панель поиска вкладки"""
+        if data_name == "elements":
+            return self.elements_data, self.elements_table, self.elements_search
+        return self.proc_data, self.proc_table, self.proc_search
+    
+    def _update_cells(self, data_name, position, cells):
+        """Запись ячеек строки: данные, строка таблицы, индексы и объединение"""
+        data, table, search = self._side(data_name)
+        data.set_cells(position, cells)
+        table.row_updated(position)
+        search.row_updated(position)
+        self.merge_engine.row_updated(data_name, data, position)
+    
+    def _insert_row(self, data_name, position, values):
+        """Вставка строки (добавление - вставка в конец)"""
+        data, table, search = self._side(data_name)
+        if position == len(data):
+            data.append(values)
+            table.row_added(data)
+            search.row_added()
+        else:
+            # Вставка в середину перенумеровывает строки - индексы
+            # перестраиваются при следующем поиске
+            data.insert(position, values)
+            table.set_data(data, keep_view=True)
+            search.apply_view(keep_view=True)
+        table.select_position(position)
+        self.merge_engine.row_inserted(data_name, data, position)
+    
+    def _delete_row(self, data_name, position):
+        """Удаление строки"""
+        data, table, search = self._side(data_name)
+        data.delete(position)
+        table.row_deleted(data, position)
+        search.row_deleted()
+        self.merge_engine.row_deleted(data_name, data, position)
+    
     def preview_document(self):
         """Предпросмотр документа"""
-        merged_data = self.get_merged_data()
-        if merged_data is None:
+        if self.elements_data is None or self.proc_data is None:
             messagebox.showwarning("Предупреждение", 
                                  "Загрузите оба файла перед предпросмотром")
             return
         
-        try:
-            preview = PreviewWindow(self.root, merged_data, self.doc_generator)
-            self.status_var.set("Предпросмотр открыт")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось открыть предпросмотр:\n{e}")
+        # Объединение и текст предпросмотра готовятся в фоне,
+        # окно создается после завершения
+        def work(task):
+            with stage('preview') as timing:
+                merged_data = self.get_merged_data()
+                content = PreviewWindow.build_content(merged_data)
+            return merged_data, content, timing
+        
+        def done(result):
+            merged_data, content, timing = result
+            try:
+                preview = PreviewWindow(self.root, merged_data, self.doc_generator,
+                                        content=content, run_task=self.run_task)
+                preview.show_report(timing.report)
+                self.set_status("Предпросмотр открыт", timing)
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось открыть предпросмотр:\n{e}")
+        
+        self.run_task("Подготовка предпросмотра...", work, done,
+                      "Не удалось открыть предпросмотр")
     
     def generate_document(self):
         """Генерация маршрутной карты в DOCX"""
-        merged_data = self.get_merged_data()
-        if merged_data is None:
+        if self.elements_data is None or self.proc_data is None:
             messagebox.showwarning("Предупреждение", 
                                  "Загрузите оба файла перед генерацией")
             return
@@ -352,18 +561,27 @@ class RouteCardApp:
         if doc_info is None:
             return
         
-        try:
-            output_path = filedialog.asksaveasfilename(
-                defaultextension=".docx",
-                filetypes=[("Word documents", "*.docx"), ("All files", "*.*")]
-            )
-            
-            if output_path:
-                self.doc_generator.create_route_card(merged_data, output_path, doc_info)
-                self.status_var.set(f"Документ сохранен: {output_path}")
-                messagebox.showinfo("Успех", "Маршрутная карта создана по ГОСТ 3.1118!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось создать документ:\n{e}")
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".docx",
+            filetypes=[("Word documents", "*.docx"), ("All files", "*.*")]
+        )
+        if not output_path:
+            return
+        
+        def work(task):
+            with stage('generate_docx') as timing:
+                merged_data = self.get_merged_data()
+                self.doc_generator.create_route_card(
+                    merged_data, output_path, doc_info,
+                    progress=page_progress(task, "Формирование DOCX"))
+            return timing
+        
+        def done(timing):
+            self.set_status(f"Документ сохранен: {output_path}", timing)
+            messagebox.showinfo("Успех", "Маршрутная карта создана по ГОСТ 3.1118!")
+        
+        self.run_task("Формирование DOCX...", work, done, "Не удалось создать документ",
+                      on_cancel=lambda: remove_file(output_path))
     
     def get_document_info(self):
         """Диалог для ввода информации о документе"""
@@ -413,8 +631,7 @@ class RouteCardApp:
     
     def export_to_pdf(self):
         """Экспорт в PDF"""
-        merged_data = self.get_merged_data()
-        if merged_data is None:
+        if self.elements_data is None or self.proc_data is None:
             messagebox.showwarning("Предупреждение", 
                                  "Загрузите оба файла перед экспортом")
             return
@@ -424,31 +641,36 @@ class RouteCardApp:
         if doc_info is None:
             return
         
-        try:
-            output_path = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
-            )
-            
-            if output_path:
-                # Сначала создаем DOCX во временном файле
-                import tempfile
-                with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                    tmp_docx = tmp.name
-                
-                self.doc_generator.create_route_card(merged_data, tmp_docx, doc_info)
-                
-                # Конвертируем в PDF
-                self.doc_generator.convert_to_pdf(tmp_docx, output_path)
-                
-                # Удаляем временный файл
-                import os
-                os.unlink(tmp_docx)
-                
-                self.status_var.set(f"PDF сохранен: {output_path}")
-                messagebox.showinfo("Успех", "PDF файл создан!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось создать PDF:\n{e}")
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
+        )
+        if not output_path:
+            return
+        
+        # PDF строится сразу из данных, без промежуточного DOCX
+        def work(task):
+            with stage('export_pdf') as timing:
+                merged_data = self.get_merged_data()
+                self.doc_generator.create_route_card_pdf(
+                    merged_data, output_path, doc_info,
+                    progress=page_progress(task, "Экспорт в PDF"))
+            return timing
+        
+        def done(timing):
+            self.set_status(f"PDF сохранен: {output_path}", timing)
+            messagebox.showinfo("Успех", "PDF файл создан!")
+        
+        # Файл PDF записывается целиком в конце - после отмены удалять нечего
+        self.run_task("Экспорт в PDF...", work, done, "Не удалось создать PDF")
+
+
+def remove_file(path):
+    """Удаление неполного файла после отмены (DOCX записывается по листам)"""
+    try:
+        Path(path).unlink()
+    except OSError:
+        pass
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,345 @@
+"""
+Инкрементальное объединение данных элементов и процессов
+"""
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from row_store import as_frame
+
+SIDES = ('elements', 'proc')
+
+
+class MergeEngine:
+    """
+    Объединенные данные с поддержкой построчных изменений
+
+    Полное объединение выполняется один раз через DataProcessor.merge_data.
+    Для каждой стороны хранится хэш-индекс по Designator, поэтому правка,
+    добавление или удаление строки пересчитывает только группы затронутых
+    обозначений, а правка без смены обозначения обновляет только ячейки.
+    При объединении по индексу (pd.concat) правка также обновляет ячейки,
+    а добавление и удаление строк пересобирают только склейку колонок.
+
+    Выданный наружу merged (например, в открытом окне предпросмотра)
+    остается неизменным снимком: правка ячеек после обращения к merged
+    один раз копирует результат, следующие правки меняют копию на месте,
+    а пересчет групп всегда создает новый DataFrame.
+
+    Если изменение не удается применить инкрементально (например, из-за
+    несовместимого типа колонки), результат пересобирается полностью.
+
+    Стороны - DataFrame или RowStore. Построчные изменения читают только
+    затронутые строки (take), полная таблица RowStore собирается лишь для
+    полного объединения.
+    """
+    KEY = 'Designator'
+    SUFFIXES = {'elements': '_elem', 'proc': '_proc'}
+    ID_COLUMNS = {'elements': '__elements_row_id', 'proc': '__proc_row_id'}
+
+    def __init__(self, data_processor):
+        self.data_processor = data_processor
+        self.reset()
+
+    def reset(self):
+        """Сброс объединенных данных (например, после загрузки файла)"""
+        self._merged = None
+        # Последний выданный наружу результат (см. merged)
+        self._handed_out = None
+        self._frames = {}
+        self._by_key = False
+        self._incremental = True
+        # Идентификаторы строк сторон: позиция строки -> id (по возрастанию)
+        self._ids = {}
+        self._next_id = {}
+        # id -> значение Designator и Designator -> [id]
+        self._keys = {}
+        self._index = {}
+        # Для каждой строки merged - id исходных строк (-1, если строки нет)
+        self._src = {}
+        # Значения Designator в строках merged (None вместо NaN)
+        self._merged_keys = None
+        # Колонка стороны -> позиция колонки в merged
+        self._columns = {}
+
+    @property
+    def merged(self):
+        """
+        Объединенные данные (None до build)
+        Выданный DataFrame не меняется: следующая правка ячеек сначала
+        копирует его, дальнейшие правки до следующего обращения идут на месте
+        """
+        self._handed_out = self._merged
+        return self._merged
+
+    @property
+    def is_built(self):
+        return self._merged is not None
+
+    def build(self, elements_df, proc_df):
+        """Полное объединение данных"""
+        with stage('merge_index'):
+            return self._build(elements_df, proc_df)
+
+    def _build(self, elements_df, proc_df):
+        self.reset()
+        self._frames = {'elements': elements_df, 'proc': proc_df}
+        self._by_key = (self.KEY in elements_df.columns and
+                        self.KEY in proc_df.columns)
+
+        if not self._by_key:
+            self._merged = self.data_processor.merge_data(as_frame(elements_df),
+                                                         as_frame(proc_df))
+            self._incremental = elements_df.index.is_unique
+            return self.merged
+
+        try:
+            self._build_index()
+        except Exception:
+            # Индекс построить нельзя - изменения пересобирают результат целиком
+            self._incremental = False
+            self._merged = self.data_processor.merge_data(as_frame(elements_df),
+                                                         as_frame(proc_df))
+        return self.merged
+
+    def _build_index(self):
+        """Индексы по Designator и объединение с привязкой строк к источникам"""
+        for side in SIDES:
+            df = as_frame(self._frames[side])
+            ids = np.arange(len(df), dtype=np.int64)
+            keys = [self._norm_key(key) for key in df[self.KEY].tolist()]
+            index = {}
+            for row_id, key in enumerate(keys):
+                index.setdefault(key, []).append(row_id)
+            self._ids[side] = ids
+            self._next_id[side] = len(df)
+            self._keys[side] = dict(enumerate(keys))
+            self._index[side] = index
+
+        self._merged, self._src = self._merge_rows(self._ids['elements'],
+                                                  self._ids['proc'])
+        self._merged_keys = np.array(
+            [self._norm_key(key) for key in self._merged[self.KEY].tolist()],
+            dtype=object
+        )
+        self._map_columns()
+
+    def row_updated(self, side, df, label):
+        """Строка с меткой label стороны side изменена на месте"""
+        self._apply(side, df, self._update, label)
+
+    def row_added(self, side, df, label):
+        """В конец стороны side добавлена строка с меткой label"""
+        self._apply(side, df, self._add, label)
+
+    def row_inserted(self, side, df, position):
+        """
+        В сторону side вставлена строка на позицию position
+        id строк возрастают вместе с позициями, поэтому инкрементально
+        обрабатывается только вставка в конец; вставка в середину
+        пересобирает результат
+        """
+        self._apply(side, df, self._insert, position)
+
+    def row_deleted(self, side, df, position):
+        """Из стороны side удалена строка, стоявшая на позиции position"""
+        self._apply(side, df, self._delete, position)
+
+    def _apply(self, side, df, operation, arg):
+        """Инкрементальное изменение с откатом к полной пересборке"""
+        if not self.is_built:
+            self._frames[side] = df
+            return
+
+        previous = self._frames[side]
+        self._frames[side] = df
+        with stage('merge_incremental', rows=1):
+            try:
+                if not self._incremental:
+                    raise ValueError("Инкрементальное обновление недоступно")
+                if list(df.columns) != list(previous.columns):
+                    raise ValueError("Изменился набор колонок")
+                operation(side, df, arg)
+            except Exception:
+                self.build(self._frames['elements'], self._frames['proc'])
+
+    # Объединение по Designator
+
+    def _update(self, side, df, label):
+        position = df.index.get_loc(label)
+        if not self._by_key:
+            self._update_concat(side, df, label, position)
+            return
+
+        row_id = int(self._ids[side][position])
+        old_key = self._keys[side][row_id]
+        values = self._row(df, position)
+        new_key = self._norm_key(values[self.KEY])
+
+        if new_key == old_key:
+            # Обозначение не изменилось - обновляются только ячейки
+            rows = np.flatnonzero(self._src[side] == row_id)
+            self._write_cells(rows, {target: values.iloc[column]
+                                     for column, target in self._columns[side].items()})
+            return
+
+        old_ids = self._group_ids([old_key, new_key])
+        self._index[side][old_key].remove(row_id)
+        bisect.insort(self._index[side].setdefault(new_key, []), row_id)
+        self._keys[side][row_id] = new_key
+        self._regroup([old_key, new_key], old_ids)
+
+    def _add(self, side, df, label):
+        position = df.index.get_loc(label)
+        if position != len(df) - 1:
+            raise ValueError("Строка добавлена не в конец")
+        if not self._by_key:
+            self._rebuild_concat()
+            return
+
+        row_id = self._next_id[side]
+        self._next_id[side] += 1
+        self._ids[side] = np.append(self._ids[side], row_id)
+        key = self._norm_key(self._row(df, position)[self.KEY])
+
+        old_ids = self._group_ids([key])
+        self._index[side].setdefault(key, []).append(row_id)
+        self._keys[side][row_id] = key
+        self._regroup([key], old_ids)
+
+    def _insert(self, side, df, position):
+        if position != len(df) - 1:
+            raise ValueError("Строка вставлена не в конец")
+        self._add(side, df, df.index[position])
+
+    def _delete(self, side, df, position):
+        if not self._by_key:
+            self._rebuild_concat()
+            return
+
+        row_id = int(self._ids[side][position])
+        self._ids[side] = np.delete(self._ids[side], position)
+        key = self._keys[side].pop(row_id)
+
+        old_ids = self._group_ids([key])
+        self._index[side][key].remove(row_id)
+        self._regroup([key], old_ids)
+
+    def _group_ids(self, keys):
+        """id строк обеих сторон с указанными обозначениями"""
+        return {
+            side: [row_id for key in set(keys)
+                   for row_id in self._index[side].get(key, [])]
+            for side in SIDES
+        }
+
+    def _regroup(self, keys, old_ids):
+        """
+        Пересчет строк merged для указанных обозначений
+        Строки остальных групп сохраняются, новые строки вставляются
+        на место в порядке сортировки ключей, как в pd.merge(how='outer')
+        """
+        keys = set(keys)
+        new_ids = self._group_ids(keys)
+        group, group_src = self._merge_rows(
+            np.array(sorted(new_ids['elements']), dtype=np.int64),
+            np.array(sorted(new_ids['proc']), dtype=np.int64)
+        )
+
+        # Строки прежних групп находятся по id исходных строк
+        stale = np.zeros(len(self._merged), dtype=bool)
+        for side in SIDES:
+            if old_ids[side]:
+                stale |= np.isin(self._src[side], old_ids[side])
+        kept = np.flatnonzero(~stale)
+        kept_keys = self._merged_keys[kept]
+
+        # Позиции вставки: ключи без NaN отсортированы, NaN стоят в конце
+        group_keys = np.array(
+            [self._norm_key(key) for key in group[self.KEY].tolist()],
+            dtype=object
+        )
+        valid = int(np.count_nonzero(kept_keys != None))  # noqa: E711
+        positions = np.array(
+            [len(kept) if key is None else
+             int(np.searchsorted(kept_keys[:valid], key)) for key in group_keys],
+            dtype=np.int64
+        )
+        order = np.insert(np.arange(len(kept), dtype=np.int64), positions,
+                          np.arange(len(group), dtype=np.int64) + len(kept))
+
+        combined = pd.concat([self._merged.iloc[kept], group], ignore_index=True)
+        self._merged = combined.take(order).reset_index(drop=True)
+        self._merged_keys = np.concatenate([kept_keys, group_keys])[order]
+        for side in SIDES:
+            self._src[side] = np.concatenate(
+                [self._src[side][kept], group_src[side]]
+            )[order]
+
+    def _merge_rows(self, elements_ids, proc_ids):
+        """Объединение строк сторон с указанными id через merge_data"""
+        parts = {}
+        for side, ids in (('elements', elements_ids), ('proc', proc_ids)):
+            df = self._frames[side]
+            positions = np.searchsorted(self._ids[side], ids)
+            if len(positions) != len(df):
+                df = df.take(positions)
+            else:
+                df = as_frame(df)
+            parts[side] = df.assign(**{self.ID_COLUMNS[side]: ids})
+
+        merged = self.data_processor.merge_data(parts['elements'], parts['proc'])
+        src = {
+            side: merged.pop(self.ID_COLUMNS[side]).fillna(-1)
+                        .to_numpy(dtype=np.int64)
+            for side in SIDES
+        }
+        return merged.reset_index(drop=True), src
+
+    def _map_columns(self):
+        """Соответствие колонок сторон колонкам merged (с учетом суффиксов)"""
+        columns = {side: list(self._frames[side].columns) for side in SIDES}
+        for side in SIDES:
+            other = 'proc' if side == 'elements' else 'elements'
+            if len(set(columns[side])) != len(columns[side]):
+                raise ValueError("Повторяющиеся колонки")
+            mapping = {}
+            for position, column in enumerate(columns[side]):
+                if column == self.KEY:
+                    continue
+                if column in columns[other]:
+                    column = f'{column}{self.SUFFIXES[side]}'
+                mapping[position] = self._merged.columns.get_loc(column)
+            self._columns[side] = mapping
+
+    # Объединение по индексу
+
+    def _update_concat(self, side, df, label, position):
+        offset = 0 if side == 'elements' else len(self._frames['elements'].columns)
+        row = self._merged.index.get_loc(label)
+        values = self._row(df, position)
+        self._write_cells([row], {offset + column: values.iloc[column]
+                                  for column in range(len(df.columns))})
+
+    def _rebuild_concat(self):
+        self._merged = self.data_processor.merge_data(as_frame(self._frames['elements']),
+                                                     as_frame(self._frames['proc']))
+
+    def _write_cells(self, rows, cells):
+        """Запись значений в строки rows: cells {позиция колонки merged: значение}"""
+        if self._merged is self._handed_out:
+            # Выданный результат остается снимком - правка идет в копию
+            self._merged = self._merged.copy()
+        for target, value in cells.items():
+            self._merged.iloc[rows, target] = value
+
+    @staticmethod
+    def _row(df, position):
+        """Значения строки по позиции без сборки всей таблицы"""
+        return df.take([position]).iloc[0]
+
+    @staticmethod
+    def _norm_key(key):
+        return None if pd.isna(key) else key
@@ -0,0 +1,429 @@
+"""
+Пул постоянно запущенных процессов LibreOffice для конвертации DOCX в PDF
+
+Запуск офисного пакета занимает несколько секунд, поэтому процессы
+soffice --headless --accept запускаются один раз и используются повторно.
+Каждый процесс работает со своим профилем пользователя, задания
+распределяются через очередь свободных процессов. Перед заданием
+процесс проверяется запросом UNO, при падении, зависании или превышении
+времени задания он перезапускается.
+
+Документы конвертируются через UNO (модуль office_uno). Если модуль uno
+доступен в текущем Python, вызовы выполняются напрямую; иначе для
+каждого процесса запускается посредник office_uno.py под Python с uno
+(поставляется с LibreOffice, путь можно задать переменной
+ROUTE_CARD_UNO_PYTHON). Если такой Python не найден, пул не создается
+(get_office_pool возвращает None), и документы конвертируются по одному
+запуском soffice --convert-to (convert_once).
+"""
+import atexit
+import json
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Путь к soffice, Python с uno и число процессов пула (необязательно)
+SOFFICE_ENV = 'ROUTE_CARD_SOFFICE'
+UNO_PYTHON_ENV = 'ROUTE_CARD_UNO_PYTHON'
+WORKERS_ENV = 'ROUTE_CARD_OFFICE_WORKERS'
+
+START_TIMEOUT = 60
+JOB_TIMEOUT = 120
+# Время ответа на проверку работоспособности
+PING_TIMEOUT = 10
+
+# Посредник для конвертации под Python с uno
+HELPER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'office_uno.py')
+
+SOFFICE_ARGS = ['--headless', '--invisible', '--nologo', '--norestore',
+                '--nodefault', '--nolockcheck', '--nofirststartwizard']
+
+
+class OfficeError(Exception):
+    """Ошибка процесса LibreOffice"""
+
+
+def find_soffice():
+    """Поиск исполняемого файла LibreOffice; None, если он не установлен"""
+    path = os.environ.get(SOFFICE_ENV)
+    if path and os.path.isfile(path):
+        return path
+
+    for name in ('soffice', 'libreoffice'):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    if sys.platform == 'win32':
+        for root in (os.environ.get('PROGRAMFILES'), os.environ.get('PROGRAMFILES(X86)')):
+            if root:
+                path = os.path.join(root, 'LibreOffice', 'program', 'soffice.exe')
+                if os.path.isfile(path):
+                    return path
+    elif sys.platform == 'darwin':
+        path = '/Applications/LibreOffice.app/Contents/MacOS/soffice'
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _uno_available():
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def find_uno_python(soffice):
+    """
+    Python с модулем uno для посредника office_uno.py; None, если не найден
+    Проверяются ROUTE_CARD_UNO_PYTHON, Python из поставки LibreOffice
+    и системный python3
+    """
+    program = os.path.dirname(os.path.realpath(soffice))
+    candidates = [
+        os.environ.get(UNO_PYTHON_ENV),
+        os.path.join(program, 'python.exe'),
+        os.path.join(program, 'python'),
+        # macOS: soffice в Contents/MacOS, Python в Contents/Resources
+        os.path.join(program, '..', 'Resources', 'python'),
+        '/usr/bin/python3',
+        shutil.which('python3'),
+    ]
+    for path in candidates:
+        if path and os.path.isfile(path) and _has_uno(path):
+            return path
+    return None
+
+
+def _has_uno(python):
+    try:
+        return subprocess.run([python, '-c', 'import uno'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=START_TIMEOUT).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class OfficeWorker:
+    """
+    Один постоянно запущенный процесс LibreOffice со своим профилем
+
+    uno_python - None, если вызовы UNO выполняются в текущем процессе,
+    иначе путь к Python с uno, под которым запускается посредник
+    """
+
+    def __init__(self, soffice, profile_dir, uno_python=None):
+        self.soffice = soffice
+        self.profile_dir = profile_dir
+        self.uno_python = uno_python
+        self.process = None
+        self.desktop = None
+        self.helper = None
+        self._replies = None
+        self.jobs = 0
+
+    @property
+    def _profile_args(self):
+        return [f'-env:UserInstallation={Path(self.profile_dir).as_uri()}']
+
+    def start(self):
+        """Запуск процесса и подключение к нему"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        port = _free_port()
+        accept = f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'
+        self.process = subprocess.Popen([self.soffice, *SOFFICE_ARGS, *self._profile_args, accept],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if self.uno_python is None:
+                import office_uno
+                self.desktop = office_uno.connect(port, START_TIMEOUT,
+                                                  alive=lambda: self.process.poll() is None)
+            else:
+                self._start_helper(port)
+        except OfficeError:
+            self.stop()
+            raise
+        except Exception as e:
+            self.stop()
+            raise OfficeError(f"Не удалось подключиться к LibreOffice: {e}")
+
+    def _start_helper(self, port):
+        """Запуск посредника office_uno.py и ожидание подключения"""
+        self.helper = subprocess.Popen(
+            [self.uno_python, HELPER_SCRIPT, str(port), str(START_TIMEOUT)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8')
+        # Ответы читаются в отдельном потоке, чтобы ожидание было с таймаутом
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, args=(self.helper.stdout, self._replies),
+                         daemon=True).start()
+        self._wait_reply(START_TIMEOUT + PING_TIMEOUT)
+
+    @staticmethod
+    def _read_replies(stream, replies):
+        for line in stream:
+            if line.startswith('{'):
+                replies.put(line)
+        replies.put(None)
+
+    def _request(self, request, timeout):
+        """Команда посреднику и ожидание ответа"""
+        try:
+            self.helper.stdin.write(json.dumps(request, ensure_ascii=False) + '\n')
+            self.helper.stdin.flush()
+        except (OSError, ValueError):
+            raise OfficeError("Посредник UNO не отвечает")
+        self._wait_reply(timeout)
+
+    def _wait_reply(self, timeout):
+        try:
+            line = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"LibreOffice не ответил за {timeout} с")
+        if line is None:
+            raise OfficeError("Посредник UNO завершился")
+        reply = json.loads(line)
+        if not reply['ok']:
+            raise OfficeError(reply['error'])
+
+    def stop(self):
+        """Остановка процесса (и посредника)"""
+        if self.helper is not None:
+            if self.helper.poll() is None:
+                try:
+                    self._request({'cmd': 'terminate'}, 5)
+                except Exception:
+                    pass
+            try:
+                self.helper.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.helper.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.helper.kill()
+                self.helper.wait()
+            self.helper = None
+            self._replies = None
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def is_alive(self):
+        """Проверка работоспособности: процесс запущен и отвечает на запрос UNO"""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            if self.uno_python is None:
+                import office_uno
+                office_uno.ping(self.desktop)
+            else:
+                if self.helper is None or self.helper.poll() is not None:
+                    return False
+                self._request({'cmd': 'ping'}, PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def convert(self, docx_path, pdf_path, timeout=JOB_TIMEOUT):
+        """Конвертация одного документа"""
+        self.jobs += 1
+        if self.uno_python is None:
+            self._convert_uno(docx_path, pdf_path, timeout)
+        else:
+            self._request({'cmd': 'convert', 'src': os.path.abspath(docx_path),
+                           'dst': os.path.abspath(pdf_path)}, timeout)
+
+    def _convert_uno(self, docx_path, pdf_path, timeout):
+        import office_uno
+
+        # Зависший процесс останавливается по таймеру, вызов UNO при этом
+        # завершается ошибкой
+        expired = threading.Event()
+
+        def kill():
+            expired.set()
+            if self.process is not None:
+                self.process.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            office_uno.convert(self.desktop, docx_path, pdf_path)
+        except Exception as e:
+            if expired.is_set():
+                raise TimeoutError(f"Конвертация не завершилась за {timeout} с")
+            raise OfficeError(e)
+        finally:
+            timer.cancel()
+
+
+# Профиль для convert_once (создается при первом запуске и используется повторно)
+_cli_profile = None
+_cli_lock = threading.Lock()
+
+
+def convert_once(docx_path, pdf_path, soffice=None, timeout=JOB_TIMEOUT):
+    """
+    Конвертация отдельным запуском soffice --convert-to, без пула
+    Используется, когда Python с uno не найден. Запуски выполняются
+    по одному, с общим профилем во временном каталоге
+    """
+    global _cli_profile
+    soffice = soffice or find_soffice()
+    if not soffice:
+        raise OfficeError("LibreOffice не найден")
+
+    with _cli_lock:
+        if _cli_profile is None:
+            _cli_profile = tempfile.mkdtemp(prefix='route_card_office_')
+            atexit.register(shutil.rmtree, _cli_profile, ignore_errors=True)
+        profile = f'-env:UserInstallation={Path(_cli_profile).as_uri()}'
+
+        with tempfile.TemporaryDirectory() as outdir:
+            try:
+                subprocess.run([soffice, *SOFFICE_ARGS, profile,
+                                '--convert-to', 'pdf', '--outdir', outdir,
+                                os.path.abspath(docx_path)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               timeout=timeout, check=True)
+            except subprocess.TimeoutExpired:
+                raise TimeoutError(f"Конвертация не завершилась за {timeout} с")
+            except subprocess.CalledProcessError as e:
+                raise OfficeError(f"soffice завершился с кодом {e.returncode}")
+
+            result = os.path.join(outdir, Path(docx_path).stem + '.pdf')
+            if not os.path.isfile(result):
+                raise OfficeError("LibreOffice не создал PDF файл")
+            shutil.move(result, pdf_path)
+
+
+class OfficePool:
+    """
+    Пул процессов LibreOffice
+
+    Процессы запускаются при первой конвертации. convert блокируется,
+    пока не освободится процесс, поэтому метод можно вызывать из
+    нескольких потоков - задания распределяются по всем процессам.
+    """
+
+    def __init__(self, soffice=None, size=None, timeout=JOB_TIMEOUT):
+        self.soffice = soffice or find_soffice()
+        if not self.soffice:
+            raise OfficeError("LibreOffice не найден")
+        # Без uno в текущем Python вызовы идут через посредника
+        self.uno_python = None
+        if not _uno_available():
+            self.uno_python = find_uno_python(self.soffice)
+            if self.uno_python is None:
+                raise OfficeError("Не найден Python с модулем uno")
+        if size is None:
+            size = int(os.environ.get(WORKERS_ENV, 0)) or min(4, os.cpu_count() or 1)
+        self.size = max(1, size)
+        self.timeout = timeout
+
+        self._profile_root = tempfile.mkdtemp(prefix='route_card_office_')
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start(self):
+        with self._lock:
+            if self._closed:
+                raise OfficeError("Пул LibreOffice закрыт")
+            if self._workers:
+                return
+            for index in range(self.size):
+                worker = OfficeWorker(self.soffice,
+                                      os.path.join(self._profile_root, f'worker{index}'),
+                                      self.uno_python)
+                worker.start()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def convert(self, docx_path, pdf_path):
+        """
+        Конвертация DOCX в PDF на свободном процессе пула
+
+        При падении процесса он перезапускается и задание повторяется один раз,
+        при превышении времени задания процесс перезапускается, а ошибка
+        передается вызывающему.
+        """
+        self._start()
+        worker = self._idle.get()
+        try:
+            for attempt in range(2):
+                if not worker.is_alive():
+                    worker.restart()
+                try:
+                    worker.convert(docx_path, pdf_path, self.timeout)
+                    return
+                except TimeoutError:
+                    worker.restart()
+                    raise
+                except OfficeError:
+                    if attempt or worker.is_alive():
+                        raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """Остановка всех процессов и удаление профилей"""
+        with self._lock:
+            self._closed = True
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+        shutil.rmtree(self._profile_root, ignore_errors=True)
+
+
+_pool = None
+# Поиск LibreOffice и Python с uno выполняется один раз
+_pool_checked = False
+_pool_lock = threading.Lock()
+
+
+def get_office_pool():
+    """Общий пул процесса; None, если LibreOffice или Python с uno не найдены"""
+    global _pool, _pool_checked
+    with _pool_lock:
+        if _pool is None and not _pool_checked:
+            _pool_checked = True
+            soffice = find_soffice()
+            if not soffice:
+                return None
+            try:
+                _pool = OfficePool(soffice)
+            except OfficeError:
+                return None
+            atexit.register(_pool.close)
+        return _pool
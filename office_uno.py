@@ -0,0 +1,118 @@
+"""
+Конвертация документов через UNO в запущенном процессе LibreOffice
+
+Модуль используется пулом office_pool: импортируется, если модуль uno
+доступен в текущем Python, или запускается посредником под Python с uno
+(например, поставляемым с LibreOffice):
+
+    python office_uno.py PORT TIMEOUT
+
+Посредник подключается к процессу soffice, слушающему порт PORT, и
+читает команды из stdin построчно в JSON: {"cmd": "ping"},
+{"cmd": "convert", "src": ..., "dst": ...}, {"cmd": "terminate"}.
+Ответ на подключение и на каждую команду - строка {"ok": true} или
+{"ok": false, "error": ...} в stdout. Модуль использует только
+стандартную библиотеку и uno.
+"""
+import json
+import os
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+
+
+def _props(**values):
+    result = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        result.append(prop)
+    return tuple(result)
+
+
+def connect(port, timeout, alive=None):
+    """
+    Desktop процесса LibreOffice, слушающего порт port
+
+    Args:
+        alive: функция проверки, что процесс еще работает (необязательно)
+    """
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext(
+        'com.sun.star.bridge.UnoUrlResolver', local)
+    url = f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if alive is not None and not alive():
+            raise RuntimeError("Процесс LibreOffice завершился при запуске")
+        try:
+            context = resolver.resolve(url)
+            return context.ServiceManager.createInstanceWithContext(
+                'com.sun.star.frame.Desktop', context)
+        except Exception:
+            if time.monotonic() > deadline:
+                raise TimeoutError("LibreOffice не ответил за отведенное время")
+            time.sleep(0.25)
+
+
+def convert(desktop, docx_path, pdf_path):
+    """Конвертация DOCX в PDF"""
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(docx_path)), '_blank', 0,
+        _props(Hidden=True, ReadOnly=True))
+    try:
+        document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                            _props(FilterName='writer_pdf_Export'))
+    finally:
+        document.close(True)
+
+
+def ping(desktop):
+    """Проверка, что процесс отвечает на вызовы UNO"""
+    desktop.getComponents()
+
+
+def _reply(ok, error=None):
+    message = {'ok': True} if ok else {'ok': False, 'error': error}
+    sys.stdout.write(json.dumps(message, ensure_ascii=False) + '\n')
+    sys.stdout.flush()
+
+
+def serve(port, timeout):
+    """Выполнение команд из stdin (режим посредника)"""
+    try:
+        desktop = connect(port, timeout)
+    except Exception as e:
+        _reply(False, f'{e}')
+        return 1
+    _reply(True)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if request['cmd'] == 'convert':
+                convert(desktop, request['src'], request['dst'])
+            elif request['cmd'] == 'terminate':
+                try:
+                    desktop.terminate()
+                except Exception:
+                    # Соединение закрывается вместе с процессом
+                    pass
+                _reply(True)
+                return 0
+            else:
+                ping(desktop)
+            _reply(True)
+        except Exception as e:
+            _reply(False, f'{e}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(serve(int(sys.argv[1]), float(sys.argv[2])))
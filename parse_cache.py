@@ -0,0 +1,155 @@
+"""
+Дисковый кэш разобранных входных файлов (Elements.xlsx, Proc.txt)
+Повторная загрузка неизменного файла читает готовый DataFrame с диска
+вместо полного разбора исходного файла
+"""
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Версия формата записей: при изменении разбора старые записи не подходят
+CACHE_VERSION = 1
+
+
+def default_cache_dir():
+    """Каталог кэша по умолчанию для текущей платформы"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'route_card_generator' / 'parsed'
+
+
+class ParseCache:
+    """
+    Кэш DataFrame на диске
+    
+    Ключ записи строится из пути, размера, времени изменения и хэша
+    содержимого файла. Записи хранятся в бинарном формате pickle
+    (блоки колонок pandas сохраняются как есть), при превышении
+    лимита размера удаляются давно не использованные записи (LRU).
+    
+    Кэш отключается параметром enabled=False или переменной окружения
+    ROUTE_CARD_CACHE=0, каталог задается переменной ROUTE_CARD_CACHE_DIR.
+    """
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+    HASH_CHUNK_SIZE = 1024 * 1024
+    SUFFIX = '.pkl'
+    
+    def __init__(self, cache_dir=None, max_bytes=None, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('ROUTE_CARD_CACHE', '1') != '0'
+        if cache_dir is None:
+            cache_dir = os.environ.get('ROUTE_CARD_CACHE_DIR') or default_cache_dir()
+        
+        self.enabled = enabled
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = self.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+    
+    def get_or_load(self, filepath, kind, loader):
+        """
+        Получение разобранного файла из кэша
+        
+        Args:
+            filepath: путь к исходному файлу
+            kind: вид разбора (один файл может разбираться по-разному)
+            loader: функция разбора файла, вызывается при промахе
+        """
+        if not self.enabled:
+            return loader(filepath)
+        
+        try:
+            entry = self.cache_dir / (self._make_key(filepath, kind) + self.SUFFIX)
+        except OSError:
+            return loader(filepath)
+        
+        df = self._read_entry(entry)
+        if df is not None:
+            return df
+        
+        df = loader(filepath)
+        self._write_entry(entry, df)
+        return df
+    
+    def clear(self):
+        """Удаление всех записей кэша"""
+        for entry, _, _ in self._entries():
+            self._remove(entry)
+    
+    def _make_key(self, filepath, kind):
+        """Ключ записи: путь, размер, время изменения и хэш содержимого"""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{CACHE_VERSION}\0{pd.__version__}\0{kind}\0'.encode())
+        digest.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _read_entry(self, entry):
+        """Чтение записи; поврежденная запись удаляется"""
+        try:
+            df = pd.read_pickle(entry)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(entry)
+            return None
+        
+        # Время доступа для вытеснения LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return df
+    
+    def _write_entry(self, entry, df):
+        """Атомарная запись в кэш; ошибки записи не мешают загрузке"""
+        tmp = entry.with_name(f'{entry.name}.{os.getpid()}.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_pickle(tmp)
+            os.replace(tmp, entry)
+        except Exception:
+            self._remove(tmp)
+            return
+        self._evict()
+    
+    def _entries(self):
+        """Записи кэша: (путь, размер, время последнего доступа)"""
+        entries = []
+        try:
+            paths = list(self.cache_dir.glob('*' + self.SUFFIX))
+        except OSError:
+            return entries
+        for entry in paths:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((entry, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def _evict(self):
+        """Удаление самых старых записей сверх лимита размера"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(entry)
+            total -= size
+    
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -0,0 +1,134 @@
+"""
+Шрифты с поддержкой кириллицы для построения PDF
+
+Шрифт TTF (ГОСТ тип А, DejaVu Sans или Arial) регистрируется в reportlab
+один раз за процесс. При сохранении PDF reportlab встраивает только
+подмножество глифов, использованных в документе, поэтому размер файла
+не зависит от размера шрифта.
+"""
+import os
+import sys
+from functools import lru_cache
+
+# Путь к TTF файлу, заданный пользователем (необязательно)
+FONT_ENV = 'ROUTE_CARD_FONT'
+FONT_BOLD_ENV = 'ROUTE_CARD_FONT_BOLD'
+
+FONT_NAME = 'RouteCard'
+FONT_BOLD_NAME = 'RouteCard-Bold'
+
+# Шрифты без кириллицы, используемые, если TTF не найден
+FALLBACK_FONTS = ('Helvetica', 'Helvetica-Bold')
+
+# Пары (обычный, полужирный) в порядке предпочтения
+FONT_CANDIDATES = [
+    ('GOST_type_A.ttf', None),
+    ('GOST type A.ttf', None),
+    ('GOSTtypeA.ttf', None),
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf'),
+    ('arial.ttf', 'arialbd.ttf'),
+    ('Arial.ttf', 'Arial Bold.ttf'),
+    ('LiberationSans-Regular.ttf', 'LiberationSans-Bold.ttf'),
+]
+
+
+def font_dirs():
+    """Каталоги поиска шрифтов: каталог fonts проекта, затем системные"""
+    dirs = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')]
+    if sys.platform == 'win32':
+        windir = os.environ.get('WINDIR', r'C:\Windows')
+        dirs.append(os.path.join(windir, 'Fonts'))
+        local = os.environ.get('LOCALAPPDATA')
+        if local:
+            dirs.append(os.path.join(local, 'Microsoft', 'Windows', 'Fonts'))
+    elif sys.platform == 'darwin':
+        dirs.extend(['/Library/Fonts', '/System/Library/Fonts/Supplemental',
+                     os.path.expanduser('~/Library/Fonts')])
+    else:
+        dirs.extend(['/usr/share/fonts/truetype/dejavu', '/usr/share/fonts/TTF',
+                     '/usr/share/fonts/dejavu', '/usr/share/fonts/truetype/msttcorefonts',
+                     '/usr/share/fonts/truetype/liberation',
+                     os.path.expanduser('~/.local/share/fonts'),
+                     os.path.expanduser('~/.fonts')])
+    return dirs
+
+
+def find_font_files():
+    """
+    Поиск TTF файлов шрифта
+
+    Returns:
+        Пара (обычный, полужирный); полужирный может быть None,
+        (None, None), если подходящий шрифт не найден
+    """
+    regular = os.environ.get(FONT_ENV)
+    if regular and os.path.isfile(regular):
+        bold = os.environ.get(FONT_BOLD_ENV)
+        return regular, bold if bold and os.path.isfile(bold) else None
+
+    dirs = [path for path in font_dirs() if os.path.isdir(path)]
+    for regular_name, bold_name in FONT_CANDIDATES:
+        for directory in dirs:
+            regular = os.path.join(directory, regular_name)
+            if not os.path.isfile(regular):
+                continue
+            bold = os.path.join(directory, bold_name) if bold_name else None
+            return regular, bold if bold and os.path.isfile(bold) else None
+    return None, None
+
+
+@lru_cache(maxsize=None)
+def route_card_fonts():
+    """
+    Регистрация шрифтов в reportlab (один раз за процесс)
+
+    Returns:
+        Пара имен шрифтов (обычный, полужирный) для canvas и стилей
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.fonts import addMapping
+
+    regular, bold = find_font_files()
+    if not regular:
+        return FALLBACK_FONTS
+
+    try:
+        pdfmetrics.registerFont(TTFont(FONT_NAME, regular))
+        bold_name = FONT_NAME
+        if bold:
+            pdfmetrics.registerFont(TTFont(FONT_BOLD_NAME, bold))
+            bold_name = FONT_BOLD_NAME
+    except Exception:
+        # Поврежденный или неподдерживаемый файл шрифта
+        return FALLBACK_FONTS
+
+    # Семейство для разметки <b> в Paragraph
+    addMapping(FONT_NAME, 0, 0, FONT_NAME)
+    addMapping(FONT_NAME, 1, 0, bold_name)
+    addMapping(FONT_NAME, 0, 1, FONT_NAME)
+    addMapping(FONT_NAME, 1, 1, bold_name)
+    return FONT_NAME, bold_name
+
+
+@lru_cache(maxsize=None)
+def paragraph_styles():
+    """Стили абзацев PDF с зарегистрированным шрифтом (создаются один раз)"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    regular, bold = route_card_fonts()
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'RouteCardTitle',
+            parent=styles['Heading1'],
+            fontName=bold,
+            fontSize=16,
+            alignment=1  # Центрирование
+        ),
+        'normal': ParagraphStyle(
+            'RouteCardNormal',
+            parent=styles['Normal'],
+            fontName=regular,
+        ),
+    }
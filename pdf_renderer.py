@@ -0,0 +1,210 @@
+"""
+Построение маршрутной карты в PDF напрямую из строк маршрутной карты,
+без промежуточного DOCX
+"""
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+from instrumentation import stage
+from layout import wrap_text
+from pdf_fonts import route_card_fonts
+
+
+class PdfRouteCardRenderer:
+    """
+    Отрисовка маршрутной карты средствами canvas reportlab
+
+    Рамки листов (Форма 4 и Форма 3б) с заголовком основной таблицы
+    рисуются один раз как XObject и повторно используются на каждом
+    листе соответствующего типа; на листе рисуются только номер листа
+    и строки таблицы. Размеры колонок берутся из DocumentGenerator, а
+    высота и перенос текста строк - из его RouteLayout, поэтому PDF
+    повторяет разметку DOCX.
+    Текст выводится шрифтом с кириллицей из pdf_fonts.
+    """
+    TITLE_FONT_SIZE = 14
+    INFO_FONT_SIZE = 9
+    TITLE_HEIGHT = 1.2 * cm
+    INFO_ROW_HEIGHT = 0.7 * cm
+    GAP = 0.5 * cm
+
+    def __init__(self, generator):
+        self.page_width, self.page_height = A4
+        self.left = 2.0 * cm
+        self.right = 1.0 * cm
+        self.top = 1.5 * cm
+        self.content_width = self.page_width - self.left - self.right
+
+        # Основная таблица центрируется относительно полей, как в DOCX
+        self.column_widths = [width.pt for width in generator.ROUTE_COLUMN_WIDTHS]
+        self.table_left = self.left + (self.content_width - sum(self.column_widths)) / 2
+        self.padding = generator.CELL_MARGIN.pt
+        self.layout = generator.get_layout()
+
+        self.headers = generator.ROUTE_HEADERS
+        self.fields = generator.ROUTE_FIELDS
+        self.row_height = generator.ROW_HEIGHT.pt
+        self.header_font_size = generator.HEADER_FONT_SIZE.pt
+        self.row_font_size = generator.ROW_FONT_SIZE.pt
+        self.font, self.font_bold = route_card_fonts()
+
+        # Верх первой строки данных для каждого типа листа
+        self._rows_top = {}
+        # Положение ячейки номера листа на Форме 3б
+        self._page_number_cell = None
+
+    def render(self, output_path, doc_info, pages):
+        """
+        Сохранение PDF
+
+        Args:
+            output_path: путь к PDF файлу
+            doc_info: словарь с информацией о документе
+            pages: пары (номер листа, строки листа), как DocumentGenerator._iter_pages
+        """
+        pdf = canvas.Canvas(output_path, pagesize=A4)
+        pdf.setTitle('Маршрутная карта')
+        pdf.setAuthor(doc_info.get('developer', ''))
+
+        defined = set()
+        for page_num, rows in pages:
+            with stage('render_page', rows=len(rows)):
+                form = 'form_4' if page_num == 1 else 'form_3b'
+                if form not in defined:
+                    self._define_frame(pdf, form, doc_info)
+                    defined.add(form)
+
+                pdf.doForm(form)
+                if form == 'form_3b':
+                    x, y, width, height = self._page_number_cell
+                    self._draw_text(pdf, str(page_num), x, y, width, height,
+                                    self.font, self.INFO_FONT_SIZE)
+                self._draw_rows(pdf, rows, self._rows_top[form])
+                pdf.showPage()
+
+        pdf.save()
+
+    def _define_frame(self, pdf, form, doc_info):
+        """Рамка листа как XObject"""
+        pdf.beginForm(form)
+        y = self.page_height - self.top
+        if form == 'form_4':
+            y = self._draw_form_4_frame(pdf, doc_info, y)
+        else:
+            y = self._draw_form_3b_frame(pdf, doc_info, y)
+        self._rows_top[form] = self._draw_table_header(pdf, y - self.GAP)
+        pdf.endForm()
+
+    def _draw_form_4_frame(self, pdf, doc_info, y):
+        """Заголовок и информационная рамка первого листа"""
+        pdf.setFont(self.font_bold, self.TITLE_FONT_SIZE)
+        pdf.drawCentredString(self.left + self.content_width / 2,
+                              y - self.TITLE_HEIGHT + self.TITLE_FONT_SIZE / 2,
+                              'МАРШРУТНАЯ КАРТА')
+        y -= self.TITLE_HEIGHT
+
+        rows = [
+            [('Наименование изделия', 1), (doc_info.get('product_name', ''), 3)],
+            [('Обозначение', 1), (doc_info.get('designation', ''), 1),
+             ('Лист', 1), ('1', 1)],
+            [('Разработал', 1), (doc_info.get('developer', ''), 1),
+             ('Дата', 1), (doc_info.get('date', ''), 1)],
+            [('Проверил', 1), ('', 1), ('Дата', 1), ('', 1)],
+        ]
+        return self._draw_info_table(pdf, rows, y)
+
+    def _draw_form_3b_frame(self, pdf, doc_info, y):
+        """Заголовок последующего листа; номер листа рисуется отдельно"""
+        rows = [
+            [('Обозначение', 1), (doc_info.get('designation', ''), 1),
+             ('Лист', 1), ('', 1)],
+            [('МАРШРУТНАЯ КАРТА (продолжение)', 4)],
+        ]
+        column_width = self.content_width / 4
+        self._page_number_cell = (self.left + 3 * column_width,
+                                  y - self.INFO_ROW_HEIGHT,
+                                  column_width, self.INFO_ROW_HEIGHT)
+        return self._draw_info_table(pdf, rows, y)
+
+    def _draw_info_table(self, pdf, rows, y):
+        """Таблица 4 колонки во всю ширину; ячейка задается (текст, число колонок)"""
+        column_width = self.content_width / 4
+        pdf.setLineWidth(0.5)
+        for cells in rows:
+            x = self.left
+            for text, span in cells:
+                width = column_width * span
+                pdf.rect(x, y - self.INFO_ROW_HEIGHT, width, self.INFO_ROW_HEIGHT)
+                self._draw_text(pdf, text, x, y - self.INFO_ROW_HEIGHT, width,
+                                self.INFO_ROW_HEIGHT, self.font, self.INFO_FONT_SIZE)
+                x += width
+            y -= self.INFO_ROW_HEIGHT
+        return y
+
+    def _draw_table_header(self, pdf, y):
+        """Строка заголовков основной таблицы; возвращает верх первой строки"""
+        x = self.table_left
+        for header, width in zip(self.headers, self.column_widths):
+            pdf.rect(x, y - self.row_height, width, self.row_height)
+            self._draw_text(pdf, header, x, y - self.row_height, width,
+                            self.row_height, self.font_bold, self.header_font_size,
+                            centered=True)
+            x += width
+        return y - self.row_height
+
+    def _draw_rows(self, pdf, rows, y):
+        """Строки основной таблицы листа"""
+        if not rows:
+            pdf.setFont(self.font, self.INFO_FONT_SIZE)
+            pdf.drawString(self.table_left, y - self.row_height / 2,
+                           'Нет данных для отображения')
+            return
+
+        # Сетка таблицы рисуется одной операцией на лист
+        xs = [self.table_left]
+        for width in self.column_widths:
+            xs.append(xs[-1] + width)
+        heights = [self.layout.row_height(row) for row in rows]
+        ys = [y]
+        for height in heights:
+            ys.append(ys[-1] - height)
+        pdf.setLineWidth(0.5)
+        pdf.grid(xs, ys)
+
+        pdf.setFont(self.font, self.row_font_size)
+        leading = self.layout.line_height
+        for row, top, height in zip(rows, ys, heights):
+            for field, x in zip(self.fields, xs):
+                lines = self.layout.wrap(row.get(field, ''), field)
+                self._draw_lines(pdf, lines, x + self.padding, top - height, height,
+                                 leading, self.row_font_size)
+
+    def _draw_lines(self, pdf, lines, x, y, height, leading, size):
+        """Строки текста, блок центрируется по вертикали в ячейке"""
+        baseline = y + (height + len(lines) * leading) / 2 - size
+        for line in lines:
+            pdf.drawString(x, baseline, line)
+            baseline -= leading
+
+    def _draw_text(self, pdf, text, x, y, width, height, font, size, centered=False):
+        """
+        Текст в ячейке с переносом по словам
+        Строки, не помещающиеся по высоте ячейки, отбрасываются
+        """
+        if not text:
+            return
+
+        leading = size * self.layout.LINE_SPACING
+        max_lines = max(1, int(height // leading))
+        lines = wrap_text(str(text), font, size, width - 2 * self.padding)[:max_lines]
+
+        pdf.setFont(font, size)
+        if centered:
+            baseline = y + (height + len(lines) * leading) / 2 - size
+            for line in lines:
+                pdf.drawCentredString(x + width / 2, baseline, line)
+                baseline -= leading
+        else:
+            self._draw_lines(pdf, lines, x + self.padding, y, height, leading, size)
+
@@ -7,10 +7,21 @@ import tempfile
 import os
 import subprocess
 
+from instrumentation import stage, format_report
+from background import page_progress
+
 class PreviewWindow:
-    def __init__(self, parent, data, doc_generator):
+    def __init__(self, parent, data, doc_generator, content=None, run_task=None):
+        """
+        Args:
+            content: готовый текст предпросмотра (см. build_content)
+            run_task: запуск операции в фоне, как RouteCardApp.run_task;
+                без него формирование документов выполняется сразу
+        """
         self.data = data
         self.doc_generator = doc_generator
+        self.run_task = run_task
+        self.stats_text = ""
         
         self.window = tk.Toplevel(parent)
         self.window.title("Предпросмотр маршрутной карты")
@@ -23,7 +34,10 @@ class PreviewWindow:
         self.window.geometry(f"+{x}+{y}")
         
         self.setup_ui()
-        self.generate_preview()
+        if content is None:
+            self.generate_preview()
+        else:
+            self.show_content(content)
     
     def setup_ui(self):
         """Создание интерфейса"""
@@ -80,71 +94,107 @@ class PreviewWindow:
     
     def generate_preview(self):
         """Генерация предпросмотра"""
-        try:
-            self.preview_text.delete('1.0', tk.END)
-            
-            # Заголовок
-            self.preview_text.insert(tk.END, "=" * 80 + "\n")
-            self.preview_text.insert(tk.END, "МАРШРУТНАЯ КАРТА".center(80) + "\n")
-            self.preview_text.insert(tk.END, "=" * 80 + "\n\n")
-            
+        with stage('preview_text', rows=0 if self.data is None else len(self.data)) as timing:
+            try:
+                self.show_content(self.build_content(self.data))
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось создать предпросмотр:\n{e}")
+        self.show_report(timing.report)
+    
+    def show_report(self, report):
+        """Время этапов в строке статистики (при включенном замере)"""
+        if report:
+            self.stats_label.config(text=f"{self.stats_text} | {format_report(report)}")
+    
+    @staticmethod
+    def build_content(data):
+        """
+        Текст предпросмотра и строка статистики
+        Не обращается к виджетам, поэтому может готовиться в рабочем потоке
+        """
+        lines = [
+            "=" * 80,
+            "МАРШРУТНАЯ КАРТА".center(80),
+            "=" * 80,
+            "",
             # Информация
-            self.preview_text.insert(tk.END, "Наименование изделия: Печатный узел\n")
-            self.preview_text.insert(tk.END, "Обозначение: \n")
-            self.preview_text.insert(tk.END, "Дата: \n\n")
+            "Наименование изделия: Печатный узел",
+            "Обозначение: ",
+            "Дата: ",
+            "",
+            "-" * 80,
+            "",
+        ]
+        stats_text = ""
+        
+        # Данные
+        if data is not None and not data.empty:
+            # Определение колонок для отображения
+            display_columns = [col for col in data.columns if not data[col].isna().all()]
             
-            self.preview_text.insert(tk.END, "-" * 80 + "\n\n")
+            # Заголовки
+            header = " | ".join([f"{col[:15]:15}" for col in display_columns])
+            lines.append(header)
+            lines.append("-" * len(header))
             
-            # Данные
-            if self.data is not None and not self.data.empty:
-                # Определение колонок для отображения
-                display_columns = []
-                for col in self.data.columns:
-                    if not self.data[col].isna().all():
-                        display_columns.append(col)
-                
-                # Заголовки
-                header = " | ".join([f"{col[:15]:15}" for col in display_columns])
-                self.preview_text.insert(tk.END, header + "\n")
-                self.preview_text.insert(tk.END, "-" * len(header) + "\n")
-                
-                # Строки данных
-                for idx, row in self.data.iterrows():
-                    row_text = " | ".join([
-                        f"{str(row[col])[:15]:15}" 
-                        for col in display_columns
-                    ])
-                    self.preview_text.insert(tk.END, row_text + "\n")
-                
-                # Статистика
-                stats = f"Всего строк: {len(self.data)} | Колонок: {len(display_columns)}"
-                self.stats_label.config(text=stats)
-            else:
-                self.preview_text.insert(tk.END, "Нет данных для отображения\n")
+            # Строки данных
+            for row in data[display_columns].itertuples(index=False, name=None):
+                lines.append(" | ".join([f"{str(value)[:15]:15}" for value in row]))
             
-            self.preview_text.config(state=tk.DISABLED)
+            # Статистика
+            stats_text = (f"Всего строк: {len(data)} | "
+                          f"Колонок: {len(display_columns)}")
+        else:
+            lines.append("Нет данных для отображения")
+        
+        return "\n".join(lines) + "\n", stats_text
+    
+    def show_content(self, content):
+        """Вывод текста предпросмотра одной вставкой"""
+        text, self.stats_text = content
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete('1.0', tk.END)
+        self.preview_text.insert(tk.END, text)
+        self.preview_text.config(state=tk.DISABLED)
+        self.stats_label.config(text=self.stats_text)
+    
+    def _run(self, message, work, on_done, error_message, on_cancel=None):
+        """Операция в фоне через run_task главного окна или сразу"""
+        if self.run_task is not None:
+            self.run_task(message, work, on_done, error_message, on_cancel)
+            return
+        try:
+            result = work(None)
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось создать предпросмотр:\n{e}")
+            messagebox.showerror("Ошибка", f"{error_message}:\n{e}")
+            return
+        on_done(result)
     
     def open_in_word(self):
         """Открытие документа в Word"""
-        try:
-            # Создаем временный файл
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp_path = tmp.name
-            
-            self.doc_generator.create_route_card(self.data, tmp_path)
-            
-            # Открываем в Word
-            if os.name == 'nt':  # Windows
-                os.startfile(tmp_path)
-            else:  # Linux/Mac
-                subprocess.call(['xdg-open', tmp_path])
-            
-            messagebox.showinfo("Информация", 
-                              "Документ открыт в Word.\nВременный файл будет удален при закрытии.")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось открыть документ:\n{e}")
+        # Создаем временный файл
+        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
+            tmp_path = tmp.name
+        
+        def work(task):
+            self.doc_generator.create_route_card(
+                self.data, tmp_path, progress=page_progress(task, "Формирование DOCX"))
+        
+        def done(result):
+            try:
+                # Открываем в Word
+                if os.name == 'nt':  # Windows
+                    os.startfile(tmp_path)
+                else:  # Linux/Mac
+                    subprocess.call(['xdg-open', tmp_path])
+                
+                messagebox.showinfo("Информация", 
+                                  "Документ открыт в Word.\nВременный файл будет удален при закрытии.")
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось открыть документ:\n{e}")
+        
+        self._run("Формирование DOCX...", work, done, "Не удалось открыть документ",
+                  on_cancel=lambda: os.path.exists(tmp_path) and os.remove(tmp_path))
     
     def save_docx(self):
         """Сохранение в DOCX"""
@@ -156,16 +206,23 @@ class PreviewWindow:
         )
         
         if output_path:
-            try:
-                self.doc_generator.create_route_card(self.data, output_path)
+            def work(task):
+                with stage('generate_docx') as timing:
+                    self.doc_generator.create_route_card(
+                        self.data, output_path,
+                        progress=page_progress(task, "Формирование DOCX"))
+                return timing
+            
+            def done(timing):
+                self.show_report(timing.report)
                 messagebox.showinfo("Успех", f"Документ сохранен:\n{output_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить:\n{e}")
+            
+            self._run("Формирование DOCX...", work, done, "Не удалось сохранить",
+                      on_cancel=lambda: os.path.exists(output_path) and os.remove(output_path))
     
     def save_pdf(self):
         """Сохранение в PDF"""
         from tkinter import filedialog
-        import tempfile
         
         output_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
@@ -173,16 +230,15 @@ class PreviewWindow:
         )
         
         if output_path:
-            try:
-                # Создаем временный DOCX
-                with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                    tmp_docx = tmp.name
-                
-                self.doc_generator.create_route_card(self.data, tmp_docx)
-                self.doc_generator.convert_to_pdf(tmp_docx, output_path)
-                
-                os.unlink(tmp_docx)
-                
+            def work(task):
+                with stage('export_pdf') as timing:
+                    self.doc_generator.create_route_card_pdf(
+                        self.data, output_path,
+                        progress=page_progress(task, "Экспорт в PDF"))
+                return timing
+            
+            def done(timing):
+                self.show_report(timing.report)
                 messagebox.showinfo("Успех", f"PDF сохранен:\n{output_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить PDF:\n{e}")
+            
+            self._run("Экспорт в PDF...", work, done, "Не удалось сохранить PDF")
@@ -0,0 +1,266 @@
+"""
+Изменяемое хранилище строк таблицы для редактора (элементы, процессы)
+"""
+import bisect
+
+import numpy as np
+import pandas as pd
+
+
+class RowStore:
+    """
+    Строки таблицы в блоках колонок с пометкой удаленных строк
+
+    Загруженная таблица - первый блок. Добавленные строки накапливаются
+    в открытом блоке (списки значений) и по CHUNK_ROWS строк переводятся
+    в новый блок DataFrame, поэтому добавление строки не копирует
+    таблицу. Удаление только помечает строку; помеченные строки
+    убираются сжатием, когда их становится больше, чем живых.
+
+    Строки адресуются позициями, как iloc (метки индекса совпадают с
+    позициями). Позиция переводится в номер физической строки по кэшу
+    номеров живых строк, который сбрасывается только удалением.
+
+    DataFrame собирается в to_frame (для merge_data и формирования
+    карты) и кэшируется до следующего изменения. Чтение отдельных строк
+    (take, row) обращается к блокам напрямую, без сборки таблицы.
+
+    Блок, выданный наружу (исходная таблица или результат to_frame),
+    копируется перед первой записью в него, поэтому ранее выданные
+    таблицы не меняются и без Copy-on-Write pandas.
+    """
+    CHUNK_ROWS = 1024
+
+    def __init__(self, frame):
+        # Увеличивается при перенумерации физических строк (сжатие, вставка)
+        self.generation = 0
+        self._reset(frame)
+
+    def _reset(self, frame):
+        if not frame.index.equals(pd.RangeIndex(len(frame))):
+            frame = frame.reset_index(drop=True)
+        self.columns = frame.columns
+        # Блоки и номера их первых физических строк
+        self._chunks = [frame]
+        self._starts = [0]
+        # Открытый блок: строки-списки, начиная с физической строки _tail_start
+        self._tail = []
+        self._tail_start = len(frame)
+        # Пометки удаления по физическим строкам
+        self._deleted = bytearray(len(frame))
+        self._deleted_count = 0
+        # Кэш номеров живых строк и число физических строк на момент его построения
+        self._live = None
+        self._live_physical = 0
+        self._frame = frame
+        # Номера блоков, выданных наружу (копируются перед записью)
+        self._shared = {0}
+
+    def __len__(self):
+        return len(self._deleted) - self._deleted_count
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    @property
+    def physical_count(self):
+        """Число физических строк, включая удаленные"""
+        return len(self._deleted)
+
+    def physical_rows(self, positions):
+        """
+        Номера физических строк по позициям
+        Номер строки не меняется при добавлении и удалении других строк
+        (до смены generation), поэтому на него можно ссылаться из индексов
+        """
+        return self._physical(positions)
+
+    def positions_of(self, physical):
+        """Позиции строк по номерам физических строк; удаленные строки пропускаются"""
+        physical = np.asarray(physical, dtype=np.int64)
+        deleted = np.frombuffer(self._deleted, dtype=np.uint8)
+        physical = physical[deleted[physical] == 0]
+        del deleted
+
+        live = self._live_rows()
+        result = np.searchsorted(live, physical)
+        appended = physical >= self._live_physical
+        result[appended] = len(live) + physical[appended] - self._live_physical
+        return result
+
+    def to_frame(self):
+        """DataFrame со всеми живыми строками (кэшируется до изменения)"""
+        if self._frame is None:
+            pieces = list(self._chunks)
+            if self._tail:
+                pieces.append(pd.DataFrame(self._tail, columns=self.columns))
+            pieces = [piece for piece in pieces if len(piece)] or pieces[:1]
+            frame = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
+            if self._deleted_count:
+                frame = frame.take(self._physical(np.arange(len(self)))).reset_index(drop=True)
+            self._frame = frame
+        for number, chunk in enumerate(self._chunks):
+            if chunk is self._frame:
+                self._shared.add(number)
+        return self._frame
+
+    def take(self, positions):
+        """Строки по позициям в виде DataFrame (индекс - позиции)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self._frame is not None:
+            return self._frame.take(positions)
+        if not len(positions):
+            return self._chunks[0].iloc[:0]
+
+        physical = self._physical(positions)
+        bounds = np.array(self._starts + [self._tail_start], dtype=np.int64)
+        owners = np.searchsorted(bounds, physical, side='right') - 1
+
+        pieces = []
+        order = []
+        for owner in np.unique(owners):
+            selected = np.flatnonzero(owners == owner)
+            offsets = physical[selected] - bounds[owner]
+            if owner == len(self._chunks):
+                piece = pd.DataFrame([self._tail[offset] for offset in offsets],
+                                     columns=self.columns)
+            else:
+                piece = self._chunks[owner].take(offsets)
+            pieces.append(piece)
+            order.append(selected)
+
+        frame = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
+        if len(pieces) > 1:
+            frame = frame.take(np.argsort(np.concatenate(order), kind='stable'))
+        frame.index = positions
+        return frame
+
+    def row(self, position):
+        """Значения строки по позиции"""
+        physical = int(self._physical([position])[0])
+        if physical >= self._tail_start:
+            return list(self._tail[physical - self._tail_start])
+        chunk, offset = self._locate(physical)
+        return chunk.iloc[offset].tolist()
+
+    def set_row(self, position, values):
+        """Замена значений строки"""
+        self.set_cells(position, dict(enumerate(values)))
+
+    def set_cells(self, position, cells):
+        """Замена значений ячеек строки: cells {номер колонки: значение}"""
+        physical = int(self._physical([position])[0])
+        self._frame = None
+        if physical >= self._tail_start:
+            row = self._tail[physical - self._tail_start]
+            for column, value in cells.items():
+                row[column] = value
+            return
+        chunk, offset = self._writable(physical)
+        for column, value in cells.items():
+            self._set_value(chunk, offset, column, value)
+
+    def append(self, values):
+        """Добавление строки в конец"""
+        values = list(values)
+        if len(values) != len(self.columns):
+            raise ValueError("Число значений не совпадает с числом колонок")
+        self._tail.append(values)
+        self._deleted.append(0)
+        self._frame = None
+        if len(self._tail) >= self.CHUNK_ROWS:
+            self._seal()
+
+    def insert(self, position, values):
+        """
+        Вставка строки на позицию position
+        В конец - как append; в середину таблица собирается заново (O(n)),
+        это нужно только для отмены удаления
+        """
+        if position == len(self):
+            self.append(values)
+            return
+        if not 0 <= position < len(self):
+            raise IndexError("Позиция строки вне таблицы")
+        frame = self.to_frame()
+        row = pd.DataFrame([list(values)], columns=self.columns)
+        self._reset(pd.concat([frame.iloc[:position], row, frame.iloc[position:]],
+                              ignore_index=True))
+        self.generation += 1
+
+    def delete(self, position):
+        """Удаление строки по позиции (позиции следующих строк уменьшаются на 1)"""
+        physical = int(self._physical([position])[0])
+        self._deleted[physical] = 1
+        self._deleted_count += 1
+        self._live = None
+        self._frame = None
+        if self._deleted_count > len(self):
+            self._compact()
+
+    def _physical(self, positions):
+        """Номера физических строк по позициям"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) and (positions.min() < 0 or positions.max() >= len(self)):
+            raise IndexError("Позиция строки вне таблицы")
+
+        # Строки, добавленные после построения кэша, живые и идут подряд
+        live = self._live_rows()
+        result = positions - len(live) + self._live_physical
+        inside = positions < len(live)
+        result[inside] = live[positions[inside]]
+        return result
+
+    def _live_rows(self):
+        """Кэш номеров живых физических строк"""
+        if self._live is None:
+            deleted = np.frombuffer(self._deleted, dtype=np.uint8)
+            self._live = np.flatnonzero(deleted == 0)
+            self._live_physical = len(self._deleted)
+            del deleted
+        return self._live
+
+    def _locate(self, physical):
+        """Блок и строка в нем для физической строки закрытого блока"""
+        chunk = bisect.bisect_right(self._starts, physical) - 1
+        return self._chunks[chunk], physical - self._starts[chunk]
+
+    def _writable(self, physical):
+        """Как _locate, но выданный наружу блок сначала заменяется копией"""
+        number = bisect.bisect_right(self._starts, physical) - 1
+        if number in self._shared:
+            self._chunks[number] = self._chunks[number].copy()
+            self._shared.discard(number)
+        return self._chunks[number], physical - self._starts[number]
+
+    @staticmethod
+    def _set_value(chunk, row, column, value):
+        try:
+            chunk.iat[row, column] = value
+        except (TypeError, ValueError):
+            # Значение другого типа (например, текст в числовой колонке):
+            # колонка блока переводится в object
+            chunk.isetitem(column, chunk.iloc[:, column].astype(object))
+            chunk.iat[row, column] = value
+
+    def _seal(self):
+        """Перевод открытого блока в DataFrame"""
+        self._chunks.append(pd.DataFrame(self._tail, columns=self.columns))
+        self._starts.append(self._tail_start)
+        self._tail_start += len(self._tail)
+        self._tail = []
+
+    def _compact(self):
+        """Сборка таблицы без удаленных строк в один блок"""
+        self._reset(self.to_frame())
+        self.generation += 1
+
+
+def as_frame(data):
+    """DataFrame для RowStore, иначе data без изменений"""
+    return data.to_frame() if isinstance(data, RowStore) else data
@@ -0,0 +1,163 @@
+"""
+Панель поиска и фильтра над таблицей данных
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+class SearchPanel:
+    """
+    Поиск по обозначению и фильтр по значению колонки для VirtualTable
+
+    Поиск выбирает первую найденную строку (точное совпадение обозначения,
+    иначе совпадение по началу), Enter переходит к следующей. Фильтр и
+    естественная сортировка задают отображаемые строки таблицы
+    (VirtualTable.set_order). Все запросы выполняются по TableIndex.
+    """
+    # Наибольшее число значений в списке фильтра
+    VALUES_LIMIT = 500
+
+    def __init__(self, parent, table, on_status):
+        self.table = table
+        self.on_status = on_status
+        self.index = None
+        # Найденные позиции и номер текущей
+        self._matches = None
+        self._current = 0
+        # Примененный фильтр: (номер колонки, значение) или None
+        self._filter = None
+
+        self.frame = ttk.Frame(parent, padding=(0, 5))
+
+        ttk.Label(self.frame, text="Поиск:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(self.frame, textvariable=self.search_var, width=20)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind('<Return>', lambda e: self.find_next())
+        self.search_var.trace_add('write', lambda *args: self.search())
+
+        ttk.Label(self.frame, text="Фильтр:").pack(side=tk.LEFT, padx=(15, 0))
+        self.column_box = ttk.Combobox(self.frame, state='readonly', width=18)
+        self.column_box.pack(side=tk.LEFT, padx=5)
+        self.column_box.bind('<<ComboboxSelected>>', lambda e: self._load_values())
+        self.value_box = ttk.Combobox(self.frame, width=22)
+        self.value_box.pack(side=tk.LEFT, padx=5)
+        self.value_box.bind('<<ComboboxSelected>>', lambda e: self.apply_filter())
+        self.value_box.bind('<Return>', lambda e: self.apply_filter())
+
+        ttk.Button(self.frame, text="Применить",
+                   command=self.apply_filter).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.frame, text="Сбросить",
+                   command=self.reset_filter).pack(side=tk.LEFT, padx=5)
+
+        self.natural_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.frame, text="Сортировать по обозначению (C2 < C10)",
+                        variable=self.natural_var,
+                        command=self.apply_view).pack(side=tk.LEFT, padx=(15, 0))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_index(self, index):
+        """Индекс новых данных; поиск и фильтр сбрасываются"""
+        self.index = index
+        self._matches = None
+        self._filter = None
+        self.column_box['values'] = [] if index is None else \
+            [str(col) for col in index.store.columns]
+        self.column_box.set('')
+        self.value_box['values'] = []
+        self.value_box.set('')
+        self.apply_view()
+
+    @property
+    def view_active(self):
+        """Таблица показывает отфильтрованные или пересортированные строки"""
+        return self._filter is not None or self.natural_var.get()
+
+    def search(self):
+        """Поиск по введенному тексту и выбор первой найденной строки"""
+        self._matches = None
+        text = self.search_var.get()
+        if self.index is None or not text.strip():
+            return
+
+        matches = self.index.find(text)
+        if self.view_active:
+            import numpy as np
+
+            # Только строки, которые видны при текущем фильтре
+            matches = matches[np.isin(matches, self.table.order)]
+        self._matches = matches
+        self._current = 0
+        if len(matches):
+            self.table.select_position(int(matches[0]))
+            self.on_status(f"Найдено строк: {len(matches)}")
+        else:
+            self.on_status(f"Не найдено: {text.strip()}")
+
+    def find_next(self):
+        """Переход к следующей найденной строке"""
+        if self._matches is None:
+            self.search()
+            return
+        if not len(self._matches):
+            return
+        self._current = (self._current + 1) % len(self._matches)
+        self.table.select_position(int(self._matches[self._current]))
+        self.on_status(f"Строка {self._current + 1} из {len(self._matches)}")
+
+    def apply_filter(self):
+        """Фильтр по значению выбранной колонки"""
+        column = self.column_box.current()
+        if self.index is None or column < 0:
+            return
+        self._filter = (column, self.value_box.get())
+        self.apply_view()
+        self.on_status(f"Строк после фильтра: {len(self.table.order)}")
+
+    def reset_filter(self):
+        self._filter = None
+        self.value_box.set('')
+        self.apply_view()
+
+    def apply_view(self, keep_view=False):
+        """Отображаемые строки по фильтру и сортировке"""
+        self._matches = None
+        if self.index is None or not self.view_active:
+            self.table.set_order(None, keep_view)
+            return
+        positions = None
+        if self._filter is not None:
+            positions = self.index.filter(*self._filter)
+        if self.natural_var.get():
+            positions = self.index.natural_order(positions)
+        self.table.set_order(positions, keep_view)
+
+    def row_updated(self, position):
+        if self.index is not None:
+            self.index.row_updated(position)
+        self._data_changed()
+
+    def row_added(self):
+        if self.index is not None:
+            self.index.row_added()
+        self._data_changed()
+
+    def row_deleted(self):
+        # Индекс ссылается на неизменные номера строк хранилища - обновлять нечего
+        self._data_changed()
+
+    def _data_changed(self):
+        """После правки найденные позиции устарели, фильтр применяется заново"""
+        self._matches = None
+        if self.view_active:
+            self.apply_view(keep_view=True)
+
+    def _load_values(self):
+        """Значения выбранной колонки в списке фильтра"""
+        column = self.column_box.current()
+        if self.index is None or column < 0:
+            return
+        values = self.index.distinct(column, self.VALUES_LIMIT)
+        self.value_box['values'] = values or []
@@ -0,0 +1,427 @@
+"""
+Локальный сервис формирования маршрутных карт
+
+HTTP сервер на asyncio (только стандартная библиотека) принимает
+Elements.xlsx, Proc.txt и информацию о документе и возвращает DOCX или
+PDF. Карты строятся в пуле процессов, которые запускаются и импортируют
+pandas, python-docx и reportlab при старте сервиса, поэтому запрос не
+ждет запуска интерпретатора и загрузки модулей. Задания выполняются
+функцией batch.run_job, как в пакетном режиме.
+
+Тело запроса записывается на диск по частям; разбор multipart и работа
+с файлами выполняются в потоках, поэтому цикл событий не блокируется
+большими запросами.
+
+Запросы:
+    POST /route-card?format=docx|pdf   multipart/form-data с полями
+                                       elements, proc (файлы) и doc_info (JSON)
+    GET  /metrics                      очередь, задания и задержки (JSON)
+    GET  /health                       проверка работоспособности
+
+Запуск:
+    python service.py --port 8765 --workers 4
+    python service.py --unix /tmp/route_card.sock
+
+Пример запроса:
+    curl -F elements=@Elements.xlsx -F proc=@Proc.txt \\
+         -F 'doc_info={"designation": "ПУ-001"}' \\
+         -o card.pdf 'http://127.0.0.1:8765/route-card?format=pdf'
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from email import policy
+from email.feedparser import BytesFeedParser
+from urllib.parse import parse_qs, urlsplit
+
+import batch
+
+DEFAULT_PORT = 8765
+# Ограничения запроса
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 200 * 1024 * 1024
+HEADER_TIMEOUT = 30
+# Заданий в очереди сверх занятых процессов, после чего запросы отклоняются
+MAX_QUEUED = 64
+# Число последних заданий для расчета задержек
+LATENCY_WINDOW = 1000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf',
+}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _warm_up():
+    """
+    Пустое задание: выполняется процессом после инициализации
+    Возвращает pid процесса, по которому проверяется готовность пула
+    """
+    return os.getpid()
+
+
+class RouteCardService:
+    """
+    HTTP сервис поверх пула процессов
+
+    Одновременно выполняется не больше заданий, чем процессов в пуле;
+    остальные ждут в очереди (не больше max_queued, сверх этого - ответ 503).
+    """
+
+    def __init__(self, workers=None, max_queued=MAX_QUEUED):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_queued = max_queued
+        self.executor = None
+        self._slots = None
+
+        self.started = time.time()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Задержки последних заданий: (ожидание в очереди, выполнение, всего)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        # Время этапов последних заданий (см. batch.run_job)
+        self._stages = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        """
+        Запуск и прогрев пула процессов
+        Пул готов, когда пустое задание выполнил каждый процесс, т.е.
+        все процессы запущены и завершили инициализацию
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=batch._init_worker,
+                                            initargs=(False,))
+        self._slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        ready = set()
+        while len(ready) < self.workers:
+            ready.update(await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up)
+                                                for _ in range(self.workers))))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    # Обработка соединения
+
+    async def handle(self, reader, writer):
+        """Обработка одного запроса (соединение закрывается после ответа)"""
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(
+                    self._read_head(reader), HEADER_TIMEOUT)
+                await self._dispatch(method, target, headers, reader, writer)
+            except HttpError as e:
+                await self._send_json(writer, e.status, {'error': str(e)})
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                pass
+            except Exception as e:
+                await self._send_json(writer, 500, {'error': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_head(self, reader):
+        request_line = await reader.readline()
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Неверная строка запроса")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return method, target, headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise HttpError(400, "Слишком много заголовков")
+
+    async def _dispatch(self, method, target, headers, reader, writer):
+        url = urlsplit(target)
+        routes = {
+            '/route-card': ('POST', self._route_card),
+            '/metrics': ('GET', self._metrics),
+            '/health': ('GET', self._health),
+        }
+        if url.path not in routes:
+            raise HttpError(404, f"Неизвестный путь: {url.path}")
+        expected, handler = routes[url.path]
+        if method != expected:
+            raise HttpError(405, f"Ожидается метод {expected}")
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        await handler(query, headers, reader, writer)
+
+    async def _health(self, query, headers, reader, writer):
+        await self._send_json(writer, 200, {'status': 'ok', 'workers': self.workers})
+
+    async def _metrics(self, query, headers, reader, writer):
+        await self._send_json(writer, 200, self.metrics())
+
+    async def _route_card(self, query, headers, reader, writer):
+        fmt = query.get('format', 'docx')
+        if fmt not in CONTENT_TYPES:
+            raise HttpError(400, f"Неизвестный формат: {fmt}")
+
+        content_type = headers.get('content-type', '')
+        if not content_type.startswith('multipart/form-data'):
+            raise HttpError(400, "Ожидается multipart/form-data")
+
+        loop = asyncio.get_running_loop()
+        work_dir = await loop.run_in_executor(None, tempfile.mkdtemp, None,
+                                              'route_card_service_')
+        try:
+            # Файл сообщения для разбора: заголовок Content-Type и тело запроса
+            message_path = os.path.join(work_dir, 'message')
+            await self._read_body(headers, reader, message_path,
+                                  b'Content-Type: ' + content_type.encode('latin-1') +
+                                  b'\r\n\r\n')
+            job = {'name': 'route_card',
+                   'elements': os.path.join(work_dir, 'Elements.xlsx'),
+                   'proc': os.path.join(work_dir, 'Proc.txt')}
+            doc_info = await loop.run_in_executor(None, self._save_form, message_path, job)
+            job['doc_info'] = {str(k): str(v) for k, v in doc_info.items()}
+
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise HttpError(503, "Очередь заданий переполнена")
+
+            result = await self._run(job, work_dir, fmt)
+            if not result['ok']:
+                raise HttpError(422, result['error'])
+            await self._send_file(writer, result['outputs'][0], CONTENT_TYPES[fmt],
+                                  {'X-Rows': str(result['rows']),
+                                   'X-Timings': json.dumps(result['timings'])})
+        finally:
+            await loop.run_in_executor(None, shutil.rmtree, work_dir, True)
+
+    async def _run(self, job, work_dir, fmt):
+        """Выполнение задания в пуле с учетом очереди и задержек"""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            result = await loop.run_in_executor(self.executor, batch.run_job,
+                                                job, work_dir, [fmt])
+        except Exception as e:
+            result = {'ok': False, 'error': f'{e}', 'timings': {}}
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+        finished = time.perf_counter()
+        self._latencies.append((started - submitted, finished - started,
+                                finished - submitted))
+        self._stages.append(result['timings'])
+        if result['ok']:
+            self.completed += 1
+        else:
+            self.failed += 1
+        return result
+
+    async def _read_body(self, headers, reader, path, prefix=b''):
+        """Запись prefix и тела запроса в файл path частями (запись - в потоке)"""
+        try:
+            length = int(headers.get('content-length', ''))
+        except ValueError:
+            raise HttpError(400, "Нужен заголовок Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Слишком большой запрос")
+
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, open, path, 'wb')
+        try:
+            await loop.run_in_executor(None, f.write, prefix)
+            while length > 0:
+                chunk = await reader.readexactly(min(length, STREAM_CHUNK_SIZE))
+                length -= len(chunk)
+                await loop.run_in_executor(None, f.write, chunk)
+        finally:
+            await loop.run_in_executor(None, f.close)
+
+    @classmethod
+    def _save_form(cls, message_path, job):
+        """
+        Разбор multipart/form-data из файла message_path (выполняется в потоке)
+        Файлы elements и proc записываются по путям из job
+
+        Returns:
+            doc_info из поля doc_info
+        """
+        fields = cls._parse_form(message_path)
+        for name in ('elements', 'proc'):
+            if name not in fields:
+                raise HttpError(400, f"Нет поля {name}")
+        try:
+            doc_info = json.loads(fields['doc_info'] or '{}') if 'doc_info' in fields else {}
+        except ValueError:
+            raise HttpError(400, "doc_info должен быть объектом JSON")
+        if not isinstance(doc_info, dict):
+            raise HttpError(400, "doc_info должен быть объектом JSON")
+
+        for name in ('elements', 'proc'):
+            with open(job[name], 'wb') as f:
+                f.write(fields[name])
+        return doc_info
+
+    @staticmethod
+    def _parse_form(message_path):
+        """Поля multipart/form-data из файла сообщения: имя -> содержимое (bytes)"""
+        # BytesParser.parse читает файл в текстовом режиме и меняет переводы
+        # строк внутри файлов - сообщение передается парсеру частями как есть
+        parser = BytesFeedParser(policy=policy.HTTP)
+        with open(message_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                parser.feed(chunk)
+        message = parser.close()
+        if not message.is_multipart():
+            raise HttpError(400, "Неверное содержимое multipart/form-data")
+
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name:
+                fields[name] = part.get_payload(decode=True) or b''
+        return fields
+
+    # Ответы
+
+    async def _send_head(self, writer, status, content_type, length, extra=None):
+        lines = [f'HTTP/1.1 {status} {REASONS.get(status, "")}',
+                 f'Content-Type: {content_type}',
+                 f'Content-Length: {length}',
+                 'Connection: close']
+        lines.extend(f'{name}: {value}' for name, value in (extra or {}).items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'))
+
+    async def _send_json(self, writer, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await self._send_head(writer, status, 'application/json; charset=utf-8', len(data))
+        writer.write(data)
+        await writer.drain()
+
+    async def _send_file(self, writer, path, content_type, extra):
+        """Передача файла частями, без загрузки целиком в память"""
+        await self._send_head(writer, 200, content_type, os.path.getsize(path), extra)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                writer.write(chunk)
+                await writer.drain()
+
+    # Метрики
+
+    def metrics(self):
+        """Состояние очереди, счетчики заданий и задержки (мс)"""
+        def percentiles(values):
+            if not values:
+                return {}
+            values = sorted(values)
+            result = {f'p{q}': values[min(len(values) - 1, len(values) * q // 100)] * 1000
+                      for q in (50, 95, 99)}
+            result['max'] = values[-1] * 1000
+            return result
+
+        stages = {}
+        for timings in self._stages:
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+
+        return {
+            'workers': self.workers,
+            'uptime_s': time.time() - self.started,
+            'queue_depth': self.queued,
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency_ms': {
+                'queue': percentiles([l[0] for l in self._latencies]),
+                'run': percentiles([l[1] for l in self._latencies]),
+                'total': percentiles([l[2] for l in self._latencies]),
+            },
+            'stage_ms': {stage: percentiles(values) for stage, values in stages.items()},
+        }
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, unix_path=None, workers=None,
+                ready=None):
+    """
+    Запуск сервиса до отмены задачи
+
+    Args:
+        ready: функция, вызываемая с адресом сервера после прогрева пула
+    """
+    service = RouteCardService(workers)
+    await service.start()
+    try:
+        if unix_path:
+            server = await asyncio.start_unix_server(service.handle, path=unix_path)
+            address = unix_path
+        else:
+            server = await asyncio.start_server(service.handle, host, port)
+            address = '%s:%s' % server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(address)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервис формирования маршрутных карт")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="порт")
+    parser.add_argument('--unix', help="путь к Unix-сокету вместо TCP")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="число процессов (по умолчанию - число ядер)")
+    args = parser.parse_args(argv)
+
+    def ready(address):
+        print(f"Сервис запущен: {address}", flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
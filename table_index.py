@@ -0,0 +1,190 @@
+"""
+Индексы поиска и фильтра по таблице редактора (элементы, процессы)
+"""
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+# Числовые части обозначения для естественной сортировки
+NUMBER_RE = re.compile(r'(\d+)')
+# Больше любого символа - верхняя граница диапазона префикса
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(value):
+    """Значение ячейки для сравнения: текст без пробелов по краям, верхний регистр"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return str(value).strip().upper()
+
+
+def natural_key(text):
+    """Ключ естественной сортировки: C2 < C10, R1.5 < R1.10"""
+    parts = NUMBER_RE.split(text)
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+class TableIndex:
+    """
+    Индексы строк RowStore для поиска и фильтра
+
+    Строятся один раз при загрузке файла:
+    - хэш-таблица обозначение -> строки для точного поиска;
+    - отсортированный список (обозначение, строка) для поиска по
+      префиксу двоичным поиском;
+    - список строк в естественном порядке обозначений (C2 перед C10);
+    - для фильтра по колонке - значение -> строки (строится при первом
+      фильтре по этой колонке).
+
+    Строки индексируются номерами физических строк RowStore, которые не
+    меняются при добавлении и удалении других строк, поэтому удаление не
+    требует обновления индексов (удаленные строки отбрасываются при
+    переводе в позиции), а правка и добавление обновляют только свою
+    строку (row_updated, row_added). После перенумерации строк хранилища
+    (смена generation) индексы строятся заново при следующем обращении.
+    Сравнение значений - без учета регистра и пробелов по краям.
+    """
+    KEY = 'Designator'
+
+    def __init__(self, store):
+        self.store = store
+        self.build()
+
+    def build(self):
+        """Построение индексов по текущим данным"""
+        store = self.store
+        frame = store.to_frame()
+        self.generation = store.generation
+        self.key_column = (frame.columns.get_loc(self.KEY)
+                           if self.KEY in frame.columns and frame.columns.is_unique else 0)
+
+        # Значения ключевой колонки по физическим строкам (удаленные - пустые)
+        self._keys = [''] * store.physical_count
+        physical = store.physical_rows(np.arange(len(store))).tolist()
+        values = frame.iloc[:, self.key_column].tolist() if len(frame.columns) else []
+        for row, value in zip(physical, values):
+            self._keys[row] = normalize(value)
+
+        self._exact = {}
+        for row in physical:
+            self._exact.setdefault(self._keys[row], []).append(row)
+        self._prefix = sorted((self._keys[row], row) for row in physical)
+        self._natural = sorted((natural_key(self._keys[row]), row) for row in physical)
+        self._natural_rows = None
+        # Колонка -> (значения по физическим строкам, значение -> множество строк)
+        self._columns = {}
+
+    def find(self, text):
+        """
+        Позиции строк, обозначение которых равно text или начинается с text
+        Точные совпадения идут первыми, остальные - в естественном порядке
+        """
+        self._check()
+        key = normalize(text)
+        if not key:
+            return np.arange(0, dtype=np.int64)
+
+        exact = self._exact.get(key, [])
+        start = bisect.bisect_left(self._prefix, (key,))
+        end = bisect.bisect_left(self._prefix, (key + PREFIX_END,))
+        matches = set(row for _, row in self._prefix[start:end]).difference(exact)
+        others = sorted(matches, key=lambda row: (natural_key(self._keys[row]), row))
+        return self.store.positions_of(list(exact) + others)
+
+    def filter(self, column, value):
+        """Позиции строк (по возрастанию), у которых значение колонки column равно value"""
+        self._check()
+        _, rows = self._column(column)
+        matches = rows.get(normalize(value), ())
+        return np.sort(self.store.positions_of(np.fromiter(matches, dtype=np.int64,
+                                                           count=len(matches))))
+
+    def distinct(self, column, limit=None):
+        """Различные значения колонки в естественном порядке (None, если их больше limit)"""
+        self._check()
+        _, rows = self._column(column)
+        if limit is not None and len(rows) > limit:
+            return None
+        return sorted((value for value, matches in rows.items() if matches), key=natural_key)
+
+    def natural_order(self, positions=None):
+        """Позиции (все или заданные) в естественном порядке обозначений"""
+        self._check()
+        if self._natural_rows is None:
+            self._natural_rows = np.fromiter((row for _, row in self._natural),
+                                             dtype=np.int64, count=len(self._natural))
+        rows = self._natural_rows
+        if positions is not None:
+            selected = np.zeros(self.store.physical_count, dtype=bool)
+            selected[self.store.physical_rows(positions)] = True
+            rows = rows[selected[rows]]
+        return self.store.positions_of(rows)
+
+    def row_updated(self, position):
+        """Строка position изменена"""
+        if not self._check():
+            return
+        row = int(self.store.physical_rows([position])[0])
+        values = self.store.row(position)
+        key = normalize(values[self.key_column])
+        if key != self._keys[row]:
+            self._remove_key(row)
+            self._add_key(row, key)
+        for column, (column_values, rows) in self._columns.items():
+            value = normalize(values[column])
+            if value != column_values[row]:
+                rows[column_values[row]].discard(row)
+                rows.setdefault(value, set()).add(row)
+                column_values[row] = value
+
+    def row_added(self):
+        """В конец хранилища добавлена строка"""
+        if not self._check():
+            return
+        row = self.store.physical_count - 1
+        values = self.store.row(len(self.store) - 1)
+        self._keys.append('')
+        self._add_key(row, normalize(values[self.key_column]))
+        for column, (column_values, rows) in self._columns.items():
+            value = normalize(values[column])
+            column_values.append(value)
+            rows.setdefault(value, set()).add(row)
+
+    def _check(self):
+        """Перестроение после перенумерации строк; False, если индексы построены заново"""
+        if self.generation != self.store.generation:
+            self.build()
+            return False
+        return True
+
+    def _column(self, column):
+        if column not in self._columns:
+            column_values = [''] * self.store.physical_count
+            physical = self.store.physical_rows(np.arange(len(self.store))).tolist()
+            values = self.store.to_frame().iloc[:, column].tolist()
+            rows = {}
+            for row, value in zip(physical, values):
+                value = normalize(value)
+                column_values[row] = value
+                rows.setdefault(value, set()).add(row)
+            self._columns[column] = (column_values, rows)
+        return self._columns[column]
+
+    def _add_key(self, row, key):
+        self._keys[row] = key
+        bisect.insort(self._exact.setdefault(key, []), row)
+        bisect.insort(self._prefix, (key, row))
+        bisect.insort(self._natural, (natural_key(key), row))
+        self._natural_rows = None
+
+    def _remove_key(self, row):
+        key = self._keys[row]
+        self._exact[key].remove(row)
+        if not self._exact[key]:
+            del self._exact[key]
+        del self._prefix[bisect.bisect_left(self._prefix, (key, row))]
+        del self._natural[bisect.bisect_left(self._natural, (natural_key(key), row))]
+        self._natural_rows = None
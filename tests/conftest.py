@@ -0,0 +1,57 @@
+"""
+Общие данные тестов: модули проекта импортируются из корня репозитория
+"""
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ELEMENT_COLUMNS = ['Designator', 'Comment', 'Footprint', 'Quantity']
+PROC_COLUMNS = ['Designator', 'Operation', 'Comment', 'Material']
+
+
+def random_key(rng):
+    """Обозначение из небольшого набора - чтобы были повторы и группы"""
+    return f"{rng.choice('CRLU')}{rng.randint(1, 40)}"
+
+
+def make_elements(rng, size):
+    return pd.DataFrame({
+        'Designator': [random_key(rng) for _ in range(size)],
+        'Comment': [rng.choice(['100n', '10k', '1u', 'LED']) for _ in range(size)],
+        'Footprint': [rng.choice(['0603', '0805', 'SOT23']) for _ in range(size)],
+        'Quantity': [rng.randint(1, 5) for _ in range(size)],
+    })
+
+
+def make_proc(rng, size):
+    return pd.DataFrame({
+        'Designator': [random_key(rng) for _ in range(size)],
+        'Operation': [rng.choice(['Монтаж', 'Пайка', 'Контроль']) for _ in range(size)],
+        'Comment': [rng.choice(['', 'ручная', 'печь']) for _ in range(size)],
+        'Material': [rng.choice(['ПОС-61', 'флюс', '']) for _ in range(size)],
+    })
+
+
+def cell_text(value):
+    """Значение ячейки для сравнения: 5, 5.0 и '5' совпадают, None и NaN - 'nan'"""
+    if value is None or (isinstance(value, float) and value != value):
+        return 'nan'
+    if isinstance(value, float) and value == value and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def frame_rows(df):
+    """Строки DataFrame в виде списков текстов (без учета типов колонок)"""
+    return [[cell_text(value) for value in row]
+            for row in df.astype(object).itertuples(index=False, name=None)]
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
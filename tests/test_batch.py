@@ -0,0 +1,48 @@
+"""
+Пакетный режим: манифест из двух заданий выполняется в пуле процессов
+"""
+import json
+
+import batch
+from benchmarks.synthetic import generate
+
+
+def write_manifest(path, jobs):
+    path.write_text(json.dumps(jobs, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_two_job_manifest(tmp_path, capsys):
+    for name, size in (('pu001', 30), ('pu002', 60)):
+        generate(size, tmp_path / name, seed=size)
+    manifest = write_manifest(tmp_path / 'jobs.json', [
+        {'name': 'PU-001', 'elements': 'pu001/Elements.xlsx', 'proc': 'pu001/Proc.txt',
+         'doc_info': {'designation': 'ПУ-001'}},
+        {'name': 'PU-002', 'elements': 'pu002/Elements.xlsx', 'proc': 'pu002/Proc.txt'},
+    ])
+    out = tmp_path / 'out'
+
+    rc = batch.main([manifest, '--out', str(out), '--workers', '2', '--no-cache'])
+
+    assert rc == 0
+    for name in ('PU-001', 'PU-002'):
+        assert (out / f'{name}.docx').read_bytes().startswith(b'PK')
+        assert (out / f'{name}.pdf').read_bytes().startswith(b'%PDF')
+    output = capsys.readouterr().out
+    assert '[PU-001]' in output and '[PU-002]' in output
+
+
+def test_failed_job_and_bad_manifest(tmp_path):
+    generate(30, tmp_path / 'pu001')
+    (tmp_path / 'broken.xlsx').write_bytes(b'not an excel file')
+    manifest = write_manifest(tmp_path / 'jobs.json', [
+        {'name': 'good', 'elements': 'pu001/Elements.xlsx', 'proc': 'pu001/Proc.txt'},
+        {'name': 'bad', 'elements': 'broken.xlsx', 'proc': 'pu001/Proc.txt'},
+    ])
+    out = tmp_path / 'out'
+    assert batch.main([manifest, '--out', str(out), '--format', 'docx',
+                       '--workers', '1', '--no-cache']) == 1
+    assert (out / 'good.docx').exists()
+
+    assert batch.main([write_manifest(tmp_path / 'bad.json', 'jobs'),
+                       '--out', str(out)]) == 2
@@ -0,0 +1,109 @@
+"""
+DataProcessor: потоковый разбор Proc.txt совпадает с прежним разбором,
+загрузка Excel с проекцией - с полным чтением тех же колонок
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_rows, write_elements, write_proc
+from data_processor import PROJECTED_COLUMNS, DataProcessor
+
+SEPARATOR = '·'
+
+
+def read_proc_reference(filepath):
+    """Прежний разбор Proc.txt: весь файл в памяти, затем построчно"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    content = content.replace(SEPARATOR * 2, '\t').replace(SEPARATOR, '')
+
+    data = []
+    headers = None
+    for line in content.split('\n'):
+        parts = [p.strip() for p in line.strip().split('\t') if p.strip()]
+        if not parts:
+            continue
+        if headers is None:
+            headers = parts
+            continue
+        parts = (parts + [''] * len(headers))[:len(headers)]
+        data.append(parts)
+    return pd.DataFrame(data, columns=headers)
+
+
+@pytest.mark.parametrize('batch_rows', [10000, 7])
+def test_proc_txt_matches_reference(tmp_path, batch_rows):
+    path = tmp_path / 'Proc.txt'
+    write_proc(path, generate_rows(200))
+    processor = DataProcessor()
+    processor.PROC_BATCH_ROWS = batch_rows
+
+    pd.testing.assert_frame_equal(processor.load_proc_txt(path), read_proc_reference(path))
+
+
+def test_proc_txt_irregular_lines(tmp_path):
+    """Пустые строки, пробелы, неполные и лишние поля, одиночные точки"""
+    field = SEPARATOR * 2
+    lines = [
+        '',
+        field.join(['Designator', 'Operation', 'Equipment', 'Material']),
+        '   ',
+        field.join(['R1', 'Пайка', 'Печь ' + SEPARATOR + 'ПП-1', 'ПОС-61']),
+        field.join(['R2', 'Монтаж']),
+        field.join(['C1', '  Контроль ', '', 'флюс', 'лишнее', 'поле']),
+        'U1\tПайка\tПаяльник',
+        field + field.join(['L1', 'Лакировка']) + field,
+        '',
+    ]
+    path = tmp_path / 'Proc.txt'
+    path.write_text('\r\n'.join(lines), encoding='utf-8')
+    processor = DataProcessor()
+    processor.PROC_BATCH_ROWS = 2
+
+    df = processor.load_proc_txt(path)
+    pd.testing.assert_frame_equal(df, read_proc_reference(path))
+    assert df['Equipment'].tolist() == ['Печь ПП-1', '', 'флюс', 'Паяльник', '']
+
+
+def test_proc_txt_without_rows(tmp_path):
+    path = tmp_path / 'Proc.txt'
+    path.write_text('Designator' + SEPARATOR * 2 + 'Operation\n\n', encoding='utf-8')
+    with pytest.raises(Exception, match='структуру'):
+        DataProcessor().load_proc_txt(path)
+
+
+def projected_reference(filepath):
+    """Полное чтение Excel, затем только колонки PROJECTED_COLUMNS"""
+    df = DataProcessor().load_excel(filepath)
+    df = df[[column for column in df.columns if column in PROJECTED_COLUMNS]]
+    return df.dropna(how='all').reset_index(drop=True)
+
+
+def test_projected_excel_matches_full_read(tmp_path):
+    path = tmp_path / 'Elements.xlsx'
+    write_elements(path, generate_rows(300))
+
+    df = DataProcessor().load_excel(path, projected=True)
+    assert 'Manufacturer' not in df.columns
+    pd.testing.assert_frame_equal(df, projected_reference(path))
+
+
+def test_projected_excel_irregular_sheet(tmp_path):
+    """Пустые строки, лишние колонки, ошибки формул и смешанные типы"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Designator', 'Manufacturer', 'Comment', 'Note', 'Quantity', 'Footprint'])
+    sheet.append(['R1', 'Yageo', '10k', 'x', 1, '0603'])
+    sheet.append([None, None, None, None, None, None])
+    sheet.append([None, 'TI', None, 'только лишние колонки', None, None])
+    sheet.append(['C1', None, '#N/A', None, 2.0, '0805'])
+    sheet.append(['U1', None, 'MCU', None, '3 шт', None])
+    sheet.append([None, None, None, None, 4.5, None])
+    path = tmp_path / 'Elements.xlsx'
+    workbook.save(path)
+
+    df = DataProcessor().load_excel(path, projected=True)
+    assert list(df.columns) == ['Designator', 'Comment', 'Quantity', 'Footprint']
+    pd.testing.assert_frame_equal(df, projected_reference(path))
@@ -0,0 +1,140 @@
+"""
+EditJournal: объединение правок, глубина, отмена и повтор над RowStore
+"""
+import random
+
+from conftest import frame_rows, make_elements, make_proc, random_key
+from data_processor import DataProcessor
+from edit_journal import EditJournal
+from merge_engine import MergeEngine
+from row_store import RowStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_of_one_row_coalesce():
+    clock = Clock()
+    journal = EditJournal(coalesce_seconds=2, clock=clock)
+    journal.record_update('elements', 1, {0: ('a', 'b')})
+    clock.now = 1
+    journal.record_update('elements', 1, {0: ('b', 'c'), 1: ('x', 'y')})
+
+    change = journal.undo()
+    assert change.cells == {0: ('a', 'c'), 1: ('x', 'y')}
+    assert not journal.can_undo
+
+
+def test_no_coalescing_after_pause_other_row_or_undo():
+    clock = Clock()
+    journal = EditJournal(coalesce_seconds=2, clock=clock)
+    journal.record_update('elements', 1, {0: ('a', 'b')})
+    clock.now = 5
+    journal.record_update('elements', 1, {0: ('b', 'c')})
+    journal.record_update('elements', 2, {0: ('d', 'e')})
+    journal.record_update('proc', 2, {0: ('f', 'g')})
+    assert len(journal._undo) == 4
+
+    journal.undo()
+    journal.redo()
+    # После отмены и повтора новая правка - отдельная запись
+    journal.record_update('proc', 2, {0: ('g', 'h')})
+    assert len(journal._undo) == 5
+
+
+def test_depth_and_redo_reset():
+    journal = EditJournal(depth=3, coalesce_seconds=0)
+    for position in range(5):
+        journal.record_add('elements', position, ['v'])
+    assert [journal.undo().position for _ in range(3)] == [4, 3, 2]
+    assert journal.undo() is None
+    assert journal.can_redo
+
+    journal.record_delete('elements', 0, ['v'])
+    assert not journal.can_redo
+    assert journal.redo() is None
+
+    journal.clear()
+    assert not journal.can_undo and not journal.can_redo
+
+
+def test_empty_update_is_not_recorded():
+    journal = EditJournal()
+    journal.record_update('elements', 0, {})
+    assert not journal.can_undo
+
+
+def test_undo_redo_roundtrip():
+    rng = random.Random(5)
+    processor = DataProcessor()
+    stores = {'elements': RowStore(make_elements(rng, 30)), 'proc': RowStore(make_proc(rng, 30))}
+    engine = MergeEngine(processor)
+    engine.build(stores['elements'], stores['proc'])
+    journal = EditJournal(depth=100, coalesce_seconds=0)
+
+    # Те же операции, что выполняет главное окно (main.py)
+    def update(side, position, cells):
+        stores[side].set_cells(position, cells)
+        engine.row_updated(side, stores[side], position)
+
+    def insert(side, position, values):
+        stores[side].insert(position, values)
+        engine.row_inserted(side, stores[side], position)
+
+    def delete(side, position):
+        stores[side].delete(position)
+        engine.row_deleted(side, stores[side], position)
+
+    def replay(change, undo):
+        if change.kind == 'update':
+            update(change.side, change.position,
+                   {column: values[0 if undo else 1] for column, values in change.cells.items()})
+        elif (change.kind == 'add') == undo:
+            delete(change.side, change.position)
+        else:
+            insert(change.side, change.position, change.values)
+
+    def snapshot():
+        return {side: frame_rows(store.to_frame()) for side, store in stores.items()}
+
+    def assert_merged():
+        expected = processor.merge_data(stores['elements'].to_frame(), stores['proc'].to_frame())
+        assert frame_rows(engine.merged) == frame_rows(expected)
+
+    initial = snapshot()
+    for step in range(60):
+        side = rng.choice(['elements', 'proc'])
+        store = stores[side]
+        operation = rng.choice(['add', 'delete', 'update'])
+        if operation == 'add':
+            values = [random_key(rng)] + [f'n{step}'] * (len(store.columns) - 1)
+            position = len(store)
+            insert(side, position, values)
+            journal.record_add(side, position, values)
+        elif operation == 'delete':
+            position = rng.randrange(len(store))
+            values = store.row(position)
+            delete(side, position)
+            journal.record_delete(side, position, values)
+        else:
+            position = rng.randrange(len(store))
+            old = store.row(position)
+            cells = {0: (old[0], random_key(rng)), 2: (old[2], f'u{step}')}
+            update(side, position, {column: new for column, (_, new) in cells.items()})
+            journal.record_update(side, position, cells)
+
+    edited = snapshot()
+    while journal.can_undo:
+        replay(journal.undo(), undo=True)
+    assert snapshot() == initial
+    assert_merged()
+
+    while journal.can_redo:
+        replay(journal.redo(), undo=False)
+    assert snapshot() == edited
+    assert_merged()
@@ -0,0 +1,116 @@
+"""
+MergeEngine: результат построчных изменений совпадает с полным merge_data
+"""
+import random
+
+import pandas as pd
+import pytest
+
+from conftest import frame_rows, make_elements, make_proc, random_key
+from data_processor import DataProcessor
+from merge_engine import MergeEngine
+from row_store import RowStore
+
+
+def random_row(rng, columns, step):
+    return [random_key(rng) if column == 'Designator' else f'{column[:2]}{step}'
+            for column in columns]
+
+
+def apply_random_change(rng, stores, references, engine, step):
+    """Случайное изменение одной стороны в хранилище и в эталонном DataFrame"""
+    side = rng.choice(['elements', 'proc'])
+    store = stores[side]
+    reference = references[side]
+    operation = rng.choice(['update', 'update', 'key', 'add', 'insert', 'delete'])
+    if not len(store):
+        operation = 'add'
+
+    if operation in ('update', 'key'):
+        position = rng.randrange(len(store))
+        column = 0 if operation == 'key' else rng.randrange(1, len(store.columns))
+        value = random_key(rng) if operation == 'key' else f'x{step}'
+        store.set_cells(position, {column: value})
+        reference.iat[position, column] = value
+        engine.row_updated(side, store, position)
+    elif operation == 'add':
+        values = random_row(rng, store.columns, step)
+        store.append(values)
+        references[side] = pd.concat(
+            [reference, pd.DataFrame([values], columns=reference.columns)], ignore_index=True)
+        engine.row_added(side, store, len(store) - 1)
+    elif operation == 'insert':
+        # Вставка в середину (отмена удаления) пересобирает результат
+        position = rng.randrange(len(store) + 1)
+        values = random_row(rng, store.columns, step)
+        store.insert(position, values)
+        row = pd.DataFrame([values], columns=reference.columns)
+        references[side] = pd.concat([reference.iloc[:position], row, reference.iloc[position:]],
+                                     ignore_index=True)
+        engine.row_inserted(side, store, position)
+    else:
+        position = rng.randrange(len(store))
+        store.delete(position)
+        references[side] = reference.drop(index=position).reset_index(drop=True)
+        engine.row_deleted(side, store, position)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_random_changes_match_full_merge(seed):
+    rng = random.Random(seed)
+    processor = DataProcessor()
+    references = {'elements': make_elements(rng, 40).astype(object),
+                  'proc': make_proc(rng, 50).astype(object)}
+    stores = {side: RowStore(frame.copy()) for side, frame in references.items()}
+    engine = MergeEngine(processor)
+    engine.build(stores['elements'], stores['proc'])
+
+    for step in range(150):
+        apply_random_change(rng, stores, references, engine, step)
+        expected = processor.merge_data(references['elements'], references['proc'])
+        assert list(engine.merged.columns) == list(expected.columns)
+        assert frame_rows(engine.merged) == frame_rows(expected), step
+
+
+def test_concat_merge_without_designator():
+    processor = DataProcessor()
+    elements = RowStore(pd.DataFrame({'A': ['a', 'b', 'c']}))
+    proc = RowStore(pd.DataFrame({'B': ['1', '2', '3']}))
+    engine = MergeEngine(processor)
+    engine.build(elements, proc)
+
+    elements.set_cells(1, {0: 'x'})
+    engine.row_updated('elements', elements, 1)
+    proc.delete(0)
+    engine.row_deleted('proc', proc, 0)
+
+    expected = processor.merge_data(elements.to_frame(), proc.to_frame())
+    assert frame_rows(engine.merged) == frame_rows(expected)
+
+
+def test_merged_snapshot_is_not_changed(rng):
+    processor = DataProcessor()
+    elements = RowStore(make_elements(rng, 20))
+    proc = RowStore(make_proc(rng, 20))
+    engine = MergeEngine(processor)
+    snapshot = engine.build(elements, proc)
+    before = snapshot.copy()
+
+    # Правка без смены обозначения и правка с перегруппировкой
+    elements.set_cells(3, {1: 'changed'})
+    engine.row_updated('elements', elements, 3)
+    elements.set_cells(4, {0: 'Z99'})
+    engine.row_updated('elements', elements, 4)
+
+    assert snapshot.equals(before)
+    second = engine.merged
+    assert second is not snapshot
+    assert (second['Comment_elem'] == 'changed').any()
+
+    # Повторно выданный результат тоже не меняется следующими правками
+    second_before = second.copy()
+    proc.set_cells(2, {1: 'again'})
+    engine.row_updated('proc', proc, 2)
+    assert second.equals(second_before)
+    expected = processor.merge_data(elements.to_frame(), proc.to_frame())
+    assert frame_rows(engine.merged) == frame_rows(expected)
@@ -0,0 +1,83 @@
+"""
+Кэш XML строк маршрутной карты: после вставки и удаления строки
+заново строятся только новые строки, листы собираются из кэша
+"""
+import pandas as pd
+import pytest
+
+from conftest import make_elements, make_proc
+from data_processor import DataProcessor
+from document_generator import DocumentGenerator
+
+
+@pytest.fixture
+def merged(rng):
+    return DataProcessor().merge_data(make_elements(rng, 400), make_proc(rng, 400))
+
+
+def count_renders(generator):
+    """Счетчики построенных листов и строк таблицы"""
+    counts = {'pages': 0, 'rows': 0}
+    render_page = generator._render_page_xml
+    render_row = generator._route_row_xml
+
+    def page(*args):
+        counts['pages'] += 1
+        return render_page(*args)
+
+    def row(*args):
+        counts['rows'] += 1
+        return render_row(*args)
+
+    generator._render_page_xml = page
+    generator._route_row_xml = row
+    return counts
+
+
+def page_count(generator, data):
+    return len(list(generator._iter_pages(generator._prepare_route_data(data))))
+
+
+def regenerate(generator, counts, data, path):
+    counts.update(pages=0, rows=0)
+    generator.create_route_card(data, str(path), {'product_name': 'Узел'})
+    return dict(counts)
+
+
+def streaming_bytes(data, path):
+    DocumentGenerator().create_route_card(data, str(path), {'product_name': 'Узел'},
+                                          streaming=True)
+    return path.read_bytes()
+
+
+def test_insert_and_delete_rebuild_only_changed_rows(merged, tmp_path):
+    generator = DocumentGenerator()
+    counts = count_renders(generator)
+    path = tmp_path / 'card.docx'
+
+    first = regenerate(generator, counts, merged, path)
+    assert page_count(generator, merged) > 3
+    assert first['rows'] > 100
+
+    assert regenerate(generator, counts, merged, path) == {'pages': 0, 'rows': 0}
+
+    # Новая строка в начале данных сдвигает все следующие листы
+    row = merged.iloc[[0]].assign(Designator='X1', Operation='Лакировка')
+    inserted = pd.concat([merged.iloc[:5], row, merged.iloc[5:]], ignore_index=True)
+    after_insert = regenerate(generator, counts, inserted, path)
+    assert after_insert['pages'] == 0
+    assert 0 < after_insert['rows'] <= 2
+    assert path.read_bytes() == streaming_bytes(inserted, tmp_path / 'insert.docx')
+
+    deleted = merged.drop(index=10).reset_index(drop=True)
+    assert regenerate(generator, counts, deleted, path) == {'pages': 0, 'rows': 0}
+    assert path.read_bytes() == streaming_bytes(deleted, tmp_path / 'delete.docx')
+
+
+def test_cached_card_matches_streaming(merged, tmp_path):
+    path = tmp_path / 'card.docx'
+    DocumentGenerator().create_route_card(merged, str(path), {'product_name': 'A & <B>'})
+    expected = tmp_path / 'streaming.docx'
+    DocumentGenerator().create_route_card(merged, str(expected), {'product_name': 'A & <B>'},
+                                          streaming=True)
+    assert path.read_bytes() == expected.read_bytes()
@@ -0,0 +1,56 @@
+"""
+Маршрутная карта: DOCX не зависит от способа построения листов,
+PDF строится напрямую из строк маршрутной карты
+"""
+import re
+
+import pandas as pd
+import pytest
+
+from conftest import make_elements, make_proc
+from data_processor import DataProcessor
+from document_generator import DocumentGenerator
+
+DOC_INFO = {'product_name': 'Печатный узел', 'designation': 'ПУ-001',
+            'developer': 'Иванов & Ко', 'date': '01.01.2026'}
+
+
+@pytest.fixture
+def merged(rng):
+    return DataProcessor().merge_data(make_elements(rng, 300), make_proc(rng, 300))
+
+
+def pdf_page_count(path):
+    return len(re.findall(rb'/Type /Page\b', path.read_bytes()))
+
+
+def test_docx_identical_in_all_modes(merged, tmp_path):
+    def build(generator, mode, **options):
+        path = tmp_path / f'{mode}.docx'
+        generator.create_route_card(merged, str(path), DOC_INFO, **options)
+        return path.read_bytes()
+
+    generator = DocumentGenerator()
+    default = build(generator, 'default')
+    # Повторное построение тем же генератором - листы собираются из кэша
+    assert build(generator, 'cached') == default
+    assert build(DocumentGenerator(), 'streaming', streaming=True) == default
+    assert build(DocumentGenerator(), 'workers', workers=3) == default
+
+
+def test_pdf_pages_match_docx_layout(merged, tmp_path):
+    generator = DocumentGenerator()
+    path = tmp_path / 'card.pdf'
+    generator.create_route_card_pdf(merged, str(path), DOC_INFO)
+
+    pages = list(generator._iter_pages(generator._prepare_route_data(merged)))
+    assert len(pages) > 1
+    assert pdf_page_count(path) == len(pages)
+
+
+@pytest.mark.parametrize('data', [pd.DataFrame(), None])
+def test_pdf_from_empty_input(data, tmp_path):
+    path = tmp_path / 'empty.pdf'
+    DocumentGenerator().create_route_card_pdf(data, str(path))
+    assert path.read_bytes().startswith(b'%PDF')
+    assert pdf_page_count(path) == 1
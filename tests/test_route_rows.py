@@ -0,0 +1,91 @@
+"""
+Подготовка строк маршрутной карты: результат _prepare_route_data
+совпадает с прежней построчной обработкой DataFrame
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_elements, make_proc
+from data_processor import COLUMN_ALIASES, DataProcessor
+from document_generator import DocumentGenerator
+
+
+def get_value(row, keys):
+    for key in keys:
+        if key in row.index:
+            value = row[key]
+            if pd.notna(value) and str(value).strip() and str(value).lower() != 'nan':
+                return str(value).strip()
+    return None
+
+
+def route_rows_reference(data):
+    """Прежняя реализация: обход строк через iterrows"""
+    route_rows = []
+    if data is None or data.empty:
+        return route_rows
+
+    current_operation = None
+    row_number = 1
+    for _, row in data.iterrows():
+        values = {name: get_value(row, keys) for name, keys in COLUMN_ALIASES.items()}
+        operation = values['operation']
+        designator = values['designator']
+        description = values['description']
+        quantity = values['quantity']
+        equipment = values['equipment'] or ''
+        material = values['material'] or ''
+
+        if operation and operation != current_operation and operation.lower() != 'nan':
+            route_rows.append({'type': 'О', 'number': f'О{row_number:02d}',
+                               'name': operation, 'equipment': equipment,
+                               'material': material, 'time_prep': '', 'time_piece': ''})
+            current_operation = operation
+            row_number += 1
+
+        if designator or description:
+            name = ' - '.join(part for part in (designator, description) if part)
+            qty = '1'
+            if quantity and quantity.lower() != 'nan':
+                try:
+                    qty = str(int(float(quantity)))
+                except (ValueError, TypeError):
+                    qty = quantity
+            route_rows.append({'type': 'Т', 'number': f'Т{row_number:02d}',
+                               'name': name, 'equipment': equipment,
+                               'material': material, 'time_prep': '', 'time_piece': qty})
+            row_number += 1
+    return route_rows
+
+
+def test_merged_data(rng):
+    merged = DataProcessor().merge_data(make_elements(rng, 300), make_proc(rng, 300))
+    assert DocumentGenerator()._prepare_route_data(merged) == route_rows_reference(merged)
+
+
+def test_aliases_and_irregular_values():
+    data = pd.DataFrame({
+        'Процесс': ['Пайка', 'Пайка', None, 'nan', ' Контроль ', 'Пайка', '', 'Монтаж'],
+        'Позиционное обозначение': ['R1', ' ', 'C2', None, 'U1', np.nan, None, 'L1'],
+        'Description': [None, 'Резистор', 'NaN', 'Конденсатор', '', None, None, 'Дроссель'],
+        'Comment': ['10k', '100n', 'комментарий', None, 'MCU', None, None, 'x'],
+        'Количество': [2.0, '3', None, 'две', 1.5, 7, 'nan', ' 4 '],
+        'Оборудование': ['Печь', None, 'Стол', 'nan', None, 'Печь', '', 'Стол'],
+        'material': [None, 'ПОС-61', None, 'флюс', None, None, None, 12],
+    })
+    assert DocumentGenerator()._prepare_route_data(data) == route_rows_reference(data)
+
+
+def test_numeric_columns_and_index():
+    data = pd.DataFrame({
+        'Operation': [1, 1, 2.0, None],
+        'Designator': [10, 11, None, 12.5],
+        'Quantity': [1.0, np.nan, 3.0, 4.0],
+    }, index=[5, 3, 9, 1])
+    assert DocumentGenerator()._prepare_route_data(data) == route_rows_reference(data)
+
+
+@pytest.mark.parametrize('data', [None, pd.DataFrame(), pd.DataFrame({'Other': [1, 2]})])
+def test_empty_input(data):
+    assert DocumentGenerator()._prepare_route_data(data) == route_rows_reference(data)
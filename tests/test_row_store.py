@@ -0,0 +1,141 @@
+"""
+RowStore: сравнение со списком строк после случайных изменений
+"""
+import random
+
+import numpy as np
+import pytest
+
+from conftest import ELEMENT_COLUMNS, frame_rows, make_elements, cell_text
+from row_store import RowStore, as_frame
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Маленькие блоки - чтобы открытый блок часто переводился в DataFrame
+    monkeypatch.setattr(RowStore, 'CHUNK_ROWS', 4)
+
+
+def random_values(rng, step):
+    return [f'C{rng.randint(1, 40)}', f'v{step}', '0603', str(rng.randint(1, 9))]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_operations_match_list(seed):
+    rng = random.Random(seed)
+    frame = make_elements(rng, 30)
+    store = RowStore(frame)
+    reference = [list(row) for row in frame.itertuples(index=False, name=None)]
+    generations = {store.generation}
+
+    for step in range(400):
+        operation = rng.choice(['append', 'insert', 'delete', 'delete', 'cells', 'row'])
+        if operation == 'append' or not reference:
+            values = random_values(rng, step)
+            store.append(values)
+            reference.append(values)
+        elif operation == 'insert':
+            position = rng.randrange(len(reference) + 1)
+            values = random_values(rng, step)
+            store.insert(position, values)
+            reference.insert(position, values)
+        elif operation == 'delete':
+            position = rng.randrange(len(reference))
+            store.delete(position)
+            del reference[position]
+        elif operation == 'cells':
+            position = rng.randrange(len(reference))
+            # Текст в числовой колонке переводит колонку блока в object
+            cells = {3: f'x{step}', rng.randrange(3): f'y{step}'}
+            store.set_cells(position, cells)
+            for column, value in cells.items():
+                reference[position][column] = value
+        else:
+            position = rng.randrange(len(reference))
+            values = random_values(rng, step)
+            store.set_row(position, values)
+            reference[position] = values
+        generations.add(store.generation)
+
+        assert len(store) == len(reference)
+        if reference and step % 10 == 0:
+            position = rng.randrange(len(reference))
+            assert [cell_text(v) for v in store.row(position)] == \
+                [cell_text(v) for v in reference[position]]
+            positions = [rng.randrange(len(reference)) for _ in range(8)]
+            taken = store.take(positions)
+            assert list(taken.index) == positions
+            assert frame_rows(taken) == [[cell_text(v) for v in reference[p]]
+                                         for p in positions]
+        if step % 25 == 0:
+            assert frame_rows(store.to_frame()) == \
+                [[cell_text(v) for v in row] for row in reference]
+
+    assert frame_rows(store.to_frame()) == [[cell_text(v) for v in row] for row in reference]
+    assert list(store.to_frame().columns) == ELEMENT_COLUMNS
+    # Вставки в середину и сжатия перенумеровывали строки
+    assert len(generations) > 1
+
+
+def test_delete_compacts_when_most_rows_deleted(rng):
+    store = RowStore(make_elements(rng, 10))
+    for _ in range(5):
+        store.delete(0)
+    assert store.generation == 0 and store.physical_count == 10
+    store.delete(0)
+    # Удаленных больше, чем живых - таблица собирается заново
+    assert store.generation == 1
+    assert store.physical_count == len(store) == 4
+
+
+def test_physical_rows_survive_other_changes(rng):
+    store = RowStore(make_elements(rng, 12))
+    kept = store.physical_rows([2, 7, 9])
+    store.delete(0)
+    store.append(random_values(rng, 0))
+    store.delete(7)  # бывшая позиция 8
+    # Строки 2, 7 и 9 стали позициями 1, 6 и 7
+    assert store.positions_of(kept).tolist() == [1, 6, 7]
+
+    # Удаленная строка пропускается, добавленные после кэша - переводятся
+    store.delete(6)
+    store.append(random_values(rng, 1))
+    appended = store.physical_rows([len(store) - 1])
+    assert store.positions_of(np.concatenate([kept, appended])).tolist() == \
+        [1, 6, len(store) - 1]
+
+
+def test_positions_out_of_range(rng):
+    store = RowStore(make_elements(rng, 3))
+    with pytest.raises(IndexError):
+        store.row(3)
+    with pytest.raises(IndexError):
+        store.insert(5, random_values(rng, 0))
+    with pytest.raises(ValueError):
+        store.append(['C1'])
+
+
+def test_as_frame(rng):
+    frame = make_elements(rng, 5)
+    assert as_frame(frame) is frame
+    assert frame_rows(as_frame(RowStore(frame))) == frame_rows(frame)
+
+
+def test_frames_handed_out_are_not_changed(rng):
+    frame = make_elements(rng, 6)
+    loaded = frame.copy()
+    store = RowStore(frame)
+    first = store.to_frame()
+    before = first.copy()
+
+    store.set_cells(1, {1: 'changed', 3: 'text'})
+    store.set_row(2, random_values(rng, 0))
+    # Исходная таблица и ранее выданный результат остаются прежними
+    assert frame.equals(loaded)
+    assert first.equals(before)
+    assert store.row(1)[1] == 'changed'
+
+    second = store.to_frame()
+    second_before = second.copy()
+    store.set_cells(0, {1: 'again'})
+    assert second.equals(second_before)
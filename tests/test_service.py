@@ -0,0 +1,115 @@
+"""
+Сервис формирования маршрутных карт: запуск на свободном порту и запросы
+"""
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+
+import service
+from benchmarks.synthetic import generate
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    started = threading.Event()
+    state = {}
+
+    def ready(address):
+        state['address'] = address
+        started.set()
+
+    async def run():
+        state['loop'] = asyncio.get_running_loop()
+        state['task'] = asyncio.current_task()
+        await service.serve(port=0, workers=1, ready=ready)
+
+    def target():
+        try:
+            asyncio.run(run())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            started.set()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    assert started.wait(120) and 'address' in state, "Сервис не запустился"
+    yield f"http://{state['address']}"
+    state['loop'].call_soon_threadsafe(state['task'].cancel)
+    thread.join(60)
+
+
+@pytest.fixture(scope='module')
+def input_files(tmp_path_factory):
+    elements, proc = generate(40, tmp_path_factory.mktemp('input'))
+    return elements.read_bytes(), proc.read_bytes()
+
+
+def form_request(url, fields):
+    """POST multipart/form-data: fields {имя: bytes или str}"""
+    boundary = uuid.uuid4().hex
+    body = b''
+    for name, value in fields.items():
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+            disposition = f'form-data; name="{name}"'
+        else:
+            disposition = f'form-data; name="{name}"; filename="{name}"'
+        body += (f'--{boundary}\r\nContent-Disposition: {disposition}\r\n\r\n'
+                 .encode('utf-8') + value + b'\r\n')
+    body += f'--{boundary}--\r\n'.encode('utf-8')
+    return urllib.request.Request(
+        url, data=body, method='POST',
+        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def test_health(base_url):
+    assert get_json(f'{base_url}/health') == {'status': 'ok', 'workers': 1}
+
+
+@pytest.mark.parametrize('fmt, magic', [('docx', b'PK'), ('pdf', b'%PDF')])
+def test_route_card(base_url, input_files, fmt, magic):
+    elements, proc = input_files
+    request = form_request(f'{base_url}/route-card?format={fmt}',
+                           {'elements': elements, 'proc': proc,
+                            'doc_info': json.dumps({'designation': 'ПУ-001'})})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        data = response.read()
+        assert response.status == 200
+        assert response.headers['Content-Type'] == service.CONTENT_TYPES[fmt]
+        assert int(response.headers['X-Rows']) > 0
+    assert data.startswith(magic)
+
+
+def test_bad_file(base_url, input_files):
+    request = form_request(f'{base_url}/route-card',
+                           {'elements': b'not an excel file', 'proc': input_files[1]})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request, timeout=120)
+    assert error.value.code == 422
+    assert json.loads(error.value.read())['error']
+
+
+def test_metrics(base_url, input_files):
+    elements, proc = input_files
+    with urllib.request.urlopen(form_request(f'{base_url}/route-card',
+                                             {'elements': elements, 'proc': proc}),
+                                timeout=120) as response:
+        response.read()
+
+    metrics = get_json(f'{base_url}/metrics')
+    assert metrics['workers'] == 1
+    assert metrics['completed'] >= 1
+    assert metrics['queue_depth'] == 0 and metrics['running'] == 0
+    assert metrics['latency_ms']['total']['p50'] > 0
+    assert 'load' in metrics['stage_ms']
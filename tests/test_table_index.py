@@ -0,0 +1,94 @@
+"""
+TableIndex: поиск и фильтр совпадают с перебором строк после изменений
+"""
+import random
+
+import pytest
+
+from conftest import make_elements
+from row_store import RowStore
+from table_index import TableIndex, natural_key, normalize
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(RowStore, 'CHUNK_ROWS', 8)
+
+
+def expected_find(keys, text):
+    """Перебор: точные совпадения, затем совпадения по началу в естественном порядке"""
+    key = normalize(text)
+    if not key:
+        return []
+    exact = [i for i, value in enumerate(keys) if value == key]
+    prefix = [i for i, value in enumerate(keys) if value.startswith(key) and value != key]
+    return exact + sorted(prefix, key=lambda i: (natural_key(keys[i]), i))
+
+
+def assert_matches_scan(store, index):
+    frame = store.to_frame()
+    keys = [normalize(value) for value in frame['Designator']]
+    footprints = [normalize(value) for value in frame['Footprint']]
+
+    for text in ['c1', 'C12', ' r ', 'u3', 'X', '']:
+        assert index.find(text).tolist() == expected_find(keys, text), text
+
+    assert index.filter(2, '0603').tolist() == [i for i, v in enumerate(footprints) if v == '0603']
+    natural = sorted(range(len(keys)), key=lambda i: (natural_key(keys[i]), i))
+    assert index.natural_order().tolist() == natural
+    subset = index.filter(2, '0805')
+    assert index.natural_order(subset).tolist() == [i for i in natural if footprints[i] == '0805']
+
+
+def test_natural_key_order():
+    designators = ['C10', 'C2', 'R1.10', 'R1.5', 'C1']
+    assert sorted(designators, key=natural_key) == ['C1', 'C2', 'C10', 'R1.5', 'R1.10']
+
+
+def test_normalize():
+    assert normalize(' c1 ') == 'C1'
+    assert normalize(None) == ''
+    assert normalize(float('nan')) == ''
+    assert normalize(5) == '5'
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random_changes_match_scan(seed):
+    rng = random.Random(seed)
+    store = RowStore(make_elements(rng, 120))
+    index = TableIndex(store)
+    assert_matches_scan(store, index)
+
+    for step in range(300):
+        operation = rng.random()
+        if operation < 0.4:
+            position = rng.randrange(len(store))
+            store.set_cells(position, {0: f"{rng.choice('CRX')}{rng.randint(1, 50)}",
+                                       2: rng.choice(['0603', '0402'])})
+            index.row_updated(position)
+        elif operation < 0.65:
+            store.append([f'c{rng.randint(1, 400)}', 'n', '0603', 1])
+            index.row_added()
+        elif operation < 0.72:
+            # Перенумерация строк: индекс строится заново при обращении
+            store.insert(rng.randrange(len(store)), ['R7', 'n', '0805', 2])
+        elif len(store) > 1:
+            store.delete(rng.randrange(len(store)))
+        if step % 20 == 0:
+            assert_matches_scan(store, index)
+    assert_matches_scan(store, index)
+
+
+def test_distinct_values(rng):
+    store = RowStore(make_elements(rng, 50))
+    index = TableIndex(store)
+    assert index.distinct(2) == ['0603', '0805', 'SOT23']
+    assert index.distinct(0, limit=3) is None
+
+
+def test_key_column_falls_back_to_first(rng):
+    frame = make_elements(rng, 10).rename(columns={'Designator': 'Ref'})
+    index = TableIndex(RowStore(frame))
+    assert index.key_column == 0
+    assert index.find(frame['Ref'][3]).tolist()[0] in \
+        [i for i, value in enumerate(frame['Ref']) if value == frame['Ref'][3]]
@@ -0,0 +1,339 @@
+"""
+Виртуализированная таблица для просмотра больших DataFrame
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable:
+    """
+    Таблица ttk.Treeview, в которой существуют только строки видимой
+    области и небольшой запас
+
+    Элементы Treeview создаются один раз по высоте окна и при прокрутке
+    получают значения других строк DataFrame, поэтому время открытия и
+    прокрутки не зависит от размера данных. Значения ячеек приводятся к
+    строкам только для видимых строк. Прокрутка, колесо мыши и клавиши
+    перемещения обрабатываются таблицей, собственная прокрутка Treeview
+    не используется.
+
+    numpy импортируется при первом обращении к данным, а не при импорте
+    модуля, чтобы не замедлять запуск приложения.
+
+    Строки данных задаются позициями в DataFrame (атрибут order), что
+    позволяет показывать отфильтрованную или отсортированную выборку.
+    Элемент Treeview связан с позицией строки (а через нее - с меткой
+    индекса DataFrame) словарем, а не порядком элементов в дереве. Правка,
+    добавление и удаление одной строки (row_updated, row_added,
+    row_deleted) меняют только затронутый элемент.
+    """
+    # Строк сверх видимой области
+    BUFFER_ROWS = 5
+    COLUMN_WIDTH = 100
+
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+
+        self.scroll_y = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scroll)
+        scroll_x = ttk.Scrollbar(self.frame, orient=tk.HORIZONTAL)
+
+        self.tree = ttk.Treeview(self.frame, show='headings', selectmode='browse',
+                                 xscrollcommand=scroll_x.set)
+        scroll_x.config(command=self.tree.xview)
+
+        self.scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.data = None
+        self._columns = []
+        # Позиции строк DataFrame в порядке отображения (массив numpy
+        # после set_data, до этого - пустой кортеж)
+        self.order = ()
+        # Первая отображаемая строка (индекс в order)
+        self.offset = 0
+        # Элементы Treeview и позиция строки данных в каждом из них
+        self._items = []
+        self._positions = {}
+        # Выбранная строка, пока она прокручена за пределы видимой области
+        self._selected = None
+        self._visible_rows = 1
+
+        self.tree.bind('<Configure>', lambda e: self._resize())
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        for key, step in (('<Up>', -1), ('<Down>', 1)):
+            self.tree.bind(key, lambda e, step=step: self._move_selection(step))
+        for key, step in (('<Prior>', -1), ('<Next>', 1)):
+            self.tree.bind(key, lambda e, step=step:
+                           self._move_selection(step * self._visible_rows))
+        self.tree.bind('<Home>', lambda e: self._move_selection(-len(self.order)))
+        self.tree.bind('<End>', lambda e: self._move_selection(len(self.order)))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, callback):
+        self.tree.bind(sequence, callback)
+
+    def set_data(self, data, keep_view=False):
+        """
+        Отображение DataFrame
+
+        Args:
+            data: DataFrame, RowStore или None
+            keep_view: сохранить положение прокрутки и выбранную строку
+                (например, после правки данных)
+        """
+        columns = [] if data is None else [str(col) for col in data.columns]
+        if columns != self._columns:
+            # Смена колонок пересоздает элементы одной операцией;
+            # идентификаторы колонок позиционные - заголовки могут повторяться
+            self.clear()
+            self._columns = columns
+            ids = [f'c{index}' for index in range(len(columns))]
+            self.tree['columns'] = ids
+            for column_id, col in zip(ids, columns):
+                self.tree.heading(column_id, text=col)
+                self.tree.column(column_id, width=self.COLUMN_WIDTH)
+            keep_view = False
+
+        if not keep_view:
+            self.offset = 0
+            self._selected = None
+            self.tree.selection_set(())
+
+        self.data = data
+        self.set_order(None, keep_view=True)
+
+    def set_order(self, order, keep_view=False):
+        """
+        Отображаемые строки: позиции строк DataFrame (None - все строки)
+        """
+        import numpy as np
+
+        self._remember_selection()
+        if order is None:
+            order = np.arange(0 if self.data is None else len(self.data), dtype=np.int64)
+        self.order = np.asarray(order, dtype=np.int64)
+        if not keep_view:
+            self.offset = 0
+        self.refresh()
+
+    def clear(self):
+        """Удаление всех элементов таблицы одной операцией"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._items = []
+        self._positions = {}
+
+    def row_updated(self, position):
+        """Строка position изменена: обновляется только ее элемент, если он виден"""
+        for item, item_position in self._positions.items():
+            if item_position == position:
+                self.tree.item(item, values=self._format_rows([position])[0])
+                break
+    
+    def row_added(self, data):
+        """
+        В конец data добавлена строка
+        Элемент создается, только если строка попадает в видимую область
+        """
+        import numpy as np
+
+        self.data = data
+        position = len(data) - 1
+        self.order = np.append(self.order, position)
+        
+        index = len(self.order) - 1 - self.offset
+        if index < self._visible_rows + self.BUFFER_ROWS:
+            self._ensure_items(index + 1)
+            item = self._items[index]
+            self.tree.item(item, values=self._format_rows([position])[0])
+            self._positions[item] = position
+        self._update_scrollbar()
+    
+    def row_deleted(self, data, position):
+        """
+        Из data удалена строка, стоявшая на позиции position (позиции
+        следующих строк уменьшились на 1)
+        Удаляется элемент этой строки; если ниже видимой области есть
+        строки, в конец добавляется один элемент
+        """
+        import numpy as np
+
+        self._remember_selection()
+        self.data = data
+        matches = np.flatnonzero(self.order == position)
+        order = self.order[self.order != position]
+        order[order > position] -= 1
+        self.order = order
+        
+        # Выбранной становится следующая строка (или последняя)
+        if self._selected is not None and self._selected >= position:
+            if self._selected > position or self._selected >= len(data):
+                self._selected -= 1
+            if self._selected < 0:
+                self._selected = None
+        
+        removed = [item for item, item_position in self._positions.items()
+                   if item_position == position]
+        self._positions = {item: item_position - (item_position > position)
+                           for item, item_position in self._positions.items()
+                           if item_position != position}
+        
+        if len(matches) and matches[0] < self.offset:
+            # Строка выше видимой области - содержимое области не меняется
+            self.offset -= 1
+        elif removed:
+            self.tree.delete(*removed)
+            self._items.remove(removed[0])
+            
+            count = min(self._visible_rows + self.BUFFER_ROWS, len(self.order) - self.offset)
+            if self.offset > max(0, len(self.order) - self._visible_rows) or \
+                    count < len(self._items):
+                # Конец данных - видимая область сдвигается целиком
+                self.refresh()
+                return
+            start = len(self._items)
+            self._ensure_items(count)
+            positions = self.order[self.offset + start:self.offset + count].tolist()
+            for item, item_position, values in zip(self._items[start:], positions,
+                                                   self._format_rows(positions)):
+                self.tree.item(item, values=values)
+                self._positions[item] = item_position
+        
+        self._apply_selection()
+        self._update_scrollbar()
+    
+    def selected_position(self):
+        """Позиция выбранной строки в DataFrame или None"""
+        selection = self.tree.selection()
+        if selection:
+            return self._positions.get(selection[0])
+        return self._selected
+
+    def select_position(self, position):
+        """Выбор строки по позиции в DataFrame с прокруткой к ней"""
+        import numpy as np
+
+        matches = np.flatnonzero(self.order == position)
+        if not len(matches):
+            return
+        self._selected = int(position)
+        self.see(int(matches[0]))
+
+    def see(self, index):
+        """Прокрутка к строке index (индекс в order)"""
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self._visible_rows:
+            self.offset = index - self._visible_rows + 1
+        else:
+            # Строка уже видна - меняется только выделение
+            self._apply_selection()
+            return
+        self.refresh()
+
+    def refresh(self):
+        """Перерисовка видимых строк по текущим данным"""
+        self._remember_selection()
+        total = len(self.order)
+        self.offset = max(0, min(self.offset, total - self._visible_rows))
+
+        count = min(self._visible_rows + self.BUFFER_ROWS, total - self.offset)
+        self._ensure_items(count)
+
+        positions = [int(position) for position in self.order[self.offset:self.offset + count]]
+        rows = self._format_rows(positions)
+        self._positions = {}
+        for item, position, values in zip(self._items, positions, rows):
+            self.tree.item(item, values=values)
+            self._positions[item] = position
+
+        self._apply_selection()
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+    
+    def _apply_selection(self):
+        """Выделение следует за строкой данных, а не за элементом"""
+        selected = [item for item, position in self._positions.items()
+                    if position == self._selected]
+        self.tree.selection_set(selected)
+
+    def _format_rows(self, positions):
+        """Значения ячеек видимых строк в виде строк"""
+        if self.data is None or not positions:
+            return []
+        block = self.data.take(positions)
+        return [[str(value) for value in row]
+                for row in block.itertuples(index=False, name=None)]
+
+    def _ensure_items(self, count):
+        """Число элементов Treeview равно count (лишние удаляются одной операцией)"""
+        if len(self._items) > count:
+            self.tree.delete(*self._items[count:])
+            del self._items[count:]
+        while len(self._items) < count:
+            self._items.append(self.tree.insert('', tk.END, values=()))
+
+    def _remember_selection(self):
+        selection = self.tree.selection()
+        if selection and selection[0] in self._positions:
+            self._selected = self._positions[selection[0]]
+
+    def _resize(self):
+        """Число видимых строк по высоте таблицы"""
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        # Одна строка высоты занята заголовками
+        visible = max(1, self.tree.winfo_height() // row_height - 1)
+        if visible != self._visible_rows:
+            self._visible_rows = visible
+            self.refresh()
+
+    def _update_scrollbar(self):
+        total = len(self.order)
+        if not total:
+            self.scroll_y.set(0, 1)
+            return
+        first = self.offset / total
+        last = min(1.0, (self.offset + self._visible_rows) / total)
+        self.scroll_y.set(first, last)
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.order))
+            self.refresh()
+        elif action == 'scroll':
+            step = self._visible_rows if unit == 'pages' else 1
+            self._scroll_by(int(amount) * step)
+
+    def _on_wheel(self, event):
+        # Windows: шаг 120, macOS: 1
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self._scroll_by(-3 * delta)
+        return 'break'
+
+    def _scroll_by(self, rows):
+        self.offset += rows
+        self.refresh()
+        return 'break'
+
+    def _move_selection(self, step):
+        """Перемещение выбранной строки клавишами"""
+        if not len(self.order):
+            return 'break'
+        import numpy as np
+
+        position = self.selected_position()
+        matches = np.flatnonzero(self.order == position) if position is not None else []
+        index = int(matches[0]) + step if len(matches) else self.offset
+        index = max(0, min(index, len(self.order) - 1))
+
+        self._selected = int(self.order[index])
+        self.tree.selection_set(())
+        self.see(index)
+        return 'break'